@@ -69,9 +69,10 @@ def send_alert(message, force=False):
             from core.monitor_core import bot
             if bot:
                 from config.db_settings import CHAT_IDS
+                from lib.telegram_dispatcher import telegram_dispatcher
                 for chat_id in CHAT_IDS:
-                    bot.send_message(chat_id=chat_id, text=message)
-                debug_log("✅ Сообщение отправлено")
+                    telegram_dispatcher.enqueue(bot, chat_id, message)
+                debug_log("✅ Сообщение поставлено в очередь отправки")
                 return True
         else:
             debug_log("⏸️ Сообщение не отправлено (тихий режим)")
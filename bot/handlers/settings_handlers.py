@@ -11,8 +11,6 @@ Handlers for managing settings via a bot
 Обработчики для управления настройками через бота
 """
 
-import sqlite3
-
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.utils.helpers import escape_markdown
 from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler, Filters
@@ -21,6 +19,9 @@ from config.db_settings import BACKUP_DATABASE_CONFIG
 from config.settings import BACKUP_PATTERNS as DEFAULT_BACKUP_PATTERNS
 from extensions.extension_manager import extension_manager
 from lib.logging import debug_log
+from lib.sqlite_db import get_database
+from modules.backup_schema import ensure_schema
+from modules.backup_state import refresh_zfs_server
 import json
 import re
 
@@ -2553,27 +2554,19 @@ def show_zfs_status_summary(update, context):
         )
         return
 
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+    ensure_schema(db_path)
+    cursor = get_database(db_path).reader().cursor()
     try:
         cursor.execute(
             """
-            SELECT s.server_name, s.pool_name, s.pool_state, s.received_at
-            FROM zfs_pool_status s
-            JOIN (
-                SELECT server_name, pool_name, MAX(received_at) AS last_seen
-                FROM zfs_pool_status
-                GROUP BY server_name, pool_name
-            ) latest
-            ON s.server_name = latest.server_name
-            AND s.pool_name = latest.pool_name
-            AND s.received_at = latest.last_seen
-            ORDER BY s.server_name, s.pool_name
+            SELECT server_name, pool_name, pool_state, received_at
+            FROM zfs_pool_latest
+            ORDER BY server_name, pool_name
             """
         )
         rows = cursor.fetchall()
     except Exception as exc:
-        if "no such table: zfs_pool_status" in str(exc):
+        if "no such table: zfs_pool_latest" in str(exc):
             query.edit_message_text(
                 "🧊 *ZFS статусы*\n\n❌ Таблица ZFS ещё не создана.\n"
                 "Дождитесь первого письма или перезапустите мониторинг.",
@@ -2583,11 +2576,10 @@ def show_zfs_status_summary(update, context):
                     [InlineKeyboardButton("✖️ Закрыть", callback_data='close')]
                 ])
             )
-            conn.close()
             return
         raise
     finally:
-        conn.close()
+        cursor.close()
 
     if allowed_servers:
         normalized_rows = []
@@ -2915,19 +2907,20 @@ def _delete_zfs_server_statuses(server_name: str) -> None:
     if not db_path:
         return
 
-    conn = sqlite3.connect(str(db_path))
+    ensure_schema(db_path)
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "DELETE FROM zfs_pool_status WHERE server_name = ?",
-            (server_name,)
-        )
-        conn.commit()
+        with get_database(db_path).transaction() as conn:
+            conn.execute(
+                "DELETE FROM zfs_pool_status WHERE server_name = ?",
+                (server_name,)
+            )
+            conn.execute(
+                "DELETE FROM zfs_pool_latest WHERE server_name = ?",
+                (server_name,)
+            )
     except Exception as exc:
         if "no such table: zfs_pool_status" not in str(exc):
             debug_logger(f"⚠️ Не удалось удалить статусы ZFS сервера: {exc}")
-    finally:
-        conn.close()
 
 def _rename_zfs_server_statuses(old_name: str, new_name: str) -> None:
     """Переименовать статусы ZFS сервера в БД бэкапов."""
@@ -2935,19 +2928,18 @@ def _rename_zfs_server_statuses(old_name: str, new_name: str) -> None:
     if not db_path:
         return
 
-    conn = sqlite3.connect(str(db_path))
+    ensure_schema(db_path)
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE zfs_pool_status SET server_name = ? WHERE server_name = ?",
-            (new_name, old_name)
-        )
-        conn.commit()
+        with get_database(db_path).transaction() as conn:
+            conn.execute(
+                "UPDATE zfs_pool_status SET server_name = ? WHERE server_name = ?",
+                (new_name, old_name)
+            )
+            refresh_zfs_server(conn, old_name)
+            refresh_zfs_server(conn, new_name)
     except Exception as exc:
         if "no such table: zfs_pool_status" not in str(exc):
             debug_logger(f"⚠️ Не удалось переименовать статусы ZFS сервера: {exc}")
-    finally:
-        conn.close()
 
 def handle_setting_input(update, context, setting_key):
     """Обработчик ввода значений настроек"""
@@ -1161,14 +1161,15 @@ def get_callback_handlers():
         CallbackQueryHandler(lambda u, c: lazy_handler('close_resources')(u, c), pattern='^close_resources$'),
         
         # Обработчики для раздельной проверки по типам серверов
-        CallbackQueryHandler(lambda u, c: lazy_handler('check_linux')(u, c), pattern='^check_linux$'),
-        CallbackQueryHandler(lambda u, c: lazy_handler('check_windows')(u, c), pattern='^check_windows$'),
+        CallbackQueryHandler(lambda u, c: lazy_handler('check_linux')(u, c), pattern='^check_linux(_refresh)?$'),
+        CallbackQueryHandler(lambda u, c: lazy_handler('check_windows')(u, c), pattern='^check_windows(_refresh)?$'),
         CallbackQueryHandler(lambda u, c: lazy_handler('check_other')(u, c), pattern='^check_other$'),
+        CallbackQueryHandler(lambda u, c: lazy_handler('check_all_resources')(u, c), pattern='^check_all_resources(_refresh)?$'),
         
         # Обработчики для раздельной проверки ресурсов
-        CallbackQueryHandler(lambda u, c: lazy_handler('check_cpu')(u, c), pattern='^check_cpu$'),
-        CallbackQueryHandler(lambda u, c: lazy_handler('check_ram')(u, c), pattern='^check_ram$'),
-        CallbackQueryHandler(lambda u, c: lazy_handler('check_disk')(u, c), pattern='^check_disk$'),
+        CallbackQueryHandler(lambda u, c: lazy_handler('check_cpu')(u, c), pattern='^check_cpu(_refresh)?$'),
+        CallbackQueryHandler(lambda u, c: lazy_handler('check_ram')(u, c), pattern='^check_ram(_refresh)?$'),
+        CallbackQueryHandler(lambda u, c: lazy_handler('check_disk')(u, c), pattern='^check_disk(_refresh)?$'),
 
         # Обработчики для бэкапов
         CallbackQueryHandler(lambda u, c: lazy_handler('backup_hosts')(u, c), pattern='^backup_hosts$'),
@@ -1269,6 +1270,8 @@ def lazy_handler(pattern):
             from core.monitor_core import check_windows_resources_handler as handler
         elif pattern == 'check_other':
             from core.monitor_core import check_other_resources_handler as handler
+        elif pattern == 'check_all_resources':
+            from core.monitor_core import check_all_resources_handler as handler
         # Обработчики для раздельной проверки ресурсов
         elif pattern == 'check_cpu':
             from core.monitor_core import check_cpu_resources_handler as handler
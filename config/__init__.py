@@ -20,20 +20,24 @@ from .settings import (
     PROC_UPTIME_FILE,    
     TELEGRAM_TOKEN as SETTINGS_TOKEN,
     CHAT_IDS as SETTINGS_CHAT_IDS,
-    CHECK_INTERVAL, MAX_FAIL_TIME,
+    CHECK_INTERVAL, MAX_FAIL_TIME, AVAILABILITY_WORKERS,
     SILENT_START, SILENT_END, DATA_COLLECTION_TIME,
     RESOURCE_CHECK_INTERVAL, RESOURCE_ALERT_INTERVAL,
+    RESOURCE_WORKERS, RESOURCE_SWEEP_DEADLINE, RESOURCE_SNAPSHOT_TTL, METRICS_RETENTION_DAYS,
+    JOB_WORKERS,
     RESOURCE_THRESHOLDS, RESOURCE_ALERT_THRESHOLDS,
-    SSH_KEY_PATH, SSH_USERNAME,
+    SSH_KEY_PATH, SSH_USERNAME, SSH_KEEPALIVE_INTERVAL, SSH_POOL_IDLE_TIMEOUT,
     SERVER_CONFIG,
     WINDOWS_CREDENTIALS, WINDOWS_SERVER_CREDENTIALS, WINRM_CONFIGS,
     SERVER_TIMEOUTS,
     WEB_PORT, WEB_HOST, MONITOR_SERVER_IP as SETTINGS_MONITOR_SERVER_IP,
-    STATS_FILE, BACKUP_DB_FILE, SETTINGS_DB_FILE,
+    STATS_FILE, BACKUP_DB_FILE, SETTINGS_DB_FILE, METRICS_DB_FILE,
     DEBUG_CONFIG_FILE, EXTENSIONS_CONFIG_FILE,
     PROXMOX_HOSTS, DUPLICATE_IP_HOSTS, HOSTNAME_ALIASES,
     BACKUP_PATTERNS, BACKUP_STATUS_MAP, DATABASE_CONFIG, ZFS_SERVERS,
     BACKUP_DATABASE_CONFIG, DATABASE_BACKUP_CONFIG,
+    MAIL_INGEST_WORKERS, MAIL_INGEST_BATCH_SIZE, MAIL_POLL_INTERVAL,
+    BACKUP_RETENTION_DAYS, BACKUP_SUBJECT_KEEP_DAYS, BACKUP_RETENTION_INTERVAL,
     is_proxmox_server, get_windows_servers_by_type,
     get_all_windows_servers, get_server_timeout,
     RDP_SERVERS, SSH_SERVERS, PING_SERVERS,
@@ -78,17 +82,19 @@ __all__ = [
     'TELEGRAM_TOKEN', 'CHAT_IDS', 'DEBUG_MODE',
     
     # Интервалы проверок
-    'CHECK_INTERVAL', 'MAX_FAIL_TIME',
+    'CHECK_INTERVAL', 'MAX_FAIL_TIME', 'AVAILABILITY_WORKERS',
     
     # Временные настройки
     'SILENT_START', 'SILENT_END', 'DATA_COLLECTION_TIME',
     
     # Настройки ресурсов
     'RESOURCE_CHECK_INTERVAL', 'RESOURCE_ALERT_INTERVAL',
+    'RESOURCE_WORKERS', 'RESOURCE_SWEEP_DEADLINE', 'RESOURCE_SNAPSHOT_TTL', 'METRICS_RETENTION_DAYS',
+    'JOB_WORKERS',
     'RESOURCE_THRESHOLDS', 'RESOURCE_ALERT_THRESHOLDS',
     
     # Аутентификация
-    'SSH_KEY_PATH', 'SSH_USERNAME',
+    'SSH_KEY_PATH', 'SSH_USERNAME', 'SSH_KEEPALIVE_INTERVAL', 'SSH_POOL_IDLE_TIMEOUT',
     
     # Конфигурация серверов
     'SERVER_CONFIG',
@@ -100,13 +106,15 @@ __all__ = [
     'MONITOR_SERVER_IP',
     
     # Файлы
-    'STATS_FILE', 'BACKUP_DB_FILE', 'SETTINGS_DB_FILE',
+    'STATS_FILE', 'BACKUP_DB_FILE', 'SETTINGS_DB_FILE', 'METRICS_DB_FILE',
     'DEBUG_CONFIG_FILE', 'EXTENSIONS_CONFIG_FILE',
     
     # Бэкапы
     'PROXMOX_HOSTS', 'DUPLICATE_IP_HOSTS', 'HOSTNAME_ALIASES',
     'BACKUP_PATTERNS', 'BACKUP_STATUS_MAP', 'DATABASE_CONFIG', 'ZFS_SERVERS',
     'BACKUP_DATABASE_CONFIG', 'DATABASE_BACKUP_CONFIG',
+    'MAIL_INGEST_WORKERS', 'MAIL_INGEST_BATCH_SIZE', 'MAIL_POLL_INTERVAL',
+    'BACKUP_RETENTION_DAYS', 'BACKUP_SUBJECT_KEEP_DAYS', 'BACKUP_RETENTION_INTERVAL',
     
     # Функции
     'is_proxmox_server', 'get_windows_servers_by_type',
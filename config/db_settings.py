@@ -194,16 +194,22 @@ def load_all_settings() -> None:
     Эта функция должна вызываться при инициализации приложения
     """
     global USE_DB, TELEGRAM_TOKEN, CHAT_IDS, CHECK_INTERVAL, MAX_FAIL_TIME
+    global AVAILABILITY_WORKERS
     global SILENT_START, SILENT_END, DATA_COLLECTION_TIME
     global RESOURCE_CHECK_INTERVAL, RESOURCE_ALERT_INTERVAL
+    global RESOURCE_WORKERS, RESOURCE_SWEEP_DEADLINE, RESOURCE_SNAPSHOT_TTL, METRICS_RETENTION_DAYS
+    global JOB_WORKERS
     global RESOURCE_THRESHOLDS, RESOURCE_ALERT_THRESHOLDS
     global SSH_KEY_PATH, SSH_USERNAME, SERVER_CONFIG
+    global SSH_KEEPALIVE_INTERVAL, SSH_POOL_IDLE_TIMEOUT
     global WINDOWS_SERVER_CONFIGS, WINDOWS_SERVER_CREDENTIALS, WINRM_CONFIGS
     global SERVER_TIMEOUTS, WEB_PORT, WEB_HOST, MONITOR_SERVER_IP
     global RDP_SERVERS, SSH_SERVERS, PING_SERVERS
     global PROXMOX_HOSTS, DUPLICATE_IP_HOSTS, HOSTNAME_ALIASES
     global BACKUP_PATTERNS, BACKUP_STATUS_MAP, DATABASE_CONFIG, ZFS_SERVERS
     global BACKUP_DATABASE_CONFIG, DATABASE_BACKUP_CONFIG
+    global MAIL_INGEST_WORKERS, MAIL_INGEST_BATCH_SIZE, MAIL_POLL_INTERVAL
+    global BACKUP_RETENTION_DAYS, BACKUP_SUBJECT_KEEP_DAYS, BACKUP_RETENTION_INTERVAL
     
     if not USE_DB:
         debug_log("⚠️ Используются настройки по умолчанию (БД недоступна)")
@@ -217,6 +223,10 @@ def load_all_settings() -> None:
         # === ИНТЕРВАЛЫ ПРОВЕРОК ===
         CHECK_INTERVAL = get_setting('CHECK_INTERVAL', defaults.CHECK_INTERVAL)
         MAX_FAIL_TIME = get_setting('MAX_FAIL_TIME', defaults.MAX_FAIL_TIME)
+        AVAILABILITY_WORKERS = get_setting(
+            'AVAILABILITY_WORKERS',
+            defaults.AVAILABILITY_WORKERS,
+        )
 
         # === ВРЕМЕННЫЕ НАСТРОЙКИ ===
         SILENT_START = get_setting('SILENT_START', defaults.SILENT_START)
@@ -243,6 +253,26 @@ def load_all_settings() -> None:
             'RESOURCE_ALERT_INTERVAL',
             defaults.RESOURCE_ALERT_INTERVAL,
         )
+        RESOURCE_WORKERS = get_setting(
+            'RESOURCE_WORKERS',
+            defaults.RESOURCE_WORKERS,
+        )
+        RESOURCE_SWEEP_DEADLINE = get_setting(
+            'RESOURCE_SWEEP_DEADLINE',
+            defaults.RESOURCE_SWEEP_DEADLINE,
+        )
+        RESOURCE_SNAPSHOT_TTL = get_setting(
+            'RESOURCE_SNAPSHOT_TTL',
+            defaults.RESOURCE_SNAPSHOT_TTL,
+        )
+        JOB_WORKERS = get_setting(
+            'JOB_WORKERS',
+            defaults.JOB_WORKERS,
+        )
+        METRICS_RETENTION_DAYS = get_json_setting(
+            'METRICS_RETENTION_DAYS',
+            defaults.METRICS_RETENTION_DAYS,
+        )
 
         RESOURCE_THRESHOLDS = {
             "cpu_warning": get_setting(
@@ -279,6 +309,14 @@ def load_all_settings() -> None:
         # === АУТЕНТИФИКАЦИЯ ===
         SSH_KEY_PATH = get_setting('SSH_KEY_PATH', defaults.SSH_KEY_PATH)
         SSH_USERNAME = get_setting('SSH_USERNAME', defaults.SSH_USERNAME)
+        SSH_KEEPALIVE_INTERVAL = get_setting(
+            'SSH_KEEPALIVE_INTERVAL',
+            defaults.SSH_KEEPALIVE_INTERVAL,
+        )
+        SSH_POOL_IDLE_TIMEOUT = get_setting(
+            'SSH_POOL_IDLE_TIMEOUT',
+            defaults.SSH_POOL_IDLE_TIMEOUT,
+        )
 
         # === КОНФИГУРАЦИЯ WINDOWS СЕРВЕРОВ ===
         WINDOWS_SERVER_CONFIGS = get_windows_server_configs()
@@ -329,6 +367,30 @@ def load_all_settings() -> None:
             defaults.BACKUP_STATUS_MAP,
         )
         DATABASE_CONFIG = get_json_setting('DATABASE_CONFIG', defaults.DATABASE_CONFIG)
+        MAIL_INGEST_WORKERS = get_setting(
+            'MAIL_INGEST_WORKERS',
+            defaults.MAIL_INGEST_WORKERS,
+        )
+        MAIL_INGEST_BATCH_SIZE = get_setting(
+            'MAIL_INGEST_BATCH_SIZE',
+            defaults.MAIL_INGEST_BATCH_SIZE,
+        )
+        MAIL_POLL_INTERVAL = get_setting(
+            'MAIL_POLL_INTERVAL',
+            defaults.MAIL_POLL_INTERVAL,
+        )
+        BACKUP_RETENTION_DAYS = get_json_setting(
+            'BACKUP_RETENTION_DAYS',
+            defaults.BACKUP_RETENTION_DAYS,
+        )
+        BACKUP_SUBJECT_KEEP_DAYS = get_setting(
+            'BACKUP_SUBJECT_KEEP_DAYS',
+            defaults.BACKUP_SUBJECT_KEEP_DAYS,
+        )
+        BACKUP_RETENTION_INTERVAL = get_setting(
+            'BACKUP_RETENTION_INTERVAL',
+            defaults.BACKUP_RETENTION_INTERVAL,
+        )
 
         # Обратная совместимость для старого кода
         BACKUP_DATABASE_CONFIG = {
@@ -11,10 +11,11 @@ Database Settings Manager
 Менеджер настроек БД
 """
 
-import sqlite3
 import json
 from datetime import datetime
 from pathlib import Path
+
+from lib.sqlite_db import get_database
 try:
     from config.settings import DATA_DIR  # type: ignore
 except Exception:
@@ -27,7 +28,7 @@ class SettingsManager:
     
     def get_connection(self):
         """Получить соединение с БД"""
-        return sqlite3.connect(str(self.db_path))
+        return get_database(self.db_path).connect()
     
     def init_database(self):
         """Инициализация базы данных настроек"""
@@ -105,6 +106,7 @@ class SettingsManager:
             # Интервалы проверок
             ('CHECK_INTERVAL', '60', 'monitoring', 'Интервал проверки серверов (секунды)', 'int'),
             ('MAX_FAIL_TIME', '900', 'monitoring', 'Максимальное время простоя до алерта (секунды)', 'int'),
+            ('AVAILABILITY_WORKERS', '32', 'monitoring', 'Число параллельных проверок доступности', 'int'),
             
             # Временные настройки
             ('SILENT_START', '20', 'time', 'Начало тихого режима (час)', 'int'),
@@ -114,6 +116,10 @@ class SettingsManager:
             # Настройки ресурсов
             ('RESOURCE_CHECK_INTERVAL', '1800', 'resources', 'Интервал проверки ресурсов (секунды)', 'int'),
             ('RESOURCE_ALERT_INTERVAL', '1800', 'resources', 'Интервал повторных алертов ресурсов (секунды)', 'int'),
+            ('RESOURCE_WORKERS', '16', 'resources', 'Число параллельных проверок ресурсов', 'int'),
+            ('RESOURCE_SWEEP_DEADLINE', '600', 'resources', 'Лимит времени обхода ресурсов (секунды)', 'int'),
+            ('RESOURCE_SNAPSHOT_TTL', '120', 'resources', 'Время жизни снимка ресурсов для меню и веб-интерфейса (секунды)', 'int'),
+            ('JOB_WORKERS', '3', 'resources', 'Число одновременных фоновых задач', 'int'),
             
             # Пороги ресурсов
             ('CPU_WARNING', '80', 'resources', 'Порог предупреждения CPU (%)', 'int'),
@@ -126,10 +132,17 @@ class SettingsManager:
             # Аутентификация
             ('SSH_USERNAME', 'root', 'auth', 'Имя пользователя SSH', 'string'),
             ('SSH_KEY_PATH', '/root/.ssh/id_rsa', 'auth', 'Путь к SSH ключу', 'string'),
+            ('SSH_KEEPALIVE_INTERVAL', '30', 'auth', 'Интервал keepalive SSH соединений (секунды)', 'int'),
+            ('SSH_POOL_IDLE_TIMEOUT', '600', 'auth', 'Время простоя SSH соединения до закрытия (секунды)', 'int'),
             
             # Бэкапы
             ('BACKUP_ALERT_HOURS', '24', 'backup', 'Часы для алертов о бэкапах', 'int'),
             ('BACKUP_STALE_HOURS', '36', 'backup', 'Часы для устаревших бэкапов', 'int'),
+            ('MAIL_INGEST_WORKERS', '4', 'backup', 'Число потоков разбора писем', 'int'),
+            ('MAIL_INGEST_BATCH_SIZE', '200', 'backup', 'Писем в одной транзакции записи', 'int'),
+            ('MAIL_POLL_INTERVAL', '30', 'backup', 'Интервал сканирования почтового ящика (секунды)', 'int'),
+            ('BACKUP_SUBJECT_KEEP_DAYS', '30', 'backup', 'Дней хранения темы письма в истории бэкапов', 'int'),
+            ('BACKUP_RETENTION_INTERVAL', '86400', 'backup', 'Интервал очистки истории бэкапов (секунды)', 'int'),
         ]
         
         conn = self.get_connection()
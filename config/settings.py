@@ -63,6 +63,7 @@ CHAT_IDS: List[str] = []
 # === ИНТЕРВАЛЫ ПРОВЕРОК ===
 CHECK_INTERVAL = 60  # секунды
 MAX_FAIL_TIME = 900  # секунды (15 минут)
+AVAILABILITY_WORKERS = 32  # потоков для параллельной проверки доступности
 
 # === ВРЕМЕННЫЕ НАСТРОЙКИ ===
 SILENT_START = 20  # 20:00
@@ -72,6 +73,18 @@ DATA_COLLECTION_TIME = dt_time(8, 30)  # 08:30
 # === НАСТРОЙКИ РЕСУРСОВ ===
 RESOURCE_CHECK_INTERVAL = 1800  # секунды (30 минут)
 RESOURCE_ALERT_INTERVAL = 1800  # секунды (30 минут)
+RESOURCE_WORKERS = 16  # потоков для параллельного сбора ресурсов
+RESOURCE_SWEEP_DEADLINE = 600  # секунды на весь обход ресурсов
+RESOURCE_SNAPSHOT_TTL = 120  # секунды, сколько меню бота и веб-интерфейс используют последний обход
+JOB_WORKERS = 3  # одновременных фоновых задач, запущенных из бота и веб-интерфейса
+
+# Сроки хранения истории ресурсов (дни): сырые замеры и агрегаты 1m/1h/1d
+METRICS_RETENTION_DAYS = {
+    "raw": 7,
+    "1m": 7,
+    "1h": 90,
+    "1d": 730
+}
 
 RESOURCE_THRESHOLDS = {
     "cpu_warning": 80,
@@ -92,6 +105,8 @@ RESOURCE_ALERT_THRESHOLDS = {
 # === АУТЕНТИФИКАЦИЯ ===
 SSH_KEY_PATH = "/root/.ssh/id_rsa"
 SSH_USERNAME = "root"
+SSH_KEEPALIVE_INTERVAL = 30  # секунды между keepalive пакетами
+SSH_POOL_IDLE_TIMEOUT = 600  # секунды простоя до закрытия соединения
 
 # === КОНФИГУРАЦИЯ СЕРВЕРОВ ===
 SERVER_CONFIG = {
@@ -149,6 +164,7 @@ MONITOR_SERVER_IP = "192.0.2.1"
 STATS_FILE = DATA_DIR / "monitoring_stats.json"
 BACKUP_DB_FILE = DATA_DIR / "backups.db"
 SETTINGS_DB_FILE = DATA_DIR / "settings.db"
+METRICS_DB_FILE = DATA_DIR / "metrics.db"
 DEBUG_CONFIG_FILE = DATA_DIR / "debug_config.json"
 EXTENSIONS_CONFIG_FILE = DATA_DIR / "extensions" / "extensions_config.json"
 
@@ -221,6 +237,22 @@ BACKUP_STATUS_MAP = {
 
 DATABASE_CONFIG: Dict[str, Any] = {}
 
+# Прием писем с отчетами о бэкапах
+MAIL_INGEST_WORKERS = 4  # потоков разбора писем
+MAIL_INGEST_BATCH_SIZE = 200  # писем в одной транзакции записи
+MAIL_POLL_INTERVAL = 30  # секунды между полными сканированиями Maildir
+
+# Хранение истории бэкапов: сроки по таблицам (дни), старые строки сворачиваются в дневные итоги
+BACKUP_RETENTION_DAYS = {
+    "proxmox_backups": 365,
+    "database_backups": 365,
+    "zfs_pool_status": 90,
+    "mail_server_backups": 365,
+    "stock_load_results": 90
+}
+BACKUP_SUBJECT_KEEP_DAYS = 30  # дней хранения темы письма в строках истории
+BACKUP_RETENTION_INTERVAL = 86400  # секунды между запусками очистки
+
 # Обратная совместимость
 BACKUP_DATABASE_CONFIG = {
     "backups_db": BACKUP_DB_FILE,
@@ -13,11 +13,14 @@ Core system package
 
 from .config_manager import config_manager, ConfigManager
 from .checker import ServerChecker
+from .ssh_pool import ssh_pool, SSHConnectionPool
 
 __all__ = [
     'config_manager',
     'ConfigManager',
     'ServerChecker',
+    'ssh_pool',
+    'SSHConnectionPool',
     'monitor',
     'Monitor',
     'TASK_ROUTES',
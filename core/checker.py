@@ -18,6 +18,7 @@ import paramiko
 from typing import Dict, List, Optional, Tuple
 from lib.logging import debug_log, error_log, setup_logging
 from lib.network import check_ping as net_check_ping, check_port as net_check_port
+from core.ssh_pool import ssh_pool
 
 class ServerChecker:
     """Единый класс для проверки серверов - базовая версия"""
@@ -45,26 +46,19 @@ class ServerChecker:
                 username = SSH_USERNAME
                 key_path = SSH_KEY_PATH
 
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-            client.connect(
-                hostname=ip,
+            # Проверка выполняется каналом поверх постоянного соединения из пула
+            ok, _, error = ssh_pool.run_command(
+                ip,
+                'echo "test"',
+                timeout=5,
                 username=username,
-                key_filename=key_path,
-                timeout=self.ssh_timeout,
-                banner_timeout=self.ssh_timeout,
-                auth_timeout=self.ssh_timeout,
-                look_for_keys=False,
-                allow_agent=False,
+                key_path=key_path,
+                connect_timeout=self.ssh_timeout,
             )
+            if not ok and error:
+                debug_log(f"SSH check failed for {ip}: {error}")
 
-            # Простая проверка
-            stdin, stdout, stderr = client.exec_command('echo "test"', timeout=5)
-            exit_code = stdout.channel.recv_exit_status()
-            client.close()
-
-            return exit_code == 0
+            return ok
 
         except paramiko.ssh_exception.AuthenticationException as e:
             debug_log(f"SSH auth failed for {ip}: {e}")
@@ -18,6 +18,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 from lib.logging import debug_log, error_log, setup_logging
+from lib.sqlite_db import get_database
 
 try:
     from config.settings import DATA_DIR  # type: ignore
@@ -39,6 +40,7 @@ class ConfigManager:
         """
         self.db_path = Path(db_path) if db_path else DATA_DIR / "settings.db"
         self._cache = {}
+        self._servers_listeners = []
         self._local = threading.local()
         self._connection = None
         self.init_database()
@@ -48,7 +50,7 @@ class ConfigManager:
         """Получить соединение с БД (отдельное соединение на поток)"""
         conn = getattr(self._local, "connection", None)
         if conn is None:
-            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn = get_database(self.db_path).connect()
             conn.row_factory = sqlite3.Row
             self._local.connection = conn
         return conn
@@ -162,6 +164,7 @@ class ConfigManager:
             # Интервалы проверок
             ('CHECK_INTERVAL', '60', 'monitoring', 'Интервал проверки серверов (секунды)', 'int'),
             ('MAX_FAIL_TIME', '900', 'monitoring', 'Максимальное время простоя до алерта (секунды)', 'int'),
+            ('AVAILABILITY_WORKERS', '32', 'monitoring', 'Число параллельных проверок доступности', 'int'),
             
             # Временные настройки
             ('SILENT_START', '20', 'time', 'Начало тихого режима (час)', 'int'),
@@ -171,6 +174,10 @@ class ConfigManager:
             # Настройки ресурсов
             ('RESOURCE_CHECK_INTERVAL', '1800', 'resources', 'Интервал проверки ресурсов (секунды)', 'int'),
             ('RESOURCE_ALERT_INTERVAL', '1800', 'resources', 'Интервал повторных алертов ресурсов (секунды)', 'int'),
+            ('RESOURCE_WORKERS', '16', 'resources', 'Число параллельных проверок ресурсов', 'int'),
+            ('RESOURCE_SWEEP_DEADLINE', '600', 'resources', 'Лимит времени обхода ресурсов (секунды)', 'int'),
+            ('RESOURCE_SNAPSHOT_TTL', '120', 'resources', 'Время жизни снимка ресурсов для меню и веб-интерфейса (секунды)', 'int'),
+            ('JOB_WORKERS', '3', 'resources', 'Число одновременных фоновых задач', 'int'),
             
             # Пороги ресурсов
             ('CPU_WARNING', '80', 'resources', 'Порог предупреждения CPU (%)', 'int'),
@@ -183,11 +190,18 @@ class ConfigManager:
             # Аутентификация
             ('SSH_USERNAME', 'root', 'auth', 'Имя пользователя SSH', 'string'),
             ('SSH_KEY_PATH', '/root/.ssh/id_rsa', 'auth', 'Путь к SSH ключу', 'string'),
+            ('SSH_KEEPALIVE_INTERVAL', '30', 'auth', 'Интервал keepalive SSH соединений (секунды)', 'int'),
+            ('SSH_POOL_IDLE_TIMEOUT', '600', 'auth', 'Время простоя SSH соединения до закрытия (секунды)', 'int'),
             
             # Бэкапы
             ('BACKUP_ALERT_HOURS', '24', 'backup', 'Часы для алертов о бэкапах', 'int'),
             ('BACKUP_STALE_HOURS', '36', 'backup', 'Часы для устаревших бэкапов', 'int'),
             ('ZFS_SERVERS', '{}', 'backup', 'Список ZFS серверов и массивов', 'dict'),
+            ('MAIL_INGEST_WORKERS', '4', 'backup', 'Число потоков разбора писем', 'int'),
+            ('MAIL_INGEST_BATCH_SIZE', '200', 'backup', 'Писем в одной транзакции записи', 'int'),
+            ('MAIL_POLL_INTERVAL', '30', 'backup', 'Интервал сканирования почтового ящика (секунды)', 'int'),
+            ('BACKUP_SUBJECT_KEEP_DAYS', '30', 'backup', 'Дней хранения темы письма в истории бэкапов', 'int'),
+            ('BACKUP_RETENTION_INTERVAL', '86400', 'backup', 'Интервал очистки истории бэкапов (секунды)', 'int'),
             
             # Веб-интерфейс
             ('WEB_PORT', '5000', 'web', 'Порт веб-интерфейса', 'int'),
@@ -474,6 +488,24 @@ class ConfigManager:
 
         return servers
 
+    def add_servers_listener(self, callback) -> None:
+        """
+        Подписаться на изменения списка серверов
+
+        Args:
+            callback: Функция без аргументов, вызывается после изменения
+        """
+        if callback not in self._servers_listeners:
+            self._servers_listeners.append(callback)
+
+    def _notify_servers_changed(self) -> None:
+        """Уведомляет подписчиков об изменении списка серверов"""
+        for callback in list(self._servers_listeners):
+            try:
+                callback()
+            except Exception as e:
+                error_log(f"Ошибка обработчика изменения серверов: {e}")
+
     def set_server_enabled(self, ip: str, enabled: bool) -> bool:
         """
         Включить или выключить мониторинг сервера
@@ -496,6 +528,7 @@ class ConfigManager:
             conn.commit()
 
             self._cache = {}
+            self._notify_servers_changed()
 
             debug_log(f"Сервер {ip} {'включен' if enabled else 'приостановлен'}")
             return cursor.rowcount > 0
@@ -589,6 +622,7 @@ class ConfigManager:
             
             # Очищаем кэш
             self._cache = {}
+            self._notify_servers_changed()
             
             debug_log(f"Сервер добавлен: {name} ({ip}) тип: {server_type}")
             return True
@@ -616,6 +650,7 @@ class ConfigManager:
             
             # Очищаем кэш
             self._cache = {}
+            self._notify_servers_changed()
             
             debug_log(f"Сервер удален: {ip}")
             return True
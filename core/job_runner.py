@@ -0,0 +1,287 @@
+"""
+/core/job_runner.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Background job runner
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Фоновое выполнение тяжелых задач
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from lib.logging import debug_log, error_log
+from core.live_events import live_events
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# Сколько завершенных задач хранится для запросов статуса
+FINISHED_JOBS_LIMIT = 200
+
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+
+class Job:
+    """Фоновая задача"""
+
+    def __init__(self, kind: str, key: Hashable, title: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.title = title
+        self.status = JOB_QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.progress: Optional[Tuple[float, str]] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.future = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._callbacks: List[Callable[["Job"], None]] = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        """Прерывает задачу, если ее отменили."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ждет завершения задачи, True если задача завершена."""
+        return self._done.wait(timeout)
+
+    def on_done(self, callback: Callable[["Job"], None]) -> None:
+        """
+        Вызывает callback(задача) после завершения задачи
+
+        Если задача уже завершена, callback вызывается сразу.
+        """
+        with self._callbacks_lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def _call(self, callback: Callable[["Job"], None]) -> None:
+        try:
+            callback(self)
+        except Exception as e:
+            error_log(f"❌ Ошибка обработчика завершения задачи {self.id}: {e}")
+
+    def _complete(self) -> None:
+        """Отмечает задачу завершенной и вызывает обработчики."""
+        with self._callbacks_lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._call(callback)
+
+    def to_dict(self, with_result: bool = True) -> Dict:
+        """Состояние задачи для API."""
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "title": self.title,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if with_result:
+            data["result"] = self.result
+        return data
+
+
+def current_job() -> Optional[Job]:
+    """Задача, выполняющаяся в текущем потоке."""
+    return getattr(_local, "job", None)
+
+
+def report_progress(progress: float, status: str = "") -> None:
+    """Сохраняет прогресс текущей задачи (вне задачи ничего не делает)."""
+    job = current_job()
+    if job is not None:
+        job.progress = (round(float(progress), 1), status)
+
+
+class JobRunner:
+    """
+    Пул фоновых задач
+
+    Тяжелые действия из бота и веб-интерфейса выполняются в ограниченном
+    пуле потоков. Пока задача с тем же ключом стоит в очереди или
+    выполняется, повторный запуск возвращает ее же, поэтому обход
+    выполняется один раз, сколько бы пользователей ни нажали кнопку.
+    Отмена задачи в очереди снимает ее сразу, выполняющаяся задача
+    прерывается на ближайшей проверке (run_sweep перестает опрашивать
+    оставшиеся серверы).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: Размер пула (по умолчанию JOB_WORKERS)
+        """
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[Hashable, Job] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Создает пул при первой задаче (под блокировкой)."""
+        if self._executor is None:
+            workers = self._max_workers
+            if workers is None:
+                try:
+                    from config.db_settings import JOB_WORKERS
+                    workers = int(JOB_WORKERS)
+                except Exception:
+                    workers = 3
+            self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        return self._executor
+
+    def submit(
+        self,
+        kind: str,
+        func: Callable,
+        *args,
+        key: Optional[Hashable] = None,
+        title: Optional[str] = None,
+        **kwargs,
+    ) -> Tuple[Job, bool]:
+        """
+        Ставит задачу в очередь
+
+        Args:
+            kind: Тип задачи
+            func: Функция задачи
+            key: Ключ дедупликации (по умолчанию kind)
+            title: Описание задачи
+
+        Returns:
+            tuple: (задача, True если создана новая задача)
+        """
+        key = kind if key is None else key
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                return job, False
+
+            job = Job(kind, key, title or kind)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._trim()
+            # Публикация под блокировкой: событие "queued" не обгонит "running"
+            self._announce(job)
+            job.future = self._get_executor().submit(self._run, job, func, args, kwargs)
+
+        debug_log(f"📥 Задача {job.id} ({job.title}) поставлена в очередь")
+        return job, True
+
+    def _trim(self) -> None:
+        """Удаляет самые старые завершенные задачи (под блокировкой)."""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(len(finished) - FINISHED_JOBS_LIMIT, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job, func: Callable, args: tuple, kwargs: dict) -> None:
+        """Выполняет задачу в потоке пула."""
+        with self._lock:
+            if job.cancel_requested:
+                return
+            job.status = JOB_RUNNING
+            job.started_at = datetime.now()
+        self._announce(job)
+
+        _local.job = job
+        try:
+            result = func(*args, **kwargs)
+            job.check_cancelled()
+            self._finish(job, JOB_DONE, result=result)
+        except JobCancelled:
+            self._finish(job, JOB_CANCELLED)
+        except Exception as e:
+            error_log(f"❌ Задача {job.id} ({job.title}) завершилась ошибкой: {e}")
+            self._finish(job, JOB_FAILED, error=str(e))
+        finally:
+            _local.job = None
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.now()
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+        debug_log(f"📤 Задача {job.id} ({job.title}): {status}")
+        self._announce(job)
+        job._complete()
+
+    @staticmethod
+    def _announce(job: Job) -> None:
+        """Публикует состояние задачи в ленту событий веб-интерфейса."""
+        live_events.publish("job", job.to_dict(with_result=False))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> List[Job]:
+        """Последние задачи, новые первыми."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Отменяет задачу
+
+        Returns:
+            True если задача была активна и отмена принята
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job._cancel.set()
+            queued = job.status == JOB_QUEUED
+            if queued:
+                job.future.cancel()
+
+        if queued:
+            self._finish(job, JOB_CANCELLED)
+        else:
+            debug_log(f"🛑 Запрошена отмена задачи {job.id} ({job.title})")
+        return True
+
+
+# Глобальный экземпляр пула задач
+job_runner = JobRunner()
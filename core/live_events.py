@@ -0,0 +1,85 @@
+"""
+/core/live_events.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Live dashboard event stream
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Поток событий для живого обновления веб-интерфейса
+"""
+
+import json
+import threading
+from collections import deque
+from typing import List, Tuple
+
+# Сколько последних событий хранится для переподключившихся клиентов
+EVENT_BUFFER_SIZE = 500
+
+
+class LiveEventHub:
+    """
+    Общая лента событий мониторинга
+
+    Событие сериализуется один раз при публикации и кладется в кольцевой
+    буфер, клиенты только читают буфер начиная со своего номера. Поэтому
+    стоимость публикации не зависит от числа открытых страниц, а клиент,
+    переподключившийся с Last-Event-ID, получает пропущенные события.
+    """
+
+    def __init__(self, size: int = EVENT_BUFFER_SIZE):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=size)
+        self._last_id = 0
+
+    @property
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    def publish(self, event: str, data) -> int:
+        """
+        Публикует событие
+
+        Args:
+            event: Тип события
+            data: Данные (сериализуются в JSON)
+
+        Returns:
+            int: Номер события
+        """
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        with self._cond:
+            self._last_id += 1
+            frame = f"id: {self._last_id}\nevent: {event}\ndata: {payload}\n\n"
+            self._events.append((self._last_id, frame))
+            self._cond.notify_all()
+            return self._last_id
+
+    def wait(self, after_id: int, timeout: float) -> Tuple[List[str], int, bool]:
+        """
+        Ждет события с номером больше after_id
+
+        Args:
+            after_id: Номер последнего полученного клиентом события
+            timeout: Максимальное ожидание, секунды
+
+        Returns:
+            tuple: (кадры SSE, номер последнего события,
+                    True если часть событий уже вытеснена из буфера)
+        """
+        with self._cond:
+            if self._last_id <= after_id:
+                self._cond.wait(timeout)
+            if self._last_id <= after_id:
+                return [], after_id, False
+            oldest = self._events[0][0]
+            frames = [frame for event_id, frame in self._events if event_id > after_id]
+            return frames, self._last_id, after_id + 1 < oldest
+
+
+# Глобальный экземпляр ленты событий
+live_events = LiveEventHub()
@@ -0,0 +1,425 @@
+"""
+/core/metrics_store.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Resource metrics time-series store
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Хранилище временных рядов ресурсов
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lib.logging import error_log
+
+try:
+    from config.settings import METRICS_DB_FILE  # type: ignore
+except Exception:
+    METRICS_DB_FILE = Path(__file__).resolve().parents[1] / "data" / "metrics.db"
+
+# Разрешения агрегатов в секундах
+ROLLUP_RESOLUTIONS = {
+    "1m": 60,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+# Сроки хранения по умолчанию (дни)
+DEFAULT_RETENTION_DAYS = {
+    "raw": 7,
+    "1m": 7,
+    "1h": 90,
+    "1d": 730,
+}
+
+METRIC_FIELDS = ("cpu", "ram", "disk")
+
+
+class MetricsStore:
+    """Хранилище метрик ресурсов в SQLite с пакетной записью и агрегатами"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        batch_size: int = 500,
+        flush_interval: int = 60,
+    ):
+        """
+        Инициализация хранилища
+
+        Args:
+            db_path: Путь к файлу базы данных
+            batch_size: Размер буфера, при котором запись выполняется сразу
+            flush_interval: Максимальное время хранения записей в буфере (секунды)
+        """
+        self.db_path = Path(db_path) if db_path else Path(METRICS_DB_FILE)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._buffer: List[tuple] = []
+        self._latest: List[tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._last_retention = 0.0
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Получить соединение с БД (отдельное соединение на поток)"""
+        self._ensure_schema()
+        return self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение текущего потока без проверки схемы."""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+        return conn
+
+    def _ensure_schema(self) -> None:
+        """Создает таблицы при первом обращении."""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            # WITHOUT ROWID: строки физически упорядочены по (server, ts)
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS resource_samples (
+                    server TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    cpu REAL,
+                    ram REAL,
+                    disk REAL,
+                    PRIMARY KEY (server, ts)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS resource_rollups (
+                    resolution INTEGER NOT NULL,
+                    server TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    samples INTEGER NOT NULL,
+                    cpu_n INTEGER NOT NULL DEFAULT 0, cpu_sum REAL, cpu_max REAL,
+                    ram_n INTEGER NOT NULL DEFAULT 0, ram_sum REAL, ram_max REAL,
+                    disk_n INTEGER NOT NULL DEFAULT 0, disk_sum REAL, disk_max REAL,
+                    PRIMARY KEY (resolution, server, bucket)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS resource_latest (
+                    server TEXT PRIMARY KEY,
+                    server_name TEXT,
+                    ts INTEGER NOT NULL,
+                    payload TEXT
+                );
+            ''')
+            conn.commit()
+            self._initialized = True
+
+    @staticmethod
+    def _value(resources: Dict, field: str) -> Optional[float]:
+        value = resources.get(field)
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def record(self, server: str, resources: Dict, ts: Optional[float] = None) -> None:
+        """
+        Добавляет замер ресурсов в буфер
+
+        Args:
+            server: IP сервера
+            resources: Ресурсы (cpu, ram, disk и дополнительные поля)
+            ts: Время замера (unix time), по умолчанию текущее
+        """
+        if not server or not resources:
+            return
+
+        ts = int(ts if ts is not None else time.time())
+        sample = (server, ts) + tuple(self._value(resources, field) for field in METRIC_FIELDS)
+        payload = json.dumps(resources, ensure_ascii=False, default=str)
+        latest = (server, resources.get("server_name"), ts, payload)
+
+        with self._buffer_lock:
+            self._buffer.append(sample)
+            self._latest.append(latest)
+            should_flush = (
+                len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Записывает буфер одной транзакцией и обновляет агрегаты
+
+        Returns:
+            int: Количество записанных замеров
+        """
+        with self._buffer_lock:
+            samples, self._buffer = self._buffer, []
+            latest, self._latest = self._latest, []
+            self._last_flush = time.monotonic()
+
+        if not samples:
+            return 0
+
+        try:
+            conn = self.get_connection()
+            with conn:
+                # Повторный замер с теми же (server, ts) заменяет сырую строку,
+                # но в агрегаты уже учтен и второй раз не добавляется
+                new_samples = []
+                for sample in samples:
+                    inserted = conn.execute(
+                        "INSERT OR IGNORE INTO resource_samples (server, ts, cpu, ram, disk) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        sample,
+                    ).rowcount
+                    if inserted:
+                        new_samples.append(sample)
+                    else:
+                        conn.execute(
+                            "UPDATE resource_samples SET cpu = ?, ram = ?, disk = ? "
+                            "WHERE server = ? AND ts = ?",
+                            sample[2:] + sample[:2],
+                        )
+
+                rollup_rows = []
+                for resolution in ROLLUP_RESOLUTIONS.values():
+                    for server, ts, *values in new_samples:
+                        row = [resolution, server, ts - ts % resolution]
+                        for value in values:
+                            # Отсутствующая метрика не входит ни в сумму, ни в счетчик
+                            row += [0, None, None] if value is None else [1, value, value]
+                        rollup_rows.append(tuple(row))
+                conn.executemany(
+                    '''
+                    INSERT INTO resource_rollups (
+                        resolution, server, bucket, samples,
+                        cpu_n, cpu_sum, cpu_max,
+                        ram_n, ram_sum, ram_max,
+                        disk_n, disk_sum, disk_max
+                    ) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (resolution, server, bucket) DO UPDATE SET
+                        samples = samples + 1,
+                        cpu_n = cpu_n + excluded.cpu_n,
+                        cpu_sum = COALESCE(cpu_sum + excluded.cpu_sum, cpu_sum, excluded.cpu_sum),
+                        cpu_max = COALESCE(MAX(cpu_max, excluded.cpu_max), cpu_max, excluded.cpu_max),
+                        ram_n = ram_n + excluded.ram_n,
+                        ram_sum = COALESCE(ram_sum + excluded.ram_sum, ram_sum, excluded.ram_sum),
+                        ram_max = COALESCE(MAX(ram_max, excluded.ram_max), ram_max, excluded.ram_max),
+                        disk_n = disk_n + excluded.disk_n,
+                        disk_sum = COALESCE(disk_sum + excluded.disk_sum, disk_sum, excluded.disk_sum),
+                        disk_max = COALESCE(MAX(disk_max, excluded.disk_max), disk_max, excluded.disk_max)
+                    ''',
+                    rollup_rows,
+                )
+
+                conn.executemany(
+                    '''
+                    INSERT INTO resource_latest (server, server_name, ts, payload)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (server) DO UPDATE SET
+                        server_name = COALESCE(excluded.server_name, server_name),
+                        ts = excluded.ts,
+                        payload = excluded.payload
+                    WHERE excluded.ts >= resource_latest.ts
+                    ''',
+                    latest,
+                )
+        except Exception as e:
+            error_log(f"❌ Ошибка записи метрик ресурсов: {e}")
+            return 0
+
+        self.apply_retention()
+        return len(samples)
+
+    def apply_retention(self, force: bool = False) -> None:
+        """Удаляет данные старше сроков хранения (не чаще раза в час)."""
+        now = time.time()
+        if not force and now - self._last_retention < 3600:
+            return
+        self._last_retention = now
+
+        retention = dict(DEFAULT_RETENTION_DAYS)
+        try:
+            from config.db_settings import METRICS_RETENTION_DAYS
+            retention.update(METRICS_RETENTION_DAYS or {})
+        except Exception:
+            pass
+
+        try:
+            conn = self.get_connection()
+            with conn:
+                cutoff = int(now - float(retention["raw"]) * 86400)
+                conn.execute("DELETE FROM resource_samples WHERE ts < ?", (cutoff,))
+                for name, resolution in ROLLUP_RESOLUTIONS.items():
+                    cutoff = int(now - float(retention[name]) * 86400)
+                    conn.execute(
+                        "DELETE FROM resource_rollups WHERE resolution = ? AND bucket < ?",
+                        (resolution, cutoff),
+                    )
+        except Exception as e:
+            error_log(f"❌ Ошибка очистки метрик ресурсов: {e}")
+
+    def get_recent(self, server: str, limit: int = 10) -> List[Dict]:
+        """
+        Возвращает последние замеры сервера
+
+        Args:
+            server: IP сервера
+            limit: Количество замеров
+
+        Returns:
+            List[Dict]: Замеры в хронологическом порядке
+        """
+        self.flush()
+        rows = self.get_connection().execute(
+            "SELECT ts, cpu, ram, disk FROM resource_samples "
+            "WHERE server = ? ORDER BY ts DESC LIMIT ?",
+            (server, limit),
+        ).fetchall()
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(row["ts"]),
+                "cpu": row["cpu"],
+                "ram": row["ram"],
+                "disk": row["disk"],
+            }
+            for row in reversed(rows)
+        ]
+
+    def get_trend(
+        self,
+        server: str,
+        since: Optional[float] = None,
+        resolution: str = "1h",
+        until: Optional[float] = None,
+    ) -> List[Dict]:
+        """
+        Возвращает агрегированный ряд сервера
+
+        Args:
+            server: IP сервера
+            since: Начало периода (unix time), по умолчанию 7 дней назад
+            resolution: Разрешение '1m', '1h' или '1d'
+            until: Конец периода (unix time)
+
+        Returns:
+            List[Dict]: Точки со средними и максимальными значениями
+        """
+        self.flush()
+        step = ROLLUP_RESOLUTIONS[resolution]
+        now = time.time()
+        since = since if since is not None else now - 7 * 86400
+        until = until if until is not None else now
+
+        rows = self.get_connection().execute(
+            '''
+            SELECT bucket, samples,
+                   cpu_n, cpu_sum, cpu_max, ram_n, ram_sum, ram_max, disk_n, disk_sum, disk_max
+            FROM resource_rollups
+            WHERE resolution = ? AND server = ? AND bucket BETWEEN ? AND ?
+            ORDER BY bucket
+            ''',
+            (step, server, int(since) - int(since) % step, int(until)),
+        ).fetchall()
+
+        points = []
+        for row in rows:
+            point = {
+                "timestamp": datetime.fromtimestamp(row["bucket"]),
+                "samples": row["samples"],
+            }
+            for field in METRIC_FIELDS:
+                count = row[f"{field}_n"]
+                point[f"{field}_samples"] = count
+                point[f"{field}_avg"] = round(row[f"{field}_sum"] / count, 1) if count else None
+                point[f"{field}_max"] = row[f"{field}_max"]
+            points.append(point)
+        return points
+
+    def get_summary(self, server: str, since: Optional[float] = None) -> Optional[Dict]:
+        """Возвращает средние и максимумы за период по часовым агрегатам."""
+        points = self.get_trend(server, since=since, resolution="1h")
+        if not points:
+            return None
+        samples = sum(point["samples"] for point in points)
+        summary = {"samples": samples}
+        for field in METRIC_FIELDS:
+            measured = [point for point in points if point[f"{field}_samples"]]
+            count = sum(point[f"{field}_samples"] for point in measured)
+            summary[f"{field}_avg"] = round(
+                sum(point[f"{field}_avg"] * point[f"{field}_samples"] for point in measured) / count, 1
+            ) if count else None
+            summary[f"{field}_max"] = max(
+                (point[f"{field}_max"] for point in measured), default=None
+            )
+        return summary
+
+    def get_latest(self, server: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        Возвращает последний полный снимок ресурсов
+
+        Args:
+            server: IP сервера (None - все серверы)
+
+        Returns:
+            Dict[str, Dict]: Снимки по IP
+        """
+        self.flush()
+        conn = self.get_connection()
+        if server:
+            rows = conn.execute(
+                "SELECT server, server_name, ts, payload FROM resource_latest WHERE server = ?",
+                (server,),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT server, server_name, ts, payload FROM resource_latest"
+            ).fetchall()
+
+        result = {}
+        for row in rows:
+            try:
+                data = json.loads(row["payload"]) if row["payload"] else {}
+            except ValueError:
+                data = {}
+            data.setdefault("server_name", row["server_name"])
+            data["collected_at"] = datetime.fromtimestamp(row["ts"])
+            result[row["server"]] = data
+        return result
+
+    def get_servers(self) -> List[Dict]:
+        """Возвращает список серверов, для которых есть данные."""
+        self.flush()
+        rows = self.get_connection().execute(
+            "SELECT server, server_name, ts FROM resource_latest ORDER BY server_name, server"
+        ).fetchall()
+        return [
+            {"ip": row["server"], "name": row["server_name"] or row["server"],
+             "last_ts": datetime.fromtimestamp(row["ts"])}
+            for row in rows
+        ]
+
+
+# Глобальный экземпляр хранилища метрик
+metrics_store = MetricsStore()
@@ -17,18 +17,24 @@ from datetime import datetime
 from typing import Dict, List
 
 from lib.logging import debug_log
-from lib.alerts import send_alert, is_silent_time as alerts_is_silent_time
+from lib.alerts import send_alert, report_server_event, is_silent_time as alerts_is_silent_time
 from config import (
     CHECK_INTERVAL,
     MAX_FAIL_TIME,
     RESOURCE_CHECK_INTERVAL,
+    RESOURCE_WORKERS,
+    RESOURCE_SWEEP_DEADLINE,
     DATA_COLLECTION_TIME,
     SILENT_START,
     SILENT_END,
 )
 from modules.resources import resources_checker
 from modules.morning_report import morning_report
-from core.config_manager import config_manager
+from core.server_registry import server_registry
+from core.metrics_store import metrics_store
+from core.resource_cache import resource_cache
+from core.server_state import server_state
+from core.sweep import run_sweep, RESOURCE_TIMED_OUT
 
 class Monitor:
     """Основной класс мониторинга"""
@@ -39,6 +45,7 @@ class Monitor:
         self.silent_override = None
         self.server_status = {}
         self.servers = []
+        self.snapshot = None
         self.bot = None
         
         self.last_check_time = datetime.now()
@@ -62,20 +69,19 @@ class Monitor:
         """
         Загружает список серверов для мониторинга
         
+        Список берется из снимка реестра серверов, снимок сохраняется
+        и используется до конца цикла вместо запросов к БД по каждому серверу.
+        
         Returns:
             List[Dict]: Список серверов
         """
         try:
-            servers = config_manager.get_all_servers(include_disabled=True)
-            if not servers:
-                from extensions.server_checks import initialize_servers
-                servers = initialize_servers()
-                for server in servers:
-                    server.setdefault("enabled", True)
+            snapshot = server_registry.snapshot()
+            self.snapshot = snapshot
             
             # Исключаем сервер мониторинга
             monitor_server_ip = "192.168.20.2"
-            servers = [s for s in servers if s.get("ip") != monitor_server_ip]
+            servers = [dict(s) for s in snapshot.servers if s.get("ip") != monitor_server_ip]
             
             debug_log(f"✅ Загружено {len(servers)} серверов для мониторинга")
             return servers
@@ -99,12 +105,9 @@ class Monitor:
         self.initialize_server_status()
 
     def is_server_enabled(self, ip: str) -> bool:
-        """Проверяет, включен ли мониторинг для сервера."""
-        try:
-            return config_manager.get_server_enabled(ip)
-        except Exception as e:
-            debug_log(f"⚠️ Не удалось получить статус сервера {ip}: {e}")
-            return True
+        """Проверяет, включен ли мониторинг для сервера (по снимку текущего цикла)."""
+        snapshot = self.snapshot or server_registry.snapshot()
+        return snapshot.is_enabled(ip)
     
     def initialize_server_status(self) -> None:
         """Инициализирует статусы серверов"""
@@ -141,6 +144,65 @@ class Monitor:
             debug_log(f"❌ Ошибка проверки доступности {server.get('name')}: {e}")
             return False
     
+    def run_availability_sweep(self, current_time: datetime) -> None:
+        """
+        Проверяет доступность всех серверов параллельно
+
+        Проверки выполняются в пуле потоков, а переходы состояний
+        применяются последовательно в порядке списка серверов.
+
+        Args:
+            current_time: Время начала цикла проверки
+        """
+        to_check = []
+        monitor_servers = []
+        for server in self.servers:
+            try:
+                ip = server.get("ip")
+                if ip not in self.server_status:
+                    continue
+
+                # Исключаем сервер мониторинга
+                if ip == "192.168.20.2":
+                    self.server_status[ip]["last_up"] = current_time
+                    monitor_servers.append((server, True))
+                    continue
+
+                monitoring_enabled = self.is_server_enabled(ip)
+                if not monitoring_enabled:
+                    self.server_status[ip]["monitoring_enabled"] = False
+                    continue
+
+                if not self.server_status[ip].get("monitoring_enabled", True):
+                    self.server_status[ip]["monitoring_enabled"] = True
+                    self.server_status[ip]["alert_sent"] = False
+                    self.server_status[ip]["last_alert"] = {}
+
+                to_check.append(server)
+            except Exception as e:
+                debug_log(f"❌ Ошибка мониторинга {server.get('name')}: {e}")
+
+        started = time.monotonic()
+        results = run_sweep(to_check, self.check_server_availability)
+        debug_log(
+            f"🔍 Проверено {len(results)} серверов за {time.monotonic() - started:.1f} сек"
+        )
+        server_state.record_sweep(monitor_servers + results, current_time)
+
+        for server, is_up in results:
+            try:
+                ip = server.get("ip")
+                status = self.server_status.get(ip)
+                if status is None:
+                    continue
+
+                if is_up:
+                    self.handle_server_up(ip, status, current_time)
+                else:
+                    self.handle_server_down(ip, status, current_time)
+            except Exception as e:
+                debug_log(f"❌ Ошибка мониторинга {server.get('name')}: {e}")
+
     def handle_server_up(self, ip: str, status: Dict, current_time: datetime) -> None:
         """
         Обрабатывает доступный сервер
@@ -151,7 +213,7 @@ class Monitor:
             current_time: Текущее время
         """
         if status.get("alert_sent"):
-            last_up = status.get("last_up")
+            downtime_start = status.get("downtime_start")
             downtime = 0
             if downtime_start:
                 downtime = (current_time - downtime_start).total_seconds()
@@ -160,7 +222,7 @@ class Monitor:
             if downtime > 0:
                 message += f" (простой: {int(downtime // 60)} мин {int(downtime % 60)} сек)"
 
-            send_alert(message)
+            report_server_event("up", ip, status.get("name"), status.get("type"), message)
         
         # Обновляем статус
         self.server_status[ip] = {
@@ -189,7 +251,7 @@ class Monitor:
             message = f"🚨 {status.get('name')} ({ip}) не отвечает"
             message += f" ({int(downtime // 60)} мин {int(downtime % 60)} сек)"
 
-            send_alert(message)
+            report_server_event("down", ip, status.get("name"), status.get("type"), message)
             self.server_status[ip]["alert_sent"] = True
             return True
 
@@ -217,25 +279,48 @@ class Monitor:
         
         debug_log("🔍 Автоматическая проверка ресурсов серверов...")
         
-        # Проверяем все серверы
-        alerts_found = []
-        
+        # Отбираем серверы с включенным мониторингом
+        to_check = []
         for server in self.servers:
+            ip = server.get("ip")
+            if not self.is_server_enabled(ip):
+                if ip in self.server_status:
+                    self.server_status[ip]["last_up"] = current_time
+                    self.server_status[ip]["alert_sent"] = False
+                    self.server_status[ip]["last_alert"] = {}
+                continue
+            to_check.append(server)
+
+        # Параллельный сбор ресурсов с общим лимитом времени
+        started = time.monotonic()
+        results = run_sweep(
+            to_check,
+            resources_checker.check_server_resources,
+            max_workers=RESOURCE_WORKERS,
+            default=(False, None),
+            deadline=RESOURCE_SWEEP_DEADLINE,
+            timeout_result=RESOURCE_TIMED_OUT,
+        )
+
+        # Алерты оцениваются после получения всех результатов
+        alerts_found = []
+        timed_out = []
+
+        for server, result in results:
             try:
                 ip = server.get("ip")
                 server_name = server.get("name", ip)
-                server_type = server.get("type")
 
-                if not self.is_server_enabled(ip):
+                if result == RESOURCE_TIMED_OUT:
+                    timed_out.append(server_name)
                     if ip in self.server_status:
-                        self.server_status[ip]["last_up"] = current_time
-                        self.server_status[ip]["alert_sent"] = False
-                        self.server_status[ip]["last_alert"] = {}
+                        self.server_status[ip]["resource_status"] = "timed_out"
                     continue
 
-                # Получаем текущие ресурсы
-                success, resources = resources_checker.check_server_resources(server)
-                
+                success, resources = result
+                if ip in self.server_status:
+                    self.server_status[ip]["resource_status"] = "ok" if success else "failed"
+
                 if success and resources:
                     # Проверяем алерты
                     server_alerts = resources_checker.check_resource_alerts(ip, resources)
@@ -244,13 +329,25 @@ class Monitor:
                         alerts_found.extend(server_alerts)
                         debug_log(f"⚠️ Найдены проблемы для {server_name}: {server_alerts}")
                     
-                    # Сохраняем ресурсы в статус
+                    # Сохраняем ресурсы в статус и в историю
                     if ip in self.server_status:
                         self.server_status[ip]["resources"] = resources
+                    metrics_store.record(ip, resources)
                 
             except Exception as e:
                 debug_log(f"❌ Ошибка при проверке ресурсов {server.get('name')}: {e}")
                 continue
+
+        metrics_store.flush()
+
+        # Меню бота и веб-интерфейс используют этот обход, пока он свежий
+        resource_cache.publish(results, time.monotonic() - started)
+
+        if timed_out:
+            debug_log(f"⏱️ Ресурсы не получены за отведенное время: {', '.join(timed_out)}")
+        debug_log(
+            f"🔍 Ресурсы {len(results)} серверов собраны за {time.monotonic() - started:.1f} сек"
+        )
         
         # Отправляем алерты если есть
         if alerts_found:
@@ -410,40 +507,7 @@ class Monitor:
                 self.last_check_time = current_time
 
                 self.refresh_servers()
-                
-                for server in self.servers:
-                    try:
-                        ip = server.get("ip")
-                        if ip not in self.server_status:
-                            continue
-                        
-                        status = self.server_status[ip]
-                        
-                        # Исключаем сервер мониторинга
-                        if ip == "192.168.20.2":
-                            self.server_status[ip]["last_up"] = current_time
-                            continue
-
-                        monitoring_enabled = self.is_server_enabled(ip)
-                        if not monitoring_enabled:
-                            self.server_status[ip]["monitoring_enabled"] = False
-                            continue
-
-                        if not self.server_status[ip].get("monitoring_enabled", True):
-                            self.server_status[ip]["monitoring_enabled"] = True
-                            self.server_status[ip]["alert_sent"] = False
-                            self.server_status[ip]["last_alert"] = {}
-                        
-                        # Проверка доступности
-                        is_up = self.check_server_availability(server)
-                        
-                        if is_up:
-                            self.handle_server_up(ip, status, current_time)
-                        else:
-                            self.handle_server_down(ip, status, current_time)
-                            
-                    except Exception as e:
-                        debug_log(f"❌ Ошибка мониторинга {server.get('name')}: {e}")
+                self.run_availability_sweep(current_time)
             
             # Ожидание перед следующей проверкой
             time.sleep(CHECK_INTERVAL)
@@ -17,13 +17,18 @@ from lib.alerts import (
     send_alert as base_send_alert,
     configure_alerts,
     init_telegram_bot,
+    report_server_event,
     set_silent_override,
     is_silent_time as alerts_is_silent_time,
     get_silent_override,
 )
 from lib.utils import progress_bar, format_duration
+from lib.progress import ProgressReporter
 from config.db_settings import DEBUG_MODE, DATA_DIR
 from core.monitor import monitor
+from core.resource_cache import resource_cache
+from core.server_state import server_state
+from core.job_runner import job_runner, report_progress, JOB_DONE
 from modules.availability import availability_checker
 from modules.resources import resources_checker
 from modules.morning_report import morning_report
@@ -37,7 +42,9 @@ from datetime import datetime, timedelta
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from lib.utils import safe_import
 from extensions.server_checks import check_server_availability
-from core.config_manager import config_manager
+from core.server_registry import server_registry
+from core.metrics_store import metrics_store
+from core.sweep import run_sweep, RESOURCE_TIMED_OUT
 
 # Глобальные переменные
 bot = None
@@ -46,6 +53,7 @@ morning_data = {}
 monitoring_active = True
 last_check_time = datetime.now()
 servers = []
+servers_snapshot = None
 resource_history = {}
 last_resource_check = datetime.now()
 resource_alerts_sent = {}
@@ -54,26 +62,18 @@ last_report_date = None
 _alerts_configured = False
 
 def is_server_monitoring_enabled(ip: str) -> bool:
-    """Проверяет, включен ли мониторинг для сервера."""
-    try:
-        return config_manager.get_server_enabled(ip)
-    except Exception as e:
-        debug_log(f"⚠️ Не удалось получить статус сервера {ip}: {e}")
-        return True
+    """Проверяет, включен ли мониторинг для сервера (по снимку текущего цикла)."""
+    snapshot = servers_snapshot or server_registry.snapshot()
+    return snapshot.is_enabled(ip)
 
 def refresh_servers():
-    """Обновляет список серверов и их статусы."""
-    global servers, server_status
+    """Обновляет список серверов и их статусы из снимка реестра серверов."""
+    global servers, servers_snapshot, server_status
 
     try:
-        updated_servers = config_manager.get_all_servers(include_disabled=True)
-        if not updated_servers:
-            from extensions.server_checks import initialize_servers
-            updated_servers = initialize_servers()
-            for server in updated_servers:
-                server.setdefault("enabled", True)
-
-        servers = updated_servers
+        snapshot = server_registry.snapshot()
+        servers_snapshot = snapshot
+        servers = [dict(server) for server in snapshot.servers]
         current_ips = {server.get("ip") for server in servers if server.get("ip")}
 
         for ip in list(server_status.keys()):
@@ -127,6 +127,12 @@ def send_alert(message, force=False):
     ensure_alert_bot()
     return base_send_alert(message, force=force)
 
+def report_availability_event(event, ip, status, message):
+    """Передает событие доступности в агрегатор алертов lib.alerts."""
+    ensure_alerts_config()
+    ensure_alert_bot()
+    report_server_event(event, ip, status.get("name"), status.get("type"), message)
+
 def is_silent_time():
     """Использует единый механизм тихого режима из lib.alerts."""
     ensure_alerts_config()
@@ -169,48 +175,52 @@ def get_web_interface_url(config):
             monitor_ip = web_host
     return f"http://{monitor_ip}:{config.WEB_PORT}"
 
-def perform_manual_check(context, chat_id, progress_message_id):
-    """Выполняет проверку серверов с обновлением прогресса"""
+def run_availability_check():
+    """Полная проверка доступности (фоновая задача, общая для бота и веб-интерфейса)"""
     global last_check_time
 
-    # Ленивая загрузка серверов
-    global servers
-    if not servers:
-        from extensions.server_checks import initialize_servers
-        servers = initialize_servers()
+    results = get_current_server_status(progress_callback=report_progress)
+    last_check_time = datetime.now()
+    return results
 
-    total_servers = len(servers)
-    results = {"failed": [], "ok": []}
+def submit_availability_check():
+    """Запускает проверку доступности или возвращает уже выполняющуюся."""
+    return job_runner.submit("availability_check", run_availability_check, title="Проверка доступности серверов")
 
-    for i, server in enumerate(servers):
-        try:
-            progress = (i + 1) / total_servers * 100
-            progress_text = f"🔍 Проверяю серверы...\n{progress_bar(progress)}\n\n⏳ Проверяю {server['name']} ({server['ip']})..."
+def run_resources_check():
+    """
+    Новый снимок ресурсов (фоновая задача)
 
-            context.bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=progress_message_id,
-                text=progress_text
-            )
+    Обход идет через resource_cache, поэтому запрос из веб-интерфейса и
+    меню ресурсов бота, пришедшие одновременно, ждут один и тот же обход.
+    """
+    snapshot = resource_cache.get(force=True, progress_callback=report_progress)
+    return {
+        "taken_at": snapshot.taken_at.strftime("%H:%M:%S"),
+        "checked": len(snapshot.rows),
+        "success": len([row for row in snapshot.rows.values() if row["success"]]),
+    }
 
-            # Используем универсальную проверку
-            is_up = check_server_availability(server)
+def submit_resources_check():
+    """Запускает обход ресурсов или возвращает уже выполняющийся."""
+    return job_runner.submit("resources_check", run_resources_check, title="Проверка ресурсов")
 
-            if is_up:
-                results["ok"].append(server)
-                debug_log(f"✅ {server['name']} ({server['ip']}) - доступен")
-            else:
-                results["failed"].append(server)
-                debug_log(f"❌ {server['name']} ({server['ip']}) - недоступен")
+def perform_manual_check(context, chat_id, progress_message_id):
+    """Выполняет проверку серверов с обновлением прогресса"""
+    reporter = ProgressReporter(context.bot, chat_id, progress_message_id, "🔍 Проверяю серверы...")
 
-            time.sleep(1)
+    # Одновременные запросы из бота и веб-интерфейса ждут одну проверку
+    job, _ = submit_availability_check()
+    while not job.wait(1.0):
+        if job.progress:
+            reporter.update(*job.progress)
 
-        except Exception as e:
-            debug_log(f"💥 Критическая ошибка при проверке {server['ip']}: {e}")
-            results["failed"].append(server)
+    if job.status != JOB_DONE:
+        reporter.finish(f"❌ Проверка не выполнена: {job.error or 'задача отменена'}")
+        return
 
-    last_check_time = datetime.now()
-    send_check_results(context, chat_id, progress_message_id, results)
+    reporter.close()
+    send_check_results(context, chat_id, progress_message_id, job.result)
 
 def send_check_results(context, chat_id, progress_message_id, results):
     """Отправляет результаты проверки"""
@@ -261,8 +271,8 @@ def manual_check_handler(update, context):
     )
     thread.start()
 
-def get_current_server_status():
-    """Выполняет быструю проверку статуса серверов"""
+def get_current_server_status(progress_callback=None):
+    """Выполняет быструю проверку статуса серверов (параллельно)"""
     global servers
 
     # Переинициализируем серверы при каждом запросе
@@ -270,23 +280,17 @@ def get_current_server_status():
     servers = initialize_servers()
     debug_log(f"🔄 Обновлен список серверов: {len(servers)} серверов")
 
-    results = {"failed": [], "ok": []}
-
-    for server in servers:
-        try:
-            is_up = check_server_availability(server)
+    def on_result(server, is_up, done, total):
+        debug_log(f"🔍 {server['name']} ({server['ip']}) - {'🟢' if is_up else '🔴'}")
+        if progress_callback:
+            progress_callback(done / total * 100, f"⏳ Проверен {server['name']} ({done}/{total})")
 
-            if is_up:
-                results["ok"].append(server)
-            else:
-                results["failed"].append(server)
-
-            debug_log(f"🔍 {server['name']} ({server['ip']}) - {'🟢' if is_up else '🔴'}")
-
-        except Exception as e:
-            debug_log(f"❌ Ошибка проверки {server['name']}: {e}")
-            results["failed"].append(server)
+    results = {"failed": [], "ok": []}
+    sweep = run_sweep(servers, check_server_availability, on_result=on_result)
+    for server, is_up in sweep:
+        results["ok" if is_up else "failed"].append(server)
 
+    server_state.record_sweep(sweep)
     debug_log(f"📊 Итог проверки: {len(results['ok'])} доступно, {len(results['failed'])} недоступно")
     return results
 
@@ -309,7 +313,16 @@ def monitor_status(update, context):
         return
 
     try:
-        current_status = get_current_server_status()
+        # Статус строится из последнего обхода цикла мониторинга без новой проверки
+        from extensions.server_checks import initialize_servers
+        monitor_server_ip = getattr(config, "MONITOR_SERVER_IP", "")
+        all_servers = [s for s in initialize_servers() if s["ip"] != monitor_server_ip]
+        _, last_sweep, states = server_state.snapshot()
+        current_status = {"failed": [], "ok": []}
+        for server in all_servers:
+            state = states.get(server["ip"])
+            if state is not None:
+                current_status["ok" if state["up"] else "failed"].append(server)
         up_count = len(current_status["ok"])
         down_count = len(current_status["failed"])
 
@@ -331,13 +344,16 @@ def monitor_status(update, context):
             f"📊 *Статус мониторинга*\n\n"
             f"**Состояние:** {status}\n"
             f"**Режим:** {silent_status_text}\n\n"
-            f"⏰ Последняя проверка: {last_check_time.strftime('%H:%M:%S')}\n"
+            f"⏰ Последняя проверка: {last_sweep.strftime('%H:%M:%S') if last_sweep else 'еще не выполнялась'}\n"
             f"⏳ Следующая проверка: {next_check.strftime('%H:%M:%S')}\n"
-            f"🔢 Всего серверов: {len(servers)}\n"
+            f"🔢 Всего серверов: {len(all_servers)}\n"
             f"🟢 Доступно: {up_count}\n"
             f"🔴 Недоступно: {down_count}\n"
-            f"🔄 Интервал проверки: {config.CHECK_INTERVAL} сек\n\n"
         )
+        unknown_count = len(all_servers) - up_count - down_count
+        if unknown_count:
+            message += f"⏳ Нет данных: {unknown_count}\n"
+        message += f"🔄 Интервал проверки: {config.CHECK_INTERVAL} сек\n\n"
 
         # Информация о веб-интерфейсе
         from extensions.extension_manager import extension_manager
@@ -670,9 +686,11 @@ def check_cpu_resources_handler(update, context):
         parse_mode='Markdown'
     )
 
+    # Кнопка "Обновить" запрашивает новый обход в обход кэша
+    force = bool(query and query.data.endswith('_refresh'))
     thread = threading.Thread(
         target=perform_cpu_check,
-        args=(context, chat_id, progress_message.message_id)
+        args=(context, chat_id, progress_message.message_id, force)
     )
     thread.start()
 
@@ -706,9 +724,11 @@ def check_ram_resources_handler(update, context):
         parse_mode='Markdown'
     )
 
+    # Кнопка "Обновить" запрашивает новый обход в обход кэша
+    force = bool(query and query.data.endswith('_refresh'))
     thread = threading.Thread(
         target=perform_ram_check,
-        args=(context, chat_id, progress_message.message_id)
+        args=(context, chat_id, progress_message.message_id, force)
     )
     thread.start()
 
@@ -742,22 +762,19 @@ def check_disk_resources_handler(update, context):
         parse_mode='Markdown'
     )
 
+    # Кнопка "Обновить" запрашивает новый обход в обход кэша
+    force = bool(query and query.data.endswith('_refresh'))
     thread = threading.Thread(
         target=perform_disk_check,
-        args=(context, chat_id, progress_message.message_id)
+        args=(context, chat_id, progress_message.message_id, force)
     )
     thread.start()
 
-def perform_cpu_check(context, chat_id, progress_message_id):
-    """Выполняет проверку только CPU с детальным прогрессом"""
+def perform_cpu_check(context, chat_id, progress_message_id, force=False):
+    """Выполняет проверку только CPU по общему снимку ресурсов"""
 
-    def update_progress(progress, status):
-        progress_text = f"💻 Проверка CPU...\n{progress_bar(progress)}\n\n{status}"
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
-            text=progress_text
-        )
+    reporter = ProgressReporter(context.bot, chat_id, progress_message_id, "💻 Проверка CPU...")
+    update_progress = reporter.update
 
     try:
         update_progress(10, "⏳ Получаем список серверов...")
@@ -769,39 +786,20 @@ def perform_cpu_check(context, chat_id, progress_message_id):
         rdp_servers = [s for s in all_servers if s["type"] == "rdp"]
         servers = ssh_servers + rdp_servers
 
-        total_servers = len(servers)
-        cpu_results = []
-
-        update_progress(15, f"⏳ Начинаем проверку {total_servers} серверов...")
-
-        for i, server in enumerate(servers):
-            current_progress = 15 + (i / total_servers * 75)  # 15-90%
-            server_info = f"{server['name']} ({server['ip']})"
-            update_progress(current_progress, f"🔍 Проверяем {server_info}...")
+        # Ресурсы берутся из общего снимка, обход выполняется только если он устарел
+        snapshot = resource_cache.get(
+            force=force,
+            progress_callback=lambda progress, status: update_progress(15 + progress * 0.75, status),
+        )
 
-            try:
-                resources = None
-                if server["type"] == "ssh":
-                    from extensions.server_checks import get_linux_resources_improved
-                    resources = get_linux_resources_improved(server["ip"])
-                elif server["type"] == "rdp":
-                    from extensions.server_checks import get_windows_resources_improved
-                    resources = get_windows_resources_improved(server["ip"])
-
-                cpu_value = resources.get('cpu', 0) if resources else 0
-
-                cpu_results.append({
-                    "server": server,
-                    "cpu": cpu_value,
-                    "success": resources is not None
-                })
-
-            except Exception as e:
-                cpu_results.append({
-                    "server": server,
-                    "cpu": 0,
-                    "success": False
-                })
+        cpu_results = []
+        for result in snapshot.results(servers):
+            resources = result["resources"]
+            cpu_results.append({
+                "server": result["server"],
+                "cpu": resources.get('cpu', 0) if resources else 0,
+                "success": result["success"]
+            })
 
         update_progress(95, "⏳ Формируем отчет...")
 
@@ -864,15 +862,13 @@ def perform_cpu_check(context, chat_id, progress_message_id):
         message += f"• Высокая нагрузка (>80%): {high_load}\n"
         message += f"• Средняя нагрузка (60-80%): {medium_load}\n"
 
-        message += f"\n⏰ Обновлено: {datetime.now().strftime('%H:%M:%S')}"
+        message += f"\n⏰ Обновлено: {snapshot.taken_at.strftime('%H:%M:%S')}"
 
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=message,
             parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Обновить", callback_data='check_cpu')],
+                [InlineKeyboardButton("🔄 Обновить", callback_data='check_cpu_refresh')],
                 [InlineKeyboardButton("🧠 Проверить RAM", callback_data='check_ram')],
                 [InlineKeyboardButton("💾 Проверить Disk", callback_data='check_disk')],
                 [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu'),
@@ -883,22 +879,15 @@ def perform_cpu_check(context, chat_id, progress_message_id):
     except Exception as e:
         error_msg = f"❌ Ошибка при проверке CPU: {e}"
         debug_log(error_msg)
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=error_msg
         )
 
-def perform_ram_check(context, chat_id, progress_message_id):
-    """Выполняет проверку только RAM с детальным прогрессом"""
+def perform_ram_check(context, chat_id, progress_message_id, force=False):
+    """Выполняет проверку только RAM по общему снимку ресурсов"""
 
-    def update_progress(progress, status):
-        progress_text = f"🧠 Проверка RAM...\n{progress_bar(progress)}\n\n{status}"
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
-            text=progress_text
-        )
+    reporter = ProgressReporter(context.bot, chat_id, progress_message_id, "🧠 Проверка RAM...")
+    update_progress = reporter.update
 
     try:
         update_progress(10, "⏳ Получаем список серверов...")
@@ -910,39 +899,20 @@ def perform_ram_check(context, chat_id, progress_message_id):
         rdp_servers = [s for s in all_servers if s["type"] == "rdp"]
         servers = ssh_servers + rdp_servers
 
-        total_servers = len(servers)
-        ram_results = []
-
-        update_progress(15, f"⏳ Начинаем проверку {total_servers} серверов...")
-
-        for i, server in enumerate(servers):
-            current_progress = 15 + (i / total_servers * 75)  # 15-90%
-            server_info = f"{server['name']} ({server['ip']})"
-            update_progress(current_progress, f"🔍 Проверяем {server_info}...")
+        # Ресурсы берутся из общего снимка, обход выполняется только если он устарел
+        snapshot = resource_cache.get(
+            force=force,
+            progress_callback=lambda progress, status: update_progress(15 + progress * 0.75, status),
+        )
 
-            try:
-                resources = None
-                if server["type"] == "ssh":
-                    from extensions.server_checks import get_linux_resources_improved
-                    resources = get_linux_resources_improved(server["ip"])
-                elif server["type"] == "rdp":
-                    from extensions.server_checks import get_windows_resources_improved
-                    resources = get_windows_resources_improved(server["ip"])
-
-                ram_value = resources.get('ram', 0) if resources else 0
-
-                ram_results.append({
-                    "server": server,
-                    "ram": ram_value,
-                    "success": resources is not None
-                })
-
-            except Exception as e:
-                ram_results.append({
-                    "server": server,
-                    "ram": 0,
-                    "success": False
-                })
+        ram_results = []
+        for result in snapshot.results(servers):
+            resources = result["resources"]
+            ram_results.append({
+                "server": result["server"],
+                "ram": resources.get('ram', 0) if resources else 0,
+                "success": result["success"]
+            })
 
         update_progress(95, "⏳ Формируем отчет...")
 
@@ -1005,15 +975,13 @@ def perform_ram_check(context, chat_id, progress_message_id):
         message += f"• Высокое использование (>85%): {high_usage}\n"
         message += f"• Среднее использование (70-85%): {medium_usage}\n"
 
-        message += f"\n⏰ Обновлено: {datetime.now().strftime('%H:%M:%S')}"
+        message += f"\n⏰ Обновлено: {snapshot.taken_at.strftime('%H:%M:%S')}"
 
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=message,
             parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Обновить", callback_data='check_ram')],
+                [InlineKeyboardButton("🔄 Обновить", callback_data='check_ram_refresh')],
                 [InlineKeyboardButton("💻 Проверить CPU", callback_data='check_cpu')],
                 [InlineKeyboardButton("💾 Проверить Disk", callback_data='check_disk')],
                 [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu'),
@@ -1024,22 +992,15 @@ def perform_ram_check(context, chat_id, progress_message_id):
     except Exception as e:
         error_msg = f"❌ Ошибка при проверке RAM: {e}"
         debug_log(error_msg)
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=error_msg
         )
 
-def perform_disk_check(context, chat_id, progress_message_id):
-    """Выполняет проверку только Disk с детальным прогрессом"""
+def perform_disk_check(context, chat_id, progress_message_id, force=False):
+    """Выполняет проверку только Disk по общему снимку ресурсов"""
 
-    def update_progress(progress, status):
-        progress_text = f"💾 Проверка Disk...\n{progress_bar(progress)}\n\n{status}"
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
-            text=progress_text
-        )
+    reporter = ProgressReporter(context.bot, chat_id, progress_message_id, "💾 Проверка Disk...")
+    update_progress = reporter.update
 
     try:
         update_progress(10, "⏳ Получаем список серверов...")
@@ -1051,39 +1012,20 @@ def perform_disk_check(context, chat_id, progress_message_id):
         rdp_servers = [s for s in all_servers if s["type"] == "rdp"]
         servers = ssh_servers + rdp_servers
 
-        total_servers = len(servers)
-        disk_results = []
-
-        update_progress(15, f"⏳ Начинаем проверку {total_servers} серверов...")
-
-        for i, server in enumerate(servers):
-            current_progress = 15 + (i / total_servers * 75)  # 15-90%
-            server_info = f"{server['name']} ({server['ip']})"
-            update_progress(current_progress, f"🔍 Проверяем {server_info}...")
+        # Ресурсы берутся из общего снимка, обход выполняется только если он устарел
+        snapshot = resource_cache.get(
+            force=force,
+            progress_callback=lambda progress, status: update_progress(15 + progress * 0.75, status),
+        )
 
-            try:
-                resources = None
-                if server["type"] == "ssh":
-                    from extensions.server_checks import get_linux_resources_improved
-                    resources = get_linux_resources_improved(server["ip"])
-                elif server["type"] == "rdp":
-                    from extensions.server_checks import get_windows_resources_improved
-                    resources = get_windows_resources_improved(server["ip"])
-
-                disk_value = resources.get('disk', 0) if resources else 0
-
-                disk_results.append({
-                    "server": server,
-                    "disk": disk_value,
-                    "success": resources is not None
-                })
-
-            except Exception as e:
-                disk_results.append({
-                    "server": server,
-                    "disk": 0,
-                    "success": False
-                })
+        disk_results = []
+        for result in snapshot.results(servers):
+            resources = result["resources"]
+            disk_results.append({
+                "server": result["server"],
+                "disk": resources.get('disk', 0) if resources else 0,
+                "success": result["success"]
+            })
 
         update_progress(95, "⏳ Формируем отчет...")
 
@@ -1146,15 +1088,13 @@ def perform_disk_check(context, chat_id, progress_message_id):
         message += f"• Критическое использование (>90%): {critical_usage}\n"
         message += f"• Предупреждение (80-90%): {warning_usage}\n"
 
-        message += f"\n⏰ Обновлено: {datetime.now().strftime('%H:%M:%S')}"
+        message += f"\n⏰ Обновлено: {snapshot.taken_at.strftime('%H:%M:%S')}"
 
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=message,
             parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Обновить", callback_data='check_disk')],
+                [InlineKeyboardButton("🔄 Обновить", callback_data='check_disk_refresh')],
                 [InlineKeyboardButton("💻 Проверить CPU", callback_data='check_cpu')],
                 [InlineKeyboardButton("🧠 Проверить RAM", callback_data='check_ram')],
                 [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu'),
@@ -1165,9 +1105,7 @@ def perform_disk_check(context, chat_id, progress_message_id):
     except Exception as e:
         error_msg = f"❌ Ошибка при проверке Disk: {e}"
         debug_log(error_msg)
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=error_msg
         )
 
@@ -1201,27 +1139,24 @@ def check_linux_resources_handler(update, context):
         parse_mode='Markdown'
     )
 
+    # Кнопка "Обновить" запрашивает новый обход в обход кэша
+    force = bool(query and query.data.endswith('_refresh'))
     thread = threading.Thread(
         target=perform_linux_check,
-        args=(context, chat_id, progress_message.message_id)
+        args=(context, chat_id, progress_message.message_id, force)
     )
     thread.start()
 
-def perform_linux_check(context, chat_id, progress_message_id):
-    """Выполняет проверку Linux серверов с прогрессом"""
+def perform_linux_check(context, chat_id, progress_message_id, force=False):
+    """Выполняет проверку Linux серверов по общему снимку ресурсов"""
 
-    def update_progress(progress, status):
-        progress_text = f"🐧 Проверка Linux серверов...\n{progress_bar(progress)}\n\n{status}"
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
-            text=progress_text
-        )
+    reporter = ProgressReporter(context.bot, chat_id, progress_message_id, "🐧 Проверка Linux серверов...")
+    update_progress = reporter.update
 
     try:
         from extensions.server_checks import check_linux_servers
         update_progress(0, "⏳ Подготовка...")
-        results, total_servers = check_linux_servers(update_progress)
+        results, total_servers, snapshot = check_linux_servers(update_progress, force=force)
 
         message = f"🐧 **Проверка Linux серверов**\n\n"
         successful_checks = len([r for r in results if r["success"]])
@@ -1239,15 +1174,13 @@ def perform_linux_check(context, chat_id, progress_message_id):
             else:
                 message += f"🔴 {server_name}: недоступен\n"
 
-        message += f"\n⏰ Обновлено: {datetime.now().strftime('%H:%M:%S')}"
+        message += f"\n⏰ Обновлено: {snapshot.taken_at.strftime('%H:%M:%S')}"
 
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=message,
             parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Обновить", callback_data='check_linux')],
+                [InlineKeyboardButton("🔄 Обновить", callback_data='check_linux_refresh')],
                 [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu'),
                  InlineKeyboardButton("✖️ Закрыть", callback_data='close')]
             ])
@@ -1256,9 +1189,7 @@ def perform_linux_check(context, chat_id, progress_message_id):
     except Exception as e:
         error_msg = f"❌ Ошибка при проверке Linux серверов: {e}"
         debug_log(error_msg)
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=error_msg
         )
 
@@ -1292,22 +1223,19 @@ def check_windows_resources_handler(update, context):
         parse_mode='Markdown'
     )
 
+    # Кнопка "Обновить" запрашивает новый обход в обход кэша
+    force = bool(query and query.data.endswith('_refresh'))
     thread = threading.Thread(
         target=perform_windows_check,
-        args=(context, chat_id, progress_message.message_id)
+        args=(context, chat_id, progress_message.message_id, force)
     )
     thread.start()
 
-def perform_windows_check(context, chat_id, progress_message_id):
-    """Выполняет проверку Windows серверов с прогрессом"""
+def perform_windows_check(context, chat_id, progress_message_id, force=False):
+    """Выполняет проверку Windows серверов по общему снимку ресурсов"""
 
-    def update_progress(progress, status):
-        progress_text = f"🪟 Проверка Windows серверов...\n{progress_bar(progress)}\n\n{status}"
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
-            text=progress_text
-        )
+    reporter = ProgressReporter(context.bot, chat_id, progress_message_id, "🪟 Проверка Windows серверов...")
+    update_progress = reporter.update
 
     def safe_get(resources, key, default=0):
         """Безопасное получение значения из resources"""
@@ -1326,11 +1254,14 @@ def perform_windows_check(context, chat_id, progress_message_id):
 
         update_progress(0, "⏳ Подготовка...")
 
+        # Один снимок на все группы, группы ниже берут данные из него
+        snapshot = resource_cache.get(force=force, progress_callback=update_progress)
+
         # Проверяем все типы Windows серверов
-        win2025_results, win2025_total = check_windows_2025_servers(update_progress)
-        domain_results, domain_total = check_domain_windows_servers(update_progress)
-        admin_results, admin_total = check_admin_windows_servers(update_progress)
-        win_std_results, win_std_total = check_standard_windows_servers(update_progress)
+        win2025_results, win2025_total = check_windows_2025_servers()
+        domain_results, domain_total = check_domain_windows_servers()
+        admin_results, admin_total = check_admin_windows_servers()
+        win_std_results, win_std_total = check_standard_windows_servers()
 
         message = f"🪟 **Проверка Windows серверов**\n\n"
 
@@ -1398,15 +1329,13 @@ def perform_windows_check(context, chat_id, progress_message_id):
             disk_info = f", Disk {disk_value}%" if disk_value > 0 else ""
             message += f"{status} {server['name']}: CPU {cpu_value}%, RAM {ram_value}%{disk_info}\n"
 
-        message += f"\n⏰ Обновлено: {datetime.now().strftime('%H:%M:%S')}"
+        message += f"\n⏰ Обновлено: {snapshot.taken_at.strftime('%H:%M:%S')}"
 
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=message,
             parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Обновить", callback_data='check_windows')],
+                [InlineKeyboardButton("🔄 Обновить", callback_data='check_windows_refresh')],
                 [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu'),
                 InlineKeyboardButton("✖️ Закрыть", callback_data='close')]
             ])
@@ -1417,9 +1346,7 @@ def perform_windows_check(context, chat_id, progress_message_id):
         debug_log(error_msg)
         import traceback
         debug_log(f"Подробности ошибки: {traceback.format_exc()}")
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=error_msg
         )
 
@@ -1531,27 +1458,24 @@ def check_all_resources_handler(update, context):
         parse_mode='Markdown'
     )
 
+    # Кнопка "Обновить" запрашивает новый обход в обход кэша
+    force = bool(query and query.data.endswith('_refresh'))
     thread = threading.Thread(
         target=perform_full_check,
-        args=(context, chat_id, progress_message.message_id)
+        args=(context, chat_id, progress_message.message_id, force)
     )
     thread.start()
 
-def perform_full_check(context, chat_id, progress_message_id):
-    """Выполняет полную проверку всех серверов"""
+def perform_full_check(context, chat_id, progress_message_id, force=False):
+    """Выполняет полную проверку всех серверов по общему снимку ресурсов"""
 
-    def update_progress(progress, status):
-        progress_text = f"🔍 Полная проверка всех серверов...\n{progress_bar(progress)}\n\n{status}"
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
-            text=progress_text
-        )
+    reporter = ProgressReporter(context.bot, chat_id, progress_message_id, "🔍 Полная проверка всех серверов...")
+    update_progress = reporter.update
 
     try:
         update_progress(10, "⏳ Подготовка...")
         from extensions.server_checks import check_all_servers_by_type
-        results, stats = check_all_servers_by_type()
+        results, stats, snapshot = check_all_servers_by_type(force=force, progress_callback=update_progress)
 
         total_checked = stats["windows_2025"]["checked"] + stats["standard_windows"]["checked"] + stats["linux"]["checked"]
         total_success = stats["windows_2025"]["success"] + stats["standard_windows"]["success"] + stats["linux"]["success"]
@@ -1563,15 +1487,13 @@ def perform_full_check(context, chat_id, progress_message_id):
         message += f"**Обычные Windows:** {stats['standard_windows']['success']}/{stats['standard_windows']['checked']}\n"
         message += f"**Linux:** {stats['linux']['success']}/{stats['linux']['checked']}\n"
 
-        message += f"\n⏰ Обновлено: {datetime.now().strftime('%H:%M:%S')}"
+        message += f"\n⏰ Обновлено: {snapshot.taken_at.strftime('%H:%M:%S')}"
 
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=message,
             parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Обновить", callback_data='check_all_resources')],
+                [InlineKeyboardButton("🔄 Обновить", callback_data='check_all_resources_refresh')],
                 [InlineKeyboardButton("↩️ Назад", callback_data='check_resources')],
                 [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu'),
                  InlineKeyboardButton("✖️ Закрыть", callback_data='close')]
@@ -1581,9 +1503,7 @@ def perform_full_check(context, chat_id, progress_message_id):
     except Exception as e:
         error_msg = f"❌ Ошибка при полной проверке: {e}"
         debug_log(error_msg)
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=progress_message_id,
+        reporter.finish(
             text=error_msg
         )
 
@@ -1707,6 +1627,8 @@ def start_monitoring():
 
             refresh_servers()
 
+            to_check = []
+            monitor_servers = []
             for server in servers:
                 try:
                     ip = server["ip"]
@@ -1715,6 +1637,7 @@ def start_monitoring():
                     # ПОЛНОСТЬЮ ИСКЛЮЧАЕМ сервер мониторинга из любых проверок
                     if ip == monitor_server_ip:
                         server_status[ip]["last_up"] = current_time
+                        monitor_servers.append((server, True))
                         continue
 
                     monitoring_enabled = is_server_monitoring_enabled(ip)
@@ -1727,8 +1650,18 @@ def start_monitoring():
                         server_status[ip]["alert_sent"] = False
                         server_status[ip]["last_alert"] = {}
 
-                    # Проверка доступности
-                    is_up = check_server_availability(server)
+                    to_check.append(server)
+
+                except Exception as e:
+                    debug_log(f"❌ Ошибка мониторинга {server['name']}: {e}")
+
+            # Проверка доступности параллельно, обработка статусов по порядку
+            sweep = run_sweep(to_check, check_server_availability)
+            server_state.record_sweep(monitor_servers + sweep, current_time)
+            for server, is_up in sweep:
+                try:
+                    ip = server["ip"]
+                    status = server_status[ip]
 
                     if is_up:
                         handle_server_up(ip, status, current_time)
@@ -1748,11 +1681,12 @@ def handle_server_up(ip, status, current_time):
     if status.get("alert_sent"):
         if last_up:
             downtime = (current_time - last_up).total_seconds()
-            send_alert(
+            report_availability_event(
+                "up", ip, status,
                 f"✅ {status['name']} ({ip}) доступен (простой: {int(downtime // 60)} мин)"
             )
         else:
-            send_alert(f"✅ {status['name']} ({ip}) доступен")
+            report_availability_event("up", ip, status, f"✅ {status['name']} ({ip}) доступен")
 
     server_status[ip] = {
         "last_up": current_time,
@@ -1778,7 +1712,10 @@ def handle_server_down(ip, status, current_time):
     downtime = (current_time - last_up).total_seconds()
 
     if downtime >= config.MAX_FAIL_TIME and not status.get("alert_sent"):
-        send_alert(f"🚨 {status['name']} ({ip}) не отвечает (проверка: {status['type'].upper()})")
+        report_availability_event(
+            "down", ip, status,
+            f"🚨 {status['name']} ({ip}) не отвечает (проверка: {status['type'].upper()})"
+        )
         server_status[ip]["alert_sent"] = True
 
 def check_resources_automatically():
@@ -1796,28 +1733,43 @@ def check_resources_automatically():
         return
 
     current_time = datetime.now()
+    config = get_config()
+
+    def _collect(server):
+        """Получает текущие ресурсы одного сервера"""
+        debug_log(f"🔍 Проверяем ресурсы {server['name']} ({server['ip']})")
+        if server["type"] == "ssh":
+            from extensions.server_checks import get_linux_resources_improved
+            return get_linux_resources_improved(server["ip"])
+        if server["type"] == "rdp":
+            from extensions.server_checks import get_windows_resources_improved
+            return get_windows_resources_improved(server["ip"])
+        return None
+
+    # Проверяем все серверы параллельно с общим лимитом времени
+    to_check = [server for server in servers if is_server_monitoring_enabled(server["ip"])]
+    results = run_sweep(
+        to_check,
+        _collect,
+        max_workers=config.RESOURCE_WORKERS,
+        default=None,
+        deadline=config.RESOURCE_SWEEP_DEADLINE,
+        timeout_result=RESOURCE_TIMED_OUT,
+    )
+
+    # Алерты оцениваются после получения всех результатов
     alerts_found = []
+    timed_out = []
 
-    # Проверяем все серверы
-    for server in servers:
+    for server, current_resources in results:
         try:
             ip = server["ip"]
             server_name = server["name"]
 
-            if not is_server_monitoring_enabled(ip):
+            if current_resources == RESOURCE_TIMED_OUT:
+                timed_out.append(server_name)
                 continue
 
-            debug_log(f"🔍 Проверяем ресурсы {server_name} ({ip})")
-
-            # Получаем текущие ресурсы
-            current_resources = None
-            if server["type"] == "ssh":
-                from extensions.server_checks import get_linux_resources_improved
-                current_resources = get_linux_resources_improved(ip)
-            elif server["type"] == "rdp":
-                from extensions.server_checks import get_windows_resources_improved
-                current_resources = get_windows_resources_improved(ip)
-
             if not current_resources:
                 continue
 
@@ -1840,6 +1792,9 @@ def check_resources_automatically():
             if len(resource_history[ip]) > 10:
                 resource_history[ip] = resource_history[ip][-10:]
 
+            # Полная история хранится в хранилище метрик
+            metrics_store.record(ip, dict(current_resources, server_name=server_name))
+
             # Проверяем условия для алертов
             server_alerts = check_resource_alerts(ip, resource_entry)
 
@@ -1851,6 +1806,17 @@ def check_resources_automatically():
             debug_log(f"❌ Ошибка при проверке ресурсов {server['name']}: {e}")
             continue
 
+    metrics_store.flush()
+
+    # Меню бота и веб-интерфейс используют этот обход, пока он свежий
+    resource_cache.publish([
+        (server, result if result == RESOURCE_TIMED_OUT else (result is not None, result))
+        for server, result in results
+    ])
+
+    if timed_out:
+        debug_log(f"⏱️ Ресурсы не получены за отведенное время: {', '.join(timed_out)}")
+
     # Отправляем алерты если есть
     if alerts_found:
         send_resource_alerts(alerts_found)
@@ -1993,30 +1959,30 @@ def send_morning_report_handler(update, context):
             update.message.reply_text("⛔ У вас нет прав для выполнения этой команды")
         return
 
-    try:
-        from modules.morning_report import morning_report
+    from modules.morning_report import morning_report
 
-        # Генерируем отчёт (ручной запуск)
-        report_text = morning_report.force_report()
+    def deliver(job):
+        if job.status != JOB_DONE:
+            debug_log(f"❌ Ошибка формирования/отправки утреннего отчёта: {job.error or 'задача отменена'}")
+            if query:
+                query.edit_message_text("❌ Ошибка формирования отчёта")
+            else:
+                update.message.reply_text("❌ Ошибка формирования отчёта")
+            return
 
         # Отправляем в текущий чат (как отдельное сообщение — надёжнее, чем edit)
         context.bot.send_message(
             chat_id=chat_id,
-            text=report_text,
+            text=job.result,
             parse_mode="Markdown"
         )
 
         if not query:
             update.message.reply_text("📊 Отчет отправлен")
 
-    except Exception as e:
-        debug_log(f"❌ Ошибка формирования/отправки утреннего отчёта: {e}")
-        import traceback
-        debug_log(f"💥 Traceback:\n{traceback.format_exc()}")
-        if query:
-            query.edit_message_text("❌ Ошибка формирования отчёта")
-        else:
-            update.message.reply_text("❌ Ошибка формирования отчёта")
+    # Отчёт формируется в фоне; одновременные запросы получают один и тот же отчёт
+    job, _ = job_runner.submit("report_text", morning_report.force_report, title="Формирование отчета")
+    job.on_done(deliver)
 
 def send_morning_report(manual_call=False):
     """Отправляет утренний отчет о доступности серверов и бэкапах
@@ -2505,15 +2471,30 @@ def resource_history_command(update, context):
 
     message = "📈 *История ресурсов*\n\n"
 
-    if not resource_history:
+    try:
+        stored_servers = metrics_store.get_servers()
+    except Exception as e:
+        debug_log(f"❌ Ошибка чтения истории ресурсов: {e}")
+        stored_servers = []
+
+    if not stored_servers:
         message += "История ресурсов пуста\n"
     else:
-        for ip, history in list(resource_history.items())[:5]:  # Показываем первые 5 серверов
-            server_name = history[0]["server_name"] if history else "Неизвестно"
-            message += f"**{server_name}** ({ip}):\n"
-
-            for entry in history[-3:]:  # Последние 3 записи
-                message += f"• {entry['timestamp'].strftime('%H:%M')}: CPU {entry['cpu']}%, RAM {entry['ram']}%, Disk {entry['disk']}%\n"
+        week_ago = time.time() - 7 * 86400
+        for server in stored_servers[:5]:  # Показываем первые 5 серверов
+            ip = server["ip"]
+            message += f"**{server['name']}** ({ip}):\n"
+
+            for entry in metrics_store.get_recent(ip, 3):  # Последние 3 записи
+                message += f"• {entry['timestamp'].strftime('%d.%m %H:%M')}: CPU {entry['cpu']}%, RAM {entry['ram']}%, Disk {entry['disk']}%\n"
+
+            summary = metrics_store.get_summary(ip, since=week_ago)
+            if summary:
+                message += (
+                    f"• 7 дней: CPU ср {summary['cpu_avg']}% / макс {summary['cpu_max']}%, "
+                    f"RAM ср {summary['ram_avg']}% / макс {summary['ram_max']}%, "
+                    f"Disk макс {summary['disk_max']}%\n"
+                )
             message += "\n"
 
     query.edit_message_text(message, parse_mode='Markdown')
@@ -0,0 +1,269 @@
+"""
+/core/resource_cache.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Shared fleet resource snapshot cache
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Общий кэш снимка ресурсов серверов
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lib.logging import debug_log
+from core.live_events import live_events
+from core.sweep import run_sweep, RESOURCE_TIMED_OUT
+
+# Типы серверов, у которых собираются ресурсы
+RESOURCE_SERVER_TYPES = ("ssh", "rdp")
+
+# Поля ресурсов, изменения которых отправляются в веб-интерфейс
+LIVE_RESOURCE_FIELDS = ("cpu", "ram", "disk", "load_avg", "uptime", "os")
+
+
+def _live_row(resources: Dict) -> Dict:
+    """Ресурсы сервера в виде для веб-интерфейса."""
+    row = {}
+    for field in LIVE_RESOURCE_FIELDS:
+        value = resources.get(field)
+        row[field] = round(value, 1) if isinstance(value, float) else value
+    return row
+
+
+class FleetSnapshot:
+    """Неизменяемый снимок ресурсов серверов на момент обхода"""
+
+    def __init__(self, rows: Dict[str, Dict], duration: float = 0.0):
+        """
+        Args:
+            rows: IP -> {"server", "resources", "success", "timed_out"}
+            duration: Длительность обхода, секунды
+        """
+        self.rows = rows
+        self.duration = duration
+        self.taken_at = datetime.now()
+        self.created = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        """Возраст снимка, секунды."""
+        return time.monotonic() - self.created
+
+    def get(self, ip: str) -> Optional[Dict]:
+        """Ресурсы сервера или None, если они не получены."""
+        row = self.rows.get(ip)
+        return row["resources"] if row else None
+
+    def results(self, servers: List[Dict]) -> List[Dict]:
+        """
+        Результаты в порядке servers (формат check_linux_servers)
+
+        Серверы, которых нет в снимке (добавлены после обхода), считаются
+        непроверенными.
+        """
+        results = []
+        for server in servers:
+            row = self.rows.get(server["ip"])
+            results.append({
+                "server": server,
+                "resources": row["resources"] if row else None,
+                "success": row["success"] if row else False,
+                "timed_out": row["timed_out"] if row else False,
+            })
+        return results
+
+
+class _Flight:
+    """Выполняющийся обход, результат которого ждут все запросившие"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.snapshot: Optional[FleetSnapshot] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResourceSnapshotCache:
+    """
+    Кэш ресурсов всех серверов
+
+    Меню CPU/RAM/Disk/Linux/Windows и веб-интерфейс берут данные из одного
+    снимка, пока он моложе RESOURCE_SNAPSHOT_TTL. Одновременные запросы
+    устаревшего снимка не запускают параллельные обходы: обход выполняет
+    первый запросивший, остальные ждут его результат. Автоматическая
+    проверка ресурсов публикует свой обход в кэш через publish().
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        """
+        Args:
+            ttl: Время жизни снимка (по умолчанию RESOURCE_SNAPSHOT_TTL)
+        """
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[FleetSnapshot] = None
+        self._flight: Optional[_Flight] = None
+
+    @property
+    def ttl(self) -> float:
+        if self._ttl is not None:
+            return self._ttl
+        try:
+            from config.db_settings import RESOURCE_SNAPSHOT_TTL
+            return float(RESOURCE_SNAPSHOT_TTL)
+        except Exception:
+            return 120.0
+
+    @staticmethod
+    def _servers() -> List[Dict]:
+        """Активные серверы, у которых собираются ресурсы."""
+        from extensions.server_checks import initialize_servers
+        return [server for server in initialize_servers() if server["type"] in RESOURCE_SERVER_TYPES]
+
+    def peek(self) -> Optional[FleetSnapshot]:
+        """Текущий снимок без проверки срока жизни."""
+        with self._lock:
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """Сбрасывает снимок, следующий запрос выполнит обход."""
+        with self._lock:
+            self._snapshot = None
+
+    def get(
+        self,
+        force: bool = False,
+        progress_callback: Optional[Callable[[float, str], None]] = None,
+    ) -> FleetSnapshot:
+        """
+        Возвращает снимок ресурсов
+
+        Args:
+            force: Выполнить новый обход независимо от возраста снимка
+                (кнопка "Обновить"); если обход уже идет, используется он
+            progress_callback: progress_callback(процент, статус) во время обхода
+
+        Returns:
+            FleetSnapshot: Снимок ресурсов
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if not force and snapshot is not None and snapshot.age < self.ttl:
+                return snapshot
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+
+        if not leader:
+            if progress_callback:
+                progress_callback(50, "⏳ Ожидаем результаты уже запущенной проверки...")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.snapshot
+
+        try:
+            flight.snapshot = self._sweep(progress_callback)
+            return flight.snapshot
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                previous = self._snapshot
+                if flight.snapshot is not None:
+                    self._snapshot = flight.snapshot
+                self._flight = None
+            flight.done.set()
+            if flight.snapshot is not None:
+                self._announce(previous, flight.snapshot)
+
+    def _sweep(self, progress_callback: Optional[Callable[[float, str], None]]) -> FleetSnapshot:
+        """Обходит серверы и сохраняет ресурсы в хранилище метрик."""
+        from config.db_settings import RESOURCE_WORKERS, RESOURCE_SWEEP_DEADLINE
+        from core.metrics_store import metrics_store
+        from modules.resources import resources_checker
+
+        servers = self._servers()
+
+        def on_result(server, result, done, total):
+            if progress_callback:
+                progress_callback(done / total * 100, f"🔍 Проверен {server['name']} ({done}/{total})")
+
+        started = time.monotonic()
+        sweep = run_sweep(
+            servers,
+            resources_checker.check_server_resources,
+            max_workers=RESOURCE_WORKERS,
+            default=(False, None),
+            deadline=RESOURCE_SWEEP_DEADLINE,
+            timeout_result=RESOURCE_TIMED_OUT,
+            on_result=on_result,
+        )
+
+        for server, result in sweep:
+            if result != RESOURCE_TIMED_OUT and result[0] and result[1]:
+                metrics_store.record(server["ip"], result[1])
+        metrics_store.flush()
+
+        snapshot = self._build(sweep, time.monotonic() - started)
+        debug_log(f"📸 Снимок ресурсов {len(servers)} серверов собран за {snapshot.duration:.1f} сек")
+        return snapshot
+
+    @staticmethod
+    def _build(sweep: List[Tuple[Dict, object]], duration: float) -> FleetSnapshot:
+        """Строит снимок из результатов run_sweep с check_server_resources."""
+        rows = {}
+        for server, result in sweep:
+            timed_out = result == RESOURCE_TIMED_OUT
+            success, resources = (False, None) if timed_out else result
+            rows[server["ip"]] = {
+                "server": server,
+                "resources": resources if success else None,
+                "success": bool(success and resources is not None),
+                "timed_out": timed_out,
+            }
+        return FleetSnapshot(rows, duration)
+
+    def publish(self, sweep: List[Tuple[Dict, object]], duration: float = 0.0) -> None:
+        """
+        Сохраняет как снимок результаты обхода, выполненного в другом месте
+
+        Args:
+            sweep: Пары (сервер, результат check_server_resources или RESOURCE_TIMED_OUT)
+            duration: Длительность обхода, секунды
+        """
+        snapshot = self._build(
+            [(server, result) for server, result in sweep if server.get("type") in RESOURCE_SERVER_TYPES],
+            duration,
+        )
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+        self._announce(previous, snapshot)
+
+    @staticmethod
+    def _announce(previous: Optional[FleetSnapshot], snapshot: FleetSnapshot) -> None:
+        """Публикует в ленту событий ресурсы, изменившиеся с прошлого снимка."""
+        changed = {}
+        for ip, row in snapshot.rows.items():
+            if not row["resources"]:
+                continue
+            live = _live_row(row["resources"])
+            old = previous.get(ip) if previous is not None else None
+            if old is None or _live_row(old) != live:
+                changed[ip] = live
+        live_events.publish("resources", {
+            "taken_at": snapshot.taken_at.strftime("%H:%M:%S"),
+            "servers": changed,
+        })
+
+
+# Глобальный экземпляр кэша ресурсов
+resource_cache = ResourceSnapshotCache()
@@ -0,0 +1,208 @@
+"""
+/core/server_registry.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Indexed in-memory server registry
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Индексированный реестр серверов в памяти
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+from lib.logging import debug_log, error_log
+from core.config_manager import config_manager
+
+# Порядок типов как в исходном списке серверов: Windows, Linux, ping
+TYPE_ORDER = ("rdp", "ssh", "ping")
+
+# Страховка от изменений в обход ConfigManager (правка БД вручную, другой процесс)
+SNAPSHOT_MAX_AGE = 300
+
+
+class ServerSnapshot:
+    """Неизменяемый снимок конфигурации серверов с индексами"""
+
+    def __init__(self, servers: List[Dict], group_members: Dict[str, List[str]], version: int):
+        """
+        Строит индексы по IP, имени, типу и группе Windows
+
+        Args:
+            servers: Список серверов (ip, name, type, credentials, timeout, enabled)
+            group_members: IP адреса по группам Windows
+            version: Номер версии реестра
+        """
+        self.version = version
+        self.created = time.monotonic()
+        self.servers = servers
+        self.windows_groups: Dict[str, str] = {}
+        for group, ips in group_members.items():
+            for ip in ips:
+                self.windows_groups.setdefault(ip, group)
+        self.by_ip: Dict[str, Dict] = {}
+        self.by_name: Dict[str, Dict] = {}
+        self.by_type: Dict[str, List[Dict]] = {}
+        self.by_group: Dict[str, List[Dict]] = {}
+
+        for server in servers:
+            ip = server["ip"]
+            self.by_ip[ip] = server
+            # При совпадении имен приоритет у активного сервера
+            existing = self.by_name.get(server["name"])
+            if existing is None or (not existing.get("enabled", True) and server.get("enabled", True)):
+                self.by_name[server["name"]] = server
+            self.by_type.setdefault(server["type"], []).append(server)
+
+        for group, ips in group_members.items():
+            self.by_group[group] = [self.by_ip[ip] for ip in ips if ip in self.by_ip]
+
+    def is_enabled(self, ip: str) -> bool:
+        """Статус мониторинга сервера (неизвестные серверы считаются активными)."""
+        server = self.by_ip.get(ip)
+        return True if server is None else server.get("enabled", True)
+
+
+class ServerRegistry:
+    """Реестр серверов с O(1) поиском, сбрасывается при изменении серверов в ConfigManager"""
+
+    def __init__(self, max_age: int = SNAPSHOT_MAX_AGE):
+        """Инициализация реестра"""
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ServerSnapshot] = None
+        self._version = 0
+        config_manager.add_servers_listener(self.invalidate)
+
+    def invalidate(self) -> None:
+        """Сбрасывает снимок, следующий запрос перечитает конфигурацию."""
+        with self._lock:
+            self._snapshot = None
+            self._version += 1
+        debug_log("🔄 Реестр серверов сброшен")
+
+    @staticmethod
+    def _load_servers() -> List[Dict]:
+        """Читает серверы из БД, при пустой БД - из SERVER_CONFIG."""
+        servers = []
+        try:
+            from config.db_settings import USE_DB
+            if USE_DB:
+                servers = config_manager.get_all_servers(include_disabled=True)
+        except Exception as e:
+            error_log(f"Ошибка загрузки серверов в реестр: {e}")
+
+        if not servers:
+            try:
+                from config.db_settings import SERVER_CONFIG
+            except Exception:
+                SERVER_CONFIG = {}
+            type_by_section = {
+                "windows_servers": "rdp",
+                "linux_servers": "ssh",
+                "ping_servers": "ping",
+            }
+            for section, server_type in type_by_section.items():
+                for ip, name in (SERVER_CONFIG.get(section) or {}).items():
+                    servers.append({
+                        "ip": ip,
+                        "name": name,
+                        "type": server_type,
+                        "credentials": [],
+                        "timeout": None,
+                        "enabled": True,
+                    })
+            if not servers:
+                debug_log("⚠️ Конфигурация серверов пуста")
+
+        def sort_key(server: Dict):
+            server_type = server.get("type")
+            rank = TYPE_ORDER.index(server_type) if server_type in TYPE_ORDER else len(TYPE_ORDER)
+            return rank, server.get("name") or ""
+
+        return sorted(servers, key=sort_key)
+
+    @staticmethod
+    def _load_windows_groups() -> Dict[str, List[str]]:
+        """Читает состав групп Windows серверов."""
+        groups = {}
+        try:
+            from config.db_settings import WINDOWS_SERVER_CREDENTIALS
+            for group, config in WINDOWS_SERVER_CREDENTIALS.items():
+                groups[group] = list(config.get("servers", []))
+        except Exception as e:
+            error_log(f"Ошибка загрузки групп Windows серверов: {e}")
+        return groups
+
+    def snapshot(self) -> ServerSnapshot:
+        """
+        Возвращает текущий снимок конфигурации серверов
+
+        Снимок не меняется после создания, поэтому его можно использовать
+        как согласованное состояние на весь цикл проверки.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot.created < self.max_age:
+                return snapshot
+            version = self._version
+
+        servers = self._load_servers()
+        groups = self._load_windows_groups()
+        snapshot = ServerSnapshot(servers, groups, version)
+
+        with self._lock:
+            # Если реестр сбросили во время загрузки, снимок не сохраняем
+            if self._version == version:
+                self._snapshot = snapshot
+        debug_log(f"✅ Реестр серверов загружен: {len(servers)} серверов")
+        return snapshot
+
+    # === ПОИСК ===
+
+    def get_servers(self, include_disabled: bool = False) -> List[Dict]:
+        """Список серверов (копии записей)."""
+        return [
+            dict(server) for server in self.snapshot().servers
+            if include_disabled or server.get("enabled", True)
+        ]
+
+    def get_by_ip(self, ip: str) -> Optional[Dict]:
+        """Сервер по IP."""
+        server = self.snapshot().by_ip.get(ip)
+        return dict(server) if server else None
+
+    def get_by_name(self, name: str) -> Optional[Dict]:
+        """Сервер по имени."""
+        server = self.snapshot().by_name.get(name)
+        return dict(server) if server else None
+
+    def get_by_type(self, server_type: str, include_disabled: bool = False) -> List[Dict]:
+        """Серверы по типу."""
+        return [
+            dict(server) for server in self.snapshot().by_type.get(server_type, [])
+            if include_disabled or server.get("enabled", True)
+        ]
+
+    def get_by_group(self, group: str, include_disabled: bool = False) -> List[Dict]:
+        """Серверы группы Windows (windows_2025, domain_servers, ...)."""
+        return [
+            dict(server) for server in self.snapshot().by_group.get(group, [])
+            if include_disabled or server.get("enabled", True)
+        ]
+
+    def get_windows_group(self, ip: str) -> Optional[str]:
+        """Группа Windows сервера."""
+        return self.snapshot().windows_groups.get(ip)
+
+    def is_enabled(self, ip: str) -> bool:
+        """Статус мониторинга сервера."""
+        return self.snapshot().is_enabled(ip)
+
+
+# Глобальный экземпляр реестра серверов
+server_registry = ServerRegistry()
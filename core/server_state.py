@@ -0,0 +1,109 @@
+"""
+/core/server_state.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Last known server availability state
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Последнее известное состояние доступности серверов
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.live_events import live_events
+
+
+class ServerStateStore:
+    """
+    Результаты последних проверок доступности
+
+    Цикл мониторинга записывает сюда итог каждого обхода, а веб-интерфейс
+    и другие читатели получают последнее известное состояние без
+    собственных проверок. Номер версии растет после каждой записи, по нему
+    читатели понимают, что данные изменились. Изменения состояния
+    публикуются в ленту событий веб-интерфейса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict] = {}
+        self._version = 0
+        self._last_sweep: Optional[datetime] = None
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    @property
+    def last_sweep(self) -> Optional[datetime]:
+        """Время последнего обхода."""
+        with self._lock:
+            return self._last_sweep
+
+    def record_sweep(
+        self,
+        results: Iterable[Tuple[Dict, bool]],
+        checked_at: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """
+        Сохраняет результаты обхода
+
+        Args:
+            results: Пары (сервер, доступен)
+            checked_at: Время обхода (по умолчанию текущее)
+
+        Returns:
+            list: Изменения состояния {"ip", "name", "type", "up", "since"}
+        """
+        checked_at = checked_at or datetime.now()
+        transitions = []
+        with self._lock:
+            for server, is_up in results:
+                ip = server["ip"]
+                is_up = bool(is_up)
+                state = self._states.get(ip)
+                if state is None or state["up"] != is_up:
+                    state = self._states[ip] = {"up": is_up, "since": checked_at}
+                    transitions.append({
+                        "ip": ip,
+                        "name": server.get("name"),
+                        "type": server.get("type"),
+                        "up": is_up,
+                        "since": checked_at,
+                    })
+                state["checked_at"] = checked_at
+            self._last_sweep = checked_at
+            self._version += 1
+
+        live_events.publish("sweep", {
+            "checked_at": checked_at.strftime("%H:%M:%S"),
+            "changes": [
+                {"ip": change["ip"], "up": change["up"], "since": change["since"].isoformat()}
+                for change in transitions
+            ],
+        })
+        return transitions
+
+    def snapshot(self) -> Tuple[int, Optional[datetime], Dict[str, Dict]]:
+        """
+        Согласованная копия состояния
+
+        Returns:
+            tuple: (версия, время последнего обхода, IP -> {"up", "since", "checked_at"})
+        """
+        with self._lock:
+            return (
+                self._version,
+                self._last_sweep,
+                {ip: dict(state) for ip, state in self._states.items()},
+            )
+
+
+# Глобальный экземпляр состояния серверов
+server_state = ServerStateStore()
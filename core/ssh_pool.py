@@ -0,0 +1,283 @@
+"""
+/core/ssh_pool.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Persistent SSH connection pool
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Пул постоянных SSH соединений
+"""
+
+import socket
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import paramiko
+
+from lib.logging import debug_log
+
+PoolKey = Tuple[str, int, str, str]
+
+
+class SSHConnectionPool:
+    """Пул долгоживущих paramiko-транспортов с keepalive и вытеснением простаивающих"""
+
+    def __init__(self, idle_timeout: Optional[int] = None, keepalive: Optional[int] = None):
+        """
+        Инициализация пула
+
+        Args:
+            idle_timeout: Через сколько секунд простоя соединение закрывается
+            keepalive: Интервал keepalive пакетов в секундах
+        """
+        self._idle_timeout = idle_timeout
+        self._keepalive = keepalive
+        self._clients: Dict[PoolKey, paramiko.SSHClient] = {}
+        self._last_used: Dict[PoolKey, float] = {}
+        self._key_locks: Dict[PoolKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+
+    @property
+    def idle_timeout(self) -> int:
+        """Время простоя до закрытия соединения."""
+        if self._idle_timeout is not None:
+            return self._idle_timeout
+        try:
+            from config.db_settings import SSH_POOL_IDLE_TIMEOUT
+            return int(SSH_POOL_IDLE_TIMEOUT)
+        except Exception:
+            return 600
+
+    @property
+    def keepalive(self) -> int:
+        """Интервал keepalive пакетов."""
+        if self._keepalive is not None:
+            return self._keepalive
+        try:
+            from config.db_settings import SSH_KEEPALIVE_INTERVAL
+            return int(SSH_KEEPALIVE_INTERVAL)
+        except Exception:
+            return 30
+
+    def _resolve_credentials(self, username: Optional[str], key_path: Optional[str]) -> Tuple[str, str]:
+        """Подставляет учетные данные SSH из настроек."""
+        if username is None or key_path is None:
+            from config.db_settings import SSH_USERNAME, SSH_KEY_PATH
+            username = username or SSH_USERNAME
+            key_path = key_path or SSH_KEY_PATH
+        return username, key_path
+
+    def _key_lock(self, key: PoolKey) -> threading.Lock:
+        """Возвращает блокировку подключения для ключа пула."""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    @staticmethod
+    def _is_healthy(client: paramiko.SSHClient) -> bool:
+        """Проверяет, что транспорт жив и аутентифицирован."""
+        transport = client.get_transport()
+        return bool(transport and transport.is_active() and transport.is_authenticated())
+
+    def _connect(self, key: PoolKey, timeout: int) -> paramiko.SSHClient:
+        """Устанавливает новое SSH соединение."""
+        ip, port, username, key_path = key
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname=ip,
+            port=port,
+            username=username,
+            key_filename=key_path,
+            timeout=timeout,
+            banner_timeout=timeout,
+            auth_timeout=timeout,
+            look_for_keys=False,
+            allow_agent=False,
+        )
+        transport = client.get_transport()
+        if transport and self.keepalive > 0:
+            transport.set_keepalive(self.keepalive)
+        debug_log(f"🔌 SSH соединение с {ip} открыто")
+        return client
+
+    def get_client(
+        self,
+        ip: str,
+        username: Optional[str] = None,
+        key_path: Optional[str] = None,
+        port: int = 22,
+        timeout: int = 15,
+    ) -> paramiko.SSHClient:
+        """
+        Возвращает живое соединение из пула, при необходимости подключается
+
+        Raises:
+            paramiko.SSHException, socket.error: при ошибке подключения
+        """
+        self.evict_idle()
+
+        username, key_path = self._resolve_credentials(username, key_path)
+        key = (ip, port, username, key_path)
+
+        # Одновременно к одному хосту подключается только один поток
+        with self._key_lock(key):
+            with self._lock:
+                client = self._clients.get(key)
+
+            if client is not None and not self._is_healthy(client):
+                self._discard(key, client)
+                client = None
+
+            if client is None:
+                client = self._connect(key, timeout)
+                with self._lock:
+                    self._clients[key] = client
+
+            with self._lock:
+                self._last_used[key] = time.monotonic()
+            return client
+
+    def _discard(self, key: PoolKey, client: Optional[paramiko.SSHClient] = None) -> None:
+        """Закрывает соединение и удаляет его из пула."""
+        with self._lock:
+            current = self._clients.get(key)
+            if client is None or current is client:
+                self._clients.pop(key, None)
+                self._last_used.pop(key, None)
+            client = client or current
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def run_command(
+        self,
+        ip: str,
+        command: str,
+        timeout: int = 10,
+        username: Optional[str] = None,
+        key_path: Optional[str] = None,
+        port: int = 22,
+        connect_timeout: Optional[int] = None,
+    ) -> Tuple[bool, str, str]:
+        """
+        Выполняет команду в новом канале поверх постоянного соединения
+
+        Если соединение оказалось разорванным, выполняется одна повторная
+        попытка с новым подключением.
+
+        Args:
+            ip: IP адрес
+            command: Команда
+            timeout: Таймаут выполнения команды
+            username: Пользователь SSH (по умолчанию SSH_USERNAME)
+            key_path: Путь к ключу (по умолчанию SSH_KEY_PATH)
+            port: Порт SSH
+            connect_timeout: Таймаут подключения (по умолчанию timeout)
+
+        Returns:
+            Tuple[bool, str, str]: (успех, stdout, stderr)
+        """
+        connect_timeout = connect_timeout or timeout
+        username, key_path = self._resolve_credentials(username, key_path)
+        key = (ip, port, username, key_path)
+
+        for attempt in range(2):
+            client = None
+            try:
+                client = self.get_client(ip, username, key_path, port, connect_timeout)
+                transport = client.get_transport()
+                channel = transport.open_session(timeout=timeout)
+                try:
+                    channel.settimeout(timeout)
+                    channel.exec_command(command)
+                    stdout = channel.makefile("rb").read()
+                    stderr = channel.makefile_stderr("rb").read()
+                    exit_code = channel.recv_exit_status()
+                finally:
+                    channel.close()
+
+                return (
+                    exit_code == 0,
+                    stdout.decode("utf-8", errors="replace").strip(),
+                    stderr.decode("utf-8", errors="replace").strip(),
+                )
+
+            except paramiko.ssh_exception.AuthenticationException as e:
+                return False, "", f"Authentication failed: {e}"
+            except socket.timeout:
+                return False, "", "Timeout"
+            except (paramiko.ssh_exception.SSHException, EOFError, OSError) as e:
+                if client is not None:
+                    self._discard(key, client)
+                if attempt == 0 and client is not None:
+                    debug_log(f"⚠️ SSH соединение с {ip} разорвано, переподключение: {e}")
+                    continue
+                return False, "", str(e)
+            except Exception as e:
+                return False, "", str(e)
+
+        return False, "", "SSH connection failed"
+
+    def evict_idle(self, force: bool = False) -> int:
+        """
+        Закрывает соединения, простаивающие дольше idle_timeout
+
+        Args:
+            force: Проверить немедленно, не дожидаясь интервала
+
+        Returns:
+            int: Количество закрытых соединений
+        """
+        now = time.monotonic()
+        idle_timeout = self.idle_timeout
+
+        with self._lock:
+            # Проверка не чаще раза в минуту, чтобы не нагружать горячий путь
+            if not force and now - self._last_eviction < min(60, idle_timeout):
+                return 0
+            self._last_eviction = now
+            expired = [
+                (key, self._clients[key])
+                for key, last_used in self._last_used.items()
+                if key in self._clients and now - last_used > idle_timeout
+            ]
+
+        for key, client in expired:
+            self._discard(key, client)
+
+        if expired:
+            debug_log(f"🧹 Закрыто простаивающих SSH соединений: {len(expired)}")
+        return len(expired)
+
+    def close_all(self) -> None:
+        """Закрывает все соединения пула."""
+        with self._lock:
+            clients = list(self._clients.items())
+        for key, client in clients:
+            self._discard(key, client)
+
+    def get_stats(self) -> Dict:
+        """Возвращает статистику пула."""
+        with self._lock:
+            clients = list(self._clients.values())
+        return {
+            "connections": len(clients),
+            "active": sum(1 for client in clients if self._is_healthy(client)),
+            "idle_timeout": self.idle_timeout,
+            "keepalive": self.keepalive,
+        }
+
+
+# Глобальный экземпляр пула
+ssh_pool = SSHConnectionPool()
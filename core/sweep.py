@@ -0,0 +1,129 @@
+"""
+/core/sweep.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Concurrent server sweep engine
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Параллельный обход серверов
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lib.logging import debug_log
+from core.job_runner import current_job
+
+# Верхняя граница числа потоков, чтобы ошибка в настройках не уронила процесс
+MAX_SWEEP_WORKERS = 256
+
+# Результат для серверов, не успевших к общему лимиту времени обхода
+RESOURCE_TIMED_OUT = "timed_out"
+
+
+def get_sweep_workers(default: int = 32) -> int:
+    """Возвращает число потоков обхода из настроек."""
+    try:
+        from config.db_settings import AVAILABILITY_WORKERS
+        workers = int(AVAILABILITY_WORKERS)
+    except Exception:
+        workers = default
+    return max(1, min(workers, MAX_SWEEP_WORKERS))
+
+
+def run_sweep(
+    servers: List[Dict],
+    check_func: Callable[[Dict], Any],
+    max_workers: Optional[int] = None,
+    default: Any = False,
+    deadline: Optional[float] = None,
+    timeout_result: Any = None,
+    on_result: Optional[Callable[[Dict, Any, int, int], None]] = None,
+) -> List[Tuple[Dict, Any]]:
+    """
+    Выполняет проверку серверов в пуле потоков
+
+    Время обхода ограничено самым медленным сервером, а не суммой времени
+    всех проверок. Результаты возвращаются в исходном порядке серверов,
+    поэтому последующая обработка состояний остается детерминированной.
+    Если обход выполняется в фоновой задаче и ее отменили, оставшиеся
+    серверы не опрашиваются и обход завершается JobCancelled.
+
+    Args:
+        servers: Список серверов
+        check_func: Функция проверки одного сервера
+        max_workers: Число потоков (по умолчанию из AVAILABILITY_WORKERS)
+        default: Результат для проверки, завершившейся исключением
+        deadline: Общий лимит времени обхода в секундах
+        timeout_result: Результат для серверов, не успевших к deadline
+        on_result: Вызывается в текущем потоке по мере готовности
+            результатов: on_result(server, result, done, total)
+
+    Returns:
+        List[Tuple[Dict, Any]]: Пары (сервер, результат) в порядке servers
+    """
+    if not servers:
+        return []
+
+    total = len(servers)
+    workers = min(max_workers or get_sweep_workers(), total)
+    job = current_job()
+
+    def _safe_check(server: Dict) -> Any:
+        if job is not None and job.cancel_requested:
+            return default
+        try:
+            return check_func(server)
+        except Exception as e:
+            debug_log(f"❌ Ошибка проверки {server.get('name', server.get('ip'))}: {e}")
+            return default
+
+    def _notify(server: Dict, result: Any, done: int) -> None:
+        if on_result is None:
+            return
+        try:
+            on_result(server, result, done, total)
+        except Exception as e:
+            debug_log(f"⚠️ Ошибка обработчика результата обхода: {e}")
+
+    if workers <= 1 and deadline is None:
+        results = []
+        for index, server in enumerate(servers):
+            result = _safe_check(server)
+            results.append((server, result))
+            _notify(server, result, index + 1)
+        if job is not None:
+            job.check_cancelled()
+        return results
+
+    results = [timeout_result] * total
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sweep")
+    futures = {executor.submit(_safe_check, server): index for index, server in enumerate(servers)}
+    done = 0
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            index = futures[future]
+            results[index] = future.result()
+            done += 1
+            _notify(servers[index], results[index], done)
+    except FuturesTimeoutError:
+        late = []
+        for future, index in futures.items():
+            if future.done():
+                results[index] = future.result()
+            else:
+                late.append(servers[index].get("name", servers[index].get("ip")))
+        debug_log(
+            f"⏱️ Обход прерван по лимиту {deadline} сек, не успели: {len(late)} "
+            f"({', '.join(str(name) for name in late[:10])})"
+        )
+    finally:
+        # Зависшие проверки дорабатывают в фоне, их результаты отбрасываются
+        executor.shutdown(wait=deadline is None, cancel_futures=True)
+
+    if job is not None:
+        job.check_cancelled()
+    return list(zip(servers, results))
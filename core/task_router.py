@@ -82,6 +82,13 @@ def run_mail_monitor_task(**_: Any) -> TaskResult:
     return True, {"processed": processed}
 
 
+def run_backup_retention_task(**_: Any) -> TaskResult:
+    """Очистка и сжатие истории бэкапов."""
+    from modules.backup_retention import backup_retention
+
+    return True, backup_retention.run()
+
+
 # Соответствие задач файлам и обработчикам
 TASK_ROUTES: Dict[str, Dict[str, Any]] = {
     "availability": {
@@ -104,6 +111,11 @@ TASK_ROUTES: Dict[str, Dict[str, Any]] = {
         "runner": run_mail_monitor_task,
         "description": "Обработка новых писем с отчётами о бэкапах",
     },
+    "backup_retention": {
+        "module": "modules.backup_retention.py",
+        "runner": run_backup_retention_task,
+        "description": "Очистка и сжатие истории бэкапов",
+    },
 }
 
 
@@ -131,4 +143,5 @@ __all__ = [
     "run_resources_task",
     "run_targeted_task",
     "run_mail_monitor_task",
+    "run_backup_retention_task",
 ]
\ No newline at end of file
@@ -18,6 +18,11 @@ from datetime import datetime, timedelta
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.error import BadRequest
 from extensions.extension_manager import extension_manager
+from modules.backup_queries import (
+    DATABASE_DISPLAY_NAME_QUERY,
+    DATABASE_MENU_QUERY,
+    LATEST_BACKUP_TYPE_QUERY,
+)
 from .backup_utils import DisplayFormatters
 formatters = DisplayFormatters()
 from telegram.utils.helpers import escape_markdown
@@ -338,11 +343,12 @@ def show_hosts_menu(query, backup_bot):
             )
             return
 
-        # Получаем статусы для всех хостов
-        host_statuses = {}
-        for host_name in hosts:
-            status = backup_bot.get_host_display_status(host_name)
-            host_statuses[host_name] = status
+        # Статусы всех хостов одним запросом
+        bulk_statuses = backup_bot.get_hosts_bulk_status()
+        host_statuses = {
+            host_name: bulk_statuses.get(host_name, {}).get("status", "stale")
+            for host_name in hosts
+        }
 
         # Создаем сообщение с легендой
         message = "🖥️ *Выберите хост для просмотра бэкапов:*\n\n"
@@ -372,14 +378,14 @@ def show_stale_hosts(query, backup_bot):
     """Показывает только проблемные хосты"""
     try:
         hosts = backup_bot.get_all_hosts()
+        bulk_statuses = backup_bot.get_hosts_bulk_status(hours=72)
         problem_hosts = []
         
         for host_name in hosts:
-            status = backup_bot.get_host_display_status(host_name)
+            entry = bulk_statuses.get(host_name, {})
+            status = entry.get("status", "stale")
             if status in ["failed", "recent_failed", "stale"]:
-                recent = backup_bot.get_host_recent_status(host_name, 72)
-                last_time = recent[0][1] if recent else None
-                problem_hosts.append((host_name, status, last_time))
+                problem_hosts.append((host_name, status, entry.get("last_backup")))
         
         if not problem_hosts:
             query.edit_message_text(
@@ -506,17 +512,7 @@ def show_database_backups_menu(query, backup_bot):
         if not isinstance(DATABASE_BACKUP_CONFIG, dict):
             DATABASE_BACKUP_CONFIG = {}
 
-        rows = backup_bot.execute_query(
-            """
-            SELECT DISTINCT
-                backup_type,
-                database_name,
-                COALESCE(database_display_name, '')
-            FROM database_backups
-            ORDER BY backup_type, database_name
-            """,
-            ()
-        ) or []
+        rows = backup_bot.execute_query(DATABASE_MENU_QUERY, ()) or []
 
         # Группируем БД по типу (берём из конфигурации)
         db_by_type = {}
@@ -537,7 +533,7 @@ def show_database_backups_menu(query, backup_bot):
                         "label": db_name,
                     }
 
-        for backup_type, db_name, display_name in rows:
+        for backup_type, db_name in rows:
             if not backup_type or not db_name:
                 continue
 
@@ -573,6 +569,9 @@ def show_database_backups_menu(query, backup_bot):
                 raise
             return
 
+        bulk_statuses = backup_bot.get_databases_bulk_status()
+        latest_types = _latest_backup_types(bulk_statuses, hours=48)
+
         keyboard = []
         for backup_type in sorted(db_by_type.keys()):
             type_display = formatters.get_type_display(backup_type)
@@ -588,8 +587,8 @@ def show_database_backups_menu(query, backup_bot):
                 db_name = entry["db_name"]
                 display_name = entry["label"]
                 try:
-                    effective_type = _get_latest_backup_type(backup_bot, db_name, hours=48) or backup_type
-                    status = backup_bot.get_database_display_status(effective_type, db_name)
+                    effective_type = latest_types.get(db_name) or backup_type
+                    status = bulk_statuses.get((effective_type, db_name), {}).get("status", "stale")
                     display_btn = formatters.get_db_display_name(display_name, status)
 
                     current_row.append(InlineKeyboardButton(
@@ -751,13 +750,13 @@ def show_stale_databases(query, backup_bot):
                 continue
             config_mapping.append((_normalize_config_backup_type(category), databases))
         
+        bulk_statuses = backup_bot.get_databases_bulk_status(hours=72)
         for backup_type, config_dict in config_mapping:
             for db_name in config_dict.keys():
-                status = backup_bot.get_database_display_status(backup_type, db_name)
+                entry = bulk_statuses.get((backup_type, db_name), {})
+                status = entry.get("status", "stale")
                 if status not in ['success', 'unknown']:
-                    recent = backup_bot.get_database_recent_status(backup_type, db_name, 72)
-                    last_time = recent[0][1] if recent else None
-                    problem_databases.append((backup_type, db_name, db_name, status, last_time))
+                    problem_databases.append((backup_type, db_name, db_name, status, entry.get("last_backup")))
 
         if not problem_databases:
             query.edit_message_text(
@@ -894,18 +893,7 @@ def _esc_md(text: str) -> str:
 
 def _get_latest_database_display_name(backup_bot, backup_type, db_name):
     try:
-        rows = backup_bot.execute_query(
-            """
-            SELECT database_display_name
-            FROM database_backups
-            WHERE backup_type = ? AND database_name = ?
-              AND database_display_name IS NOT NULL
-              AND TRIM(database_display_name) != ''
-            ORDER BY received_at DESC
-            LIMIT 1
-            """,
-            (backup_type, db_name),
-        )
+        rows = backup_bot.execute_query(DATABASE_DISPLAY_NAME_QUERY, (backup_type, db_name))
         if rows:
             return rows[0][0]
     except Exception as e:
@@ -913,19 +901,23 @@ def _get_latest_database_display_name(backup_bot, backup_type, db_name):
     return None
 
 
+def _latest_backup_types(bulk_statuses, hours=48):
+    """Тип последнего бэкапа каждой БД по пакетным статусам (db_name -> backup_type)."""
+    since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+    latest = {}
+    for (backup_type, db_name), entry in bulk_statuses.items():
+        last_backup = entry.get("last_backup")
+        if not last_backup or last_backup < since_time:
+            continue
+        if db_name not in latest or last_backup > latest[db_name][1]:
+            latest[db_name] = (backup_type, last_backup)
+    return {db_name: backup_type for db_name, (backup_type, _) in latest.items()}
+
+
 def _get_latest_backup_type(backup_bot, db_name, hours=168):
     try:
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        rows = backup_bot.execute_query(
-            """
-            SELECT backup_type
-            FROM database_backups
-            WHERE database_name = ? AND received_at >= ?
-            ORDER BY received_at DESC
-            LIMIT 1
-            """,
-            (db_name, since_time),
-        )
+        rows = backup_bot.execute_query(LATEST_BACKUP_TYPE_QUERY, (db_name, since_time))
         if rows:
             return rows[0][0]
     except Exception as e:
@@ -11,10 +11,17 @@ Utilities for working with backups
 Утилиты для работы с бэкапами
 """
 
-import sqlite3
 from datetime import datetime, timedelta
 import logging
 
+from lib.sqlite_db import get_database
+from modules.backup_schema import ensure_schema
+from modules.backup_queries import (
+    REPORT_MAIL_LATEST_QUERY,
+    REPORT_MAIL_RECENT_QUERY,
+    REPORT_STOCK_LOADS_QUERY,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,16 +60,17 @@ def get_backup_summary(
         since_time = (datetime.now() - timedelta(hours=period_hours)).strftime('%Y-%m-%d %H:%M:%S')
         stale_threshold = (datetime.now() - timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
 
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
+        # Последние статусы читаются из таблиц состояния, а не агрегатами по истории
+        ensure_schema(db_path)
+        cursor = get_database(db_path).reader().cursor()
 
         proxmox_results = []
         stale_hosts = []
         all_hosts = []
         if include_proxmox:
             cursor.execute('''
-                SELECT DISTINCT host_name
-                FROM proxmox_backups
+                SELECT host_name
+                FROM proxmox_latest
                 WHERE received_at >= datetime('now', '-30 days')
                 ORDER BY host_name
             ''')
@@ -77,18 +85,16 @@ def get_backup_summary(
                 all_hosts = matched_hosts or list(configured_hosts)
 
             cursor.execute('''
-                SELECT host_name, backup_status, MAX(received_at) as last_backup
-                FROM proxmox_backups
+                SELECT host_name, backup_status, received_at
+                FROM proxmox_latest
                 WHERE received_at >= ?
-                GROUP BY host_name
             ''', (since_time,))
             proxmox_results = cursor.fetchall()
 
             cursor.execute('''
-                SELECT host_name, MAX(received_at) as last_backup
-                FROM proxmox_backups
-                GROUP BY host_name
-                HAVING last_backup < ?
+                SELECT host_name, received_at
+                FROM proxmox_latest
+                WHERE received_at < ?
             ''', (stale_threshold,))
             stale_hosts = cursor.fetchall()
 
@@ -96,10 +102,9 @@ def get_backup_summary(
         stale_databases = []
         if include_databases:
             cursor.execute('''
-                SELECT backup_type, database_name, backup_status, MAX(received_at) as last_backup
-                FROM database_backups
+                SELECT NULLIF(backup_type, ''), database_name, backup_status, received_at
+                FROM database_latest
                 WHERE received_at >= ?
-                GROUP BY backup_type, database_name
             ''', (since_time,))
             db_results = cursor.fetchall()
             db_results = [
@@ -108,10 +113,9 @@ def get_backup_summary(
             ]
 
             cursor.execute('''
-                SELECT backup_type, database_name, MAX(received_at) as last_backup
-                FROM database_backups
-                GROUP BY backup_type, database_name
-                HAVING last_backup < ?
+                SELECT NULLIF(backup_type, ''), database_name, received_at
+                FROM database_latest
+                WHERE received_at < ?
             ''', (stale_threshold,))
             stale_databases = cursor.fetchall()
             stale_databases = [
@@ -123,26 +127,10 @@ def get_backup_summary(
         mail_latest = None
         if include_mail:
             try:
-                cursor.execute(
-                    '''
-                    SELECT backup_status, total_size, backup_path, received_at
-                    FROM mail_server_backups
-                    WHERE received_at >= ?
-                    ORDER BY received_at DESC
-                    LIMIT 1
-                ''',
-                    (since_time,),
-                )
+                cursor.execute(REPORT_MAIL_RECENT_QUERY, (since_time,))
                 mail_recent = cursor.fetchone()
 
-                cursor.execute(
-                    '''
-                    SELECT backup_status, total_size, backup_path, received_at
-                    FROM mail_server_backups
-                    ORDER BY received_at DESC
-                    LIMIT 1
-                '''
-                )
+                cursor.execute(REPORT_MAIL_LATEST_QUERY)
                 mail_latest = cursor.fetchone()
             except Exception as exc:
                 if "no such table: mail_server_backups" in str(exc):
@@ -150,7 +138,7 @@ def get_backup_summary(
                 else:
                     raise
 
-        conn.close()
+        cursor.close()
 
         allowed_hosts = set(all_hosts)
         hosts_with_success = len([
@@ -465,25 +453,16 @@ def get_stock_load_summary(period_hours=16) -> str:
 
         since_time = (datetime.now() - timedelta(hours=period_hours)).strftime("%Y-%m-%d %H:%M:%S")
 
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
+        cursor = get_database(db_path).reader().cursor()
         try:
-            cursor.execute(
-                """
-                SELECT supplier_name, status, rows_count, error_sample, received_at
-                FROM stock_load_results
-                WHERE received_at >= ?
-                ORDER BY received_at DESC
-            """,
-                (since_time,),
-            )
+            cursor.execute(REPORT_STOCK_LOADS_QUERY, (since_time,))
             rows = cursor.fetchall()
         except Exception as exc:
             if "no such table: stock_load_results" in str(exc):
                 return "❌ Таблица остатков ещё не создана.\n"
             raise
         finally:
-            conn.close()
+            cursor.close()
 
         if not rows:
             return "❌ Нет свежих данных о загрузке остатков\n"
@@ -519,12 +498,7 @@ class BackupBase:
     def execute_query(self, query, params=()):
         """Выполняет SQL запрос и возвращает результаты"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            conn.close()
-            return results
+            return get_database(self.db_path).query(query, params)
         except Exception as e:
             logger.error(f"Ошибка выполнения запроса: {e}")
             return []
@@ -532,11 +506,8 @@ class BackupBase:
     def execute_many(self, query, params_list):
         """Выполняет запрос с несколькими наборами параметров"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.executemany(query, params_list)
-            conn.commit()
-            conn.close()
+            with get_database(self.db_path).transaction() as conn:
+                conn.executemany(query, params_list)
             return True
         except Exception as e:
             logger.error(f"Ошибка выполнения массового запроса: {e}")
@@ -20,6 +20,25 @@ import traceback
 from .settings_backup_monitor import BASE_DIR, DATA_DIR
 from config.settings import BOT_DEBUG_LOG_FILE
 from lib.logging import debug_log, setup_logging
+from lib.sqlite_db import get_database
+from modules.backup_schema import day_start, ensure_schema
+from modules.backup_queries import (
+    ALL_HOSTS_QUERY,
+    DATABASES_HISTORY_KEYS,
+    DATABASES_RECENT_HISTORY_QUERY,
+    DATABASE_DETAILS_QUERY,
+    DATABASE_RECENT_STATUS_QUERY,
+    DATABASE_STATS_QUERY,
+    FAILED_BACKUPS_QUERY,
+    HOSTS_HISTORY_KEYS,
+    HOSTS_RECENT_HISTORY_QUERY,
+    HOST_RECENT_STATUS_QUERY,
+    HOST_STATUS_QUERY,
+    MAIL_BACKUPS_QUERY,
+    RECENT_BACKUPS_QUERY,
+    STOCK_LOADS_QUERY,
+    TODAY_STATUS_QUERY,
+)
 from extensions.backup_monitor.backup_handlers import (
     show_main_menu,
     show_proxmox_menu,
@@ -93,12 +112,16 @@ except ImportError as e:
         logger.error(f"❌ Критическая ошибка импорта: {e2}")
         raise
 
+# Сколько последних бэкапов учитывают калькуляторы статусов
+STATUS_HISTORY_DEPTH = 3
+
 class BackupMonitorBot(BackupBase):
     """Оптимизированный класс для мониторинга бэкапов"""
     
     def __init__(self):
         from .db_settings_backup_monitor import BACKUP_DATABASE_CONFIG
         super().__init__(BACKUP_DATABASE_CONFIG['backups_db'])
+        ensure_schema(self.db_path)
         self.status_calc = StatusCalculator()
         self.formatters = DisplayFormatters()
 
@@ -112,14 +135,12 @@ class BackupMonitorBot(BackupBase):
         """
         try:
             import json
-            import sqlite3
 
             db_path = Path(DATA_DIR) / "settings.db"
-            conn = sqlite3.connect(str(db_path))
-            cur = conn.cursor()
-            cur.execute("SELECT value FROM settings WHERE key='DATABASE_CONFIG' LIMIT 1")
-            row = cur.fetchone()
-            conn.close()
+            rows = get_database(db_path).query(
+                "SELECT value FROM settings WHERE key='DATABASE_CONFIG' LIMIT 1"
+            )
+            row = rows[0] if rows else None
 
             if not row or not row[0]:
                 return {}
@@ -148,55 +169,24 @@ class BackupMonitorBot(BackupBase):
     
     def get_today_status(self):
         """Статус бэкапов за сегодня"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        query = '''
-            SELECT host_name, backup_status, COUNT(*) as report_count, MAX(received_at) as last_report
-            FROM proxmox_backups
-            WHERE date(received_at) = ?
-            GROUP BY host_name, backup_status
-            ORDER BY host_name, last_report DESC
-        '''
-        return self.execute_query(query, (today,))
+        return self.execute_query(TODAY_STATUS_QUERY, (day_start(0), day_start(-1)))
 
     def get_recent_backups(self, hours=24):
         """Последние бэкапы за указанный период"""
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        query = '''
-            SELECT host_name, backup_status, duration, total_size, error_message, received_at
-            FROM proxmox_backups
-            WHERE received_at >= ?
-            ORDER BY received_at DESC
-            LIMIT 15
-        '''
-        return self.execute_query(query, (since_time,))
+        return self.execute_query(RECENT_BACKUPS_QUERY, (since_time,))
 
     def get_host_status(self, host_name):
         """Статус конкретного хоста"""
-        query = '''
-            SELECT backup_status, duration, total_size, error_message, received_at
-            FROM proxmox_backups
-            WHERE host_name = ?
-            ORDER BY received_at DESC
-            LIMIT 5
-        '''
-        return self.execute_query(query, (host_name,))
+        return self.execute_query(HOST_STATUS_QUERY, (host_name,))
 
     def get_failed_backups(self, days=1):
         """Неудачные бэкапы за период"""
-        since_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-        query = '''
-            SELECT host_name, backup_status, error_message, received_at
-            FROM proxmox_backups
-            WHERE backup_status = 'failed'
-            AND date(received_at) >= ?
-            ORDER BY received_at DESC
-        '''
-        return self.execute_query(query, (since_date,))
+        return self.execute_query(FAILED_BACKUPS_QUERY, (day_start(days),))
 
     def get_all_hosts(self):
         """Получает список всех хостов из базы"""
-        query = 'SELECT DISTINCT host_name FROM proxmox_backups ORDER BY host_name'
-        results = self.execute_query(query)
+        results = self.execute_query(ALL_HOSTS_QUERY)
         db_hosts = [row[0] for row in results]
 
         try:
@@ -218,13 +208,7 @@ class BackupMonitorBot(BackupBase):
     def get_host_recent_status(self, host_name, hours=48):
         """Получает статус хоста за указанный период"""
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        query = '''
-            SELECT backup_status, received_at
-            FROM proxmox_backups
-            WHERE host_name = ? AND received_at >= ?
-            ORDER BY received_at DESC
-        '''
-        return self.execute_query(query, (host_name, since_time))
+        return self.execute_query(HOST_RECENT_STATUS_QUERY, (host_name, since_time))
 
     def get_host_display_status(self, host_name):
         """Определяет отображаемый статус хоста"""
@@ -236,15 +220,7 @@ class BackupMonitorBot(BackupBase):
     def get_database_backups_stats(self, hours=24):
         """Получает статистику по бэкапам баз данных"""
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        query = '''
-            SELECT backup_type, database_name, database_display_name, 
-                   backup_status, COUNT(*) as backup_count, MAX(received_at) as last_backup
-            FROM database_backups 
-            WHERE received_at >= ?
-            GROUP BY backup_type, database_name, database_display_name, backup_status
-            ORDER BY backup_type, database_name, last_backup DESC
-        '''
-        return self.execute_query(query, (since_time,))
+        return self.execute_query(DATABASE_STATS_QUERY, (since_time,))
 
     def get_database_backups_stats_fixed(self, hours=24):
         """Исправленная версия получения статистики"""
@@ -253,45 +229,101 @@ class BackupMonitorBot(BackupBase):
     def get_database_details(self, backup_type, db_name, hours=168):
         """Получает детальную информацию по конкретной базе данных"""
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        query = '''
-            SELECT backup_status, task_type, error_count, email_subject, received_at
-            FROM database_backups 
-            WHERE backup_type = ? AND database_name = ? AND received_at >= ?
-            ORDER BY received_at DESC
-            LIMIT 10
-        '''
-        return self.execute_query(query, (backup_type, db_name, since_time))
+        return self.execute_query(DATABASE_DETAILS_QUERY, (backup_type, db_name, since_time))
 
     def get_database_recent_status(self, backup_type, db_name, hours=48):
         """Получает статус БД за указанный период"""
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        query = '''
-            SELECT backup_status, received_at, error_count
-            FROM database_backups
-            WHERE backup_type = ? AND database_name = ? AND received_at >= ?
-            ORDER BY received_at DESC
-        '''
-        return self.execute_query(query, (backup_type, db_name, since_time))
+        return self.execute_query(DATABASE_RECENT_STATUS_QUERY, (backup_type, db_name, since_time))
 
     def get_database_display_status(self, backup_type, db_name):
         """Определяет отображаемый статус БД"""
         recent_backups = self.get_database_recent_status(backup_type, db_name, 48)
         return self.status_calc.calculate_db_status(recent_backups)
 
+    # === ПАКЕТНЫЕ СТАТУСЫ ДЛЯ МЕНЮ ===
+
+    def _recent_history(self, query, key_columns, hours):
+        """
+        Последние STATUS_HISTORY_DEPTH записей по каждому ключу одним запросом
+
+        Args:
+            query: Запрос из recent_history_query
+            key_columns: Ключевые колонки запроса
+
+        Returns:
+            dict: {ключ: [значения, ...]} от новых к старым
+        """
+        since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+        history = {}
+        key_size = len(key_columns)
+        for row in self.execute_query(query, (since_time, STATUS_HISTORY_DEPTH)):
+            key = row[0] if key_size == 1 else tuple(row[:key_size])
+            history.setdefault(key, []).append(tuple(row[key_size:]))
+        return history
+
+    def get_hosts_bulk_status(self, hours=72, status_hours=48):
+        """
+        Статусы всех хостов одним запросом
+
+        Args:
+            hours: Период истории (время последнего бэкапа)
+            status_hours: Период, по которому считается статус
+
+        Returns:
+            dict: {host_name: {"status", "last_backup", "history"}},
+            history - последние (backup_status, received_at) от новых к старым.
+            Хостов без бэкапов за период в словаре нет.
+        """
+        history = self._recent_history(
+            HOSTS_RECENT_HISTORY_QUERY, HOSTS_HISTORY_KEYS, max(hours, status_hours)
+        )
+        status_since = (datetime.now() - timedelta(hours=status_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        last_since = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+        statuses = {}
+        for host_name, rows in history.items():
+            recent = [row for row in rows if row[1] >= status_since]
+            last_backup = rows[0][1] if rows[0][1] >= last_since else None
+            statuses[host_name] = {
+                "status": self.status_calc.calculate_host_status(recent),
+                "last_backup": last_backup,
+                "history": rows,
+            }
+        return statuses
+
+    def get_databases_bulk_status(self, hours=72, status_hours=48):
+        """
+        Статусы всех БД одним запросом
+
+        Returns:
+            dict: {(backup_type, database_name): {"status", "last_backup", "history"}},
+            history - последние (backup_status, received_at, error_count).
+        """
+        history = self._recent_history(
+            DATABASES_RECENT_HISTORY_QUERY, DATABASES_HISTORY_KEYS, max(hours, status_hours)
+        )
+        status_since = (datetime.now() - timedelta(hours=status_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        last_since = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+        statuses = {}
+        for key, rows in history.items():
+            recent = [row for row in rows if row[1] >= status_since]
+            last_backup = rows[0][1] if rows[0][1] >= last_since else None
+            statuses[key] = {
+                "status": self.status_calc.calculate_db_status(recent),
+                "last_backup": last_backup,
+                "history": rows,
+            }
+        return statuses
+
     # === МЕТОДЫ ДЛЯ ПОЧТОВЫХ БЭКАПОВ ===
 
     def get_mail_backups(self, hours=72, limit=10):
         """Получает последние бэкапы почтового сервера"""
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        query = '''
-            SELECT backup_status, total_size, backup_path, received_at
-            FROM mail_server_backups
-            WHERE received_at >= ?
-            ORDER BY received_at DESC
-            LIMIT ?
-        '''
         try:
-            return self.execute_query(query, (since_time, limit))
+            return self.execute_query(MAIL_BACKUPS_QUERY, (since_time, limit))
         except Exception as exc:
             logger.error(f"Ошибка получения почтовых бэкапов: {exc}")
             return []
@@ -301,39 +333,8 @@ class BackupMonitorBot(BackupBase):
     def get_stock_loads(self, hours=24):
         """Получает последние результаты загрузки остатков товаров по каждому поставщику."""
         since_time = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-        query = '''
-            WITH normalized AS (
-                SELECT
-                    id,
-                    COALESCE(source_name, 'Основное предприятие') AS source_name,
-                    CASE
-                        WHEN supplier_name IS NULL OR supplier_name = 'неизвестно'
-                            THEN COALESCE(source_name, 'Основное предприятие')
-                        ELSE supplier_name
-                    END AS supplier_name,
-                    status,
-                    rows_count,
-                    error_sample,
-                    received_at
-                FROM stock_load_results
-                WHERE received_at >= ?
-            ),
-            ranked AS (
-                SELECT
-                    *,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY source_name, supplier_name
-                        ORDER BY received_at DESC, id DESC
-                    ) AS row_num
-                FROM normalized
-            )
-            SELECT source_name, supplier_name, status, rows_count, error_sample, received_at
-            FROM ranked
-            WHERE row_num = 1
-            ORDER BY source_name, supplier_name
-        '''
         try:
-            return self.execute_query(query, (since_time,))
+            return self.execute_query(STOCK_LOADS_QUERY, (since_time,))
         except Exception as exc:
             logger.error(f"Ошибка получения остатков: {exc}")
             return []
@@ -344,10 +345,9 @@ class BackupMonitorBot(BackupBase):
         """Получает хосты без свежих бэкапов"""
         threshold_time = (datetime.now() - timedelta(hours=hours_threshold)).strftime('%Y-%m-%d %H:%M:%S')
         query = '''
-            SELECT host_name, MAX(received_at) as last_backup
-            FROM proxmox_backups 
-            GROUP BY host_name
-            HAVING last_backup < ?
+            SELECT host_name, received_at as last_backup
+            FROM proxmox_latest
+            WHERE received_at < ?
             ORDER BY last_backup ASC
         '''
         return self.execute_query(query, (threshold_time,))
@@ -28,10 +28,10 @@ from config.db_settings import (
     RESOURCE_THRESHOLDS,
     WINDOWS_SERVER_CREDENTIALS,
     WINRM_CONFIGS,
-    SERVER_CONFIG,
-    get_servers_config,
 )
 from core.checker import ServerChecker
+from core.ssh_pool import ssh_pool
+from core.server_registry import server_registry
 from lib.logging import debug_log
 sys.path.insert(0, str(BASE_DIR))
 
@@ -41,39 +41,11 @@ _server_checker = ServerChecker()
 # === СПИСОК СЕРВЕРОВ ===
 
 def initialize_servers():
-    """Инициализация списка серверов из конфигурации"""
-    servers = []
-    servers_config = get_servers_config()
-    if not any(servers_config.values()):
-        servers_config = SERVER_CONFIG
-        if not any(servers_config.values()):
-            debug_log("⚠️ Конфигурация серверов пуста")
-    
-    # Windows RDP серверы
-    for ip, name in servers_config.get("windows_servers", {}).items():
-        servers.append({
-            "ip": ip,
-            "name": name,
-            "type": "rdp"
-        })
-    
-    # Linux SSH серверы
-    for ip, name in servers_config.get("linux_servers", {}).items():
-        servers.append({
-            "ip": ip,
-            "name": name,
-            "type": "ssh"
-        })
-    
-    # Ping-only серверы
-    for ip, name in servers_config.get("ping_servers", {}).items():
-        servers.append({
-            "ip": ip,
-            "name": name,
-            "type": "ping"
-        })
-    
-    return servers
+    """Инициализация списка серверов из конфигурации (из реестра серверов)"""
+    return [
+        {"ip": server["ip"], "name": server["name"], "type": server["type"]}
+        for server in server_registry.get_servers()
+    ]
 
 def resolve_hostname(ip):
     """Разрешает IP в hostname"""
@@ -85,24 +57,24 @@ def resolve_hostname(ip):
 
 def get_server_by_ip(ip):
     """Получить сервер по IP"""
-    servers = initialize_servers()
-    for server in servers:
-        if server["ip"] == ip:
-            return server
-    return None
+    server = server_registry.get_by_ip(ip)
+    if server is None or not server.get("enabled", True):
+        return None
+    return {"ip": server["ip"], "name": server["name"], "type": server["type"]}
 
 def get_server_by_name(name):
     """Получить сервер по имени"""
-    servers = initialize_servers()
-    for server in servers:
-        if server["name"] == name:
-            return server
-    return None
+    server = server_registry.get_by_name(name)
+    if server is None or not server.get("enabled", True):
+        return None
+    return {"ip": server["ip"], "name": server["name"], "type": server["type"]}
 
 def get_servers_by_type(server_type):
     """Получить серверы по типу"""
-    servers = initialize_servers()
-    return [s for s in servers if s["type"] == server_type]
+    return [
+        {"ip": server["ip"], "name": server["name"], "type": server["type"]}
+        for server in server_registry.get_by_type(server_type)
+    ]
 
 def servers_command(update, context):
     """Обработчик команды /servers"""
@@ -158,13 +130,16 @@ def check_ping(ip):
     return net_check_ping(ip, timeout=10)
 
 def run_ssh_command(ip, command, timeout=10):
-    """Выполняет команду через SSH с обработкой ошибок"""
+    """Выполняет команду через SSH с обработкой ошибок (канал в пуле соединений)"""
     try:
-        cmd = f"timeout {timeout} ssh -o ConnectTimeout=8 -o BatchMode=yes -o StrictHostKeyChecking=no -i {SSH_KEY_PATH} {SSH_USERNAME}@{ip} '{command}'"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout+2)
-        return result.returncode == 0, result.stdout.strip(), result.stderr.strip()
-    except subprocess.TimeoutExpired:
-        return False, "", "Timeout"
+        return ssh_pool.run_command(
+            ip,
+            command,
+            timeout=timeout,
+            username=SSH_USERNAME,
+            key_path=SSH_KEY_PATH,
+            connect_timeout=8,
+        )
     except Exception as e:
         return False, "", str(e)
 
@@ -178,172 +153,81 @@ def get_windows_server_credentials(ip):
 
 def get_windows_server_type(ip):
     """Определяет тип Windows сервера"""
-    for server_type, config in WINDOWS_SERVER_CREDENTIALS.items():
-        if ip in config["servers"]:
-            return server_type
-    return "unknown"
+    return server_registry.get_windows_group(ip) or "unknown"
 
 # === РАЗДЕЛЬНЫЕ ПРОВЕРКИ WINDOWS СЕРВЕРОВ ===
 
-def check_domain_windows_servers(progress_callback=None):
+def _get_windows_group_servers(group):
+    """Активные RDP серверы группы Windows"""
+    return [
+        {"ip": server["ip"], "name": server["name"], "type": server["type"]}
+        for server in server_registry.get_by_group(group)
+        if server["type"] == "rdp"
+    ]
+
+def check_domain_windows_servers(progress_callback=None, force=False):
     """Проверка доменных Windows серверов"""
-    servers = [s for s in get_servers_by_type("rdp") 
-               if s["ip"] in WINDOWS_SERVER_CREDENTIALS["domain_servers"]["servers"]]
-    return check_windows_servers_generic(servers, "domain", progress_callback)
+    servers = _get_windows_group_servers("domain_servers")
+    return check_windows_servers_generic(servers, "domain", progress_callback, force)
 
-def check_admin_windows_servers(progress_callback=None):
+def check_admin_windows_servers(progress_callback=None, force=False):
     """Проверка Windows серверов с учеткой Admin"""
-    servers = [s for s in get_servers_by_type("rdp") 
-               if s["ip"] in WINDOWS_SERVER_CREDENTIALS["admin_servers"]["servers"]]
-    return check_windows_servers_generic(servers, "admin", progress_callback)
+    servers = _get_windows_group_servers("admin_servers")
+    return check_windows_servers_generic(servers, "admin", progress_callback, force)
 
-def check_standard_windows_servers(progress_callback=None):
+def check_standard_windows_servers(progress_callback=None, force=False):
     """Проверка стандартных Windows серверов"""
-    servers = [s for s in get_servers_by_type("rdp") 
-               if s["ip"] in WINDOWS_SERVER_CREDENTIALS["standard_windows"]["servers"]]
-    return check_windows_servers_generic(servers, "standard", progress_callback)
+    servers = _get_windows_group_servers("standard_windows")
+    return check_windows_servers_generic(servers, "standard", progress_callback, force)
 
-def check_windows_servers_generic(servers, server_type, progress_callback=None):
-    """Универсальная функция проверки Windows серверов"""
-    results = []
-    
-    for i, server in enumerate(servers):
-        if progress_callback:
-            progress = (i + 1) / len(servers) * 100
-            progress_callback(progress, f"Проверяем {server['name']} ({server_type})...")
-        
-        try:
-            resources = get_windows_resources_improved(server["ip"])
-            results.append({
-                "server": server,
-                "resources": resources,
-                "success": resources is not None
-            })
-        except Exception as e:
-            results.append({
-                "server": server,
-                "resources": None,
-                "success": False,
-                "error": str(e)
-            })
-    
-    return results, len(servers)
+def check_windows_servers_generic(servers, server_type, progress_callback=None, force=False):
+    """Результаты Windows серверов группы из общего снимка ресурсов"""
+    from core.resource_cache import resource_cache
+    snapshot = resource_cache.get(force=force, progress_callback=progress_callback)
+    return snapshot.results(servers), len(servers)
 
 # === РАЗДЕЛЬНЫЕ ПРОВЕРКИ LINUX СЕРВЕРОВ ===
 
-def check_linux_servers(progress_callback=None):
-    """Проверка всех Linux серверов"""
+def check_linux_servers(progress_callback=None, force=False):
+    """Результаты Linux серверов из общего снимка ресурсов (результаты, всего, снимок)"""
+    from core.resource_cache import resource_cache
     servers = get_servers_by_type("ssh")
-    results = []
-    
-    for i, server in enumerate(servers):
-        if progress_callback:
-            progress = (i + 1) / len(servers) * 100
-            progress_callback(progress, f"Проверяем {server['name']}...")
-        
-        try:
-            resources = get_linux_resources_improved(server["ip"])
-            results.append({
-                "server": server,
-                "resources": resources,
-                "success": resources is not None
-            })
-        except Exception as e:
-            results.append({
-                "server": server,
-                "resources": None,
-                "success": False,
-                "error": str(e)
-            })
-    
-    return results, len(servers)
+    snapshot = resource_cache.get(force=force, progress_callback=progress_callback)
+    return snapshot.results(servers), len(servers), snapshot
 
-def check_windows_2025_servers(progress_callback=None):
+def check_windows_2025_servers(progress_callback=None, force=False):
     """Проверка Windows Server 2025"""
-    servers = [s for s in get_servers_by_type("rdp") 
-               if s["ip"] in WINDOWS_SERVER_CREDENTIALS["windows_2025"]["servers"]]
-    return check_windows_servers_generic(servers, "windows_2025", progress_callback)
-
-def check_all_servers_by_type():
-    """Проверка всех серверов по типам"""
-    linux_results, linux_total = check_linux_servers()
-    win2025_results, win2025_total = check_windows_2025_servers()
-    domain_results, domain_total = check_domain_windows_servers()
-    admin_results, admin_total = check_admin_windows_servers()
-    standard_results, standard_total = check_standard_windows_servers()
-    
-    stats = {
-        "linux": {"checked": linux_total, "success": len([r for r in linux_results if r["success"]])},
-        "windows_2025": {"checked": win2025_total, "success": len([r for r in win2025_results if r["success"]])},
-        "domain_windows": {"checked": domain_total, "success": len([r for r in domain_results if r["success"]])},
-        "admin_windows": {"checked": admin_total, "success": len([r for r in admin_results if r["success"]])},
-        "standard_windows": {"checked": standard_total, "success": len([r for r in standard_results if r["success"]])}
+    servers = _get_windows_group_servers("windows_2025")
+    return check_windows_servers_generic(servers, "windows_2025", progress_callback, force)
+
+def check_all_servers_by_type(force=False, progress_callback=None):
+    """Проверка всех серверов по типам (результаты, статистика, снимок)"""
+    from core.resource_cache import resource_cache
+
+    # Все группы строятся из одного снимка ресурсов
+    snapshot = resource_cache.get(force=force, progress_callback=progress_callback)
+    groups = {
+        "linux": get_servers_by_type("ssh"),
+        "windows_2025": _get_windows_group_servers("windows_2025"),
+        "domain_windows": _get_windows_group_servers("domain_servers"),
+        "admin_windows": _get_windows_group_servers("admin_servers"),
+        "standard_windows": _get_windows_group_servers("standard_windows"),
     }
-    
-    all_results = (linux_results + win2025_results + domain_results + 
-                   admin_results + standard_results)
-    return all_results, stats
+
+    all_results = []
+    stats = {}
+    for group, servers in groups.items():
+        results = snapshot.results(servers)
+        stats[group] = {"checked": len(servers), "success": len([r for r in results if r["success"]])}
+        all_results += results
+    return all_results, stats, snapshot
 
 # === ОСНОВНЫЕ ФУНКЦИИ ПРОВЕРКИ РЕСУРСОВ ===
 
 def get_linux_resources_improved(ip, timeout=20):
-    """Получение ресурсов Linux сервера"""
-    if not check_port(ip, 22, 3):
-        return None
-    
-    resources = {
-        "cpu": 0.0, "ram": 0.0, "disk": 0.0,
-        "load_avg": "N/A", "uptime": "N/A", "os": "Linux",
-        "timestamp": datetime.now().strftime("%H:%M:%S"),
-        "access_method": "SSH"
-    }
-    
-    # CPU usage
-    success, output, error = run_ssh_command(ip, "cat /proc/stat | head -1", 5)
-    if success and output:
-        try:
-            parts = output.split()
-            if len(parts) >= 8:
-                user = int(parts[1])
-                nice = int(parts[2]) 
-                system = int(parts[3])
-                idle = int(parts[4])
-                
-                total = user + nice + system + idle
-                if total > 0:
-                    resources["cpu"] = round((user + nice + system) * 100.0 / total, 1)
-        except:
-            pass
-    
-    # RAM usage
-    success, output, error = run_ssh_command(ip, "free -b | head -2", 5)
-    if success and output:
-        try:
-            lines = output.split('\n')
-            for line in lines:
-                if line.startswith('Mem:'):
-                    parts = line.split()
-                    if len(parts) >= 7:
-                        total_mem = int(parts[1])
-                        used_mem = int(parts[2])
-                        if total_mem > 0:
-                            resources["ram"] = round(used_mem * 100.0 / total_mem, 1)
-        except:
-            pass
-    
-    # Disk usage
-    success, output, error = run_ssh_command(ip, "df / | tail -1", 5)
-    if success and output:
-        try:
-            parts = output.split()
-            if len(parts) >= 5:
-                usage_str = parts[4]
-                if usage_str.endswith('%'):
-                    resources["disk"] = float(usage_str[:-1])
-        except:
-            pass
-    
-    return resources
+    """Получение ресурсов Linux сервера (один SSH вызов, CPU по приращениям)"""
+    from extensions.server_checks.linux_collector import linux_collector
+    return linux_collector.collect(ip, timeout)
 
 def get_windows_resources_improved(ip, timeout=30):
     """Улучшенное получение ресурсов Windows сервера с несколькими методами"""
@@ -393,55 +277,8 @@ def get_windows_resources_improved(ip, timeout=30):
     print(f"❌ Сервер {ip} недоступен для мониторинга ресурсов")
     return None
 
-def get_windows_resources_winrm(ip, timeout=30):
-    """Получение ресурсов через WinRM с исправлением кодировки"""
-    try:
-        import winrm
-        
-        credentials = get_windows_server_credentials(ip)
-        
-        for cred in credentials:
-            try:
-                username = cred["username"]
-                password = cred["password"]
-                domain = ""
-                
-                # Если имя пользователя содержит домен
-                if "\\" in username:
-                    domain, username = username.split("\\", 1)
-                
-                # Подключаемся к WinRM
-                if domain:
-                    session = winrm.Session(
-                        ip,
-                        auth=(f"{domain}\\{username}", password),
-                        transport='ntlm',
-                        server_cert_validation='ignore',
-                        read_timeout_sec=timeout
-                    )
-                else:
-                    session = winrm.Session(
-                        ip,
-                        auth=(username, password),
-                        transport='ntlm', 
-                        server_cert_validation='ignore',
-                        read_timeout_sec=timeout
-                    )
-                
-                # Простая проверка подключения
-                result = session.run_cmd('hostname')
-                if result.status_code != 0:
-                    continue
-                
-                resources = {
-                    "cpu": 0.0, "ram": 0.0, "disk": 0.0,
-                    "os": "Windows Server",
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                    "access_method": "WinRM"
-                }
-                
-                # Комплексный PowerShell скрипт для получения всех метрик
-                ps_script = """
+# Комплексный PowerShell скрипт для получения всех метрик
+WINRM_RESOURCES_SCRIPT = """
 # CPU Usage
 $cpu = Get-WmiObject -Class Win32_Processor | Measure-Object -Property LoadPercentage -Average | Select-Object -ExpandProperty Average
 if (-not $cpu) { $cpu = 0 }
@@ -464,44 +301,62 @@ if ($disk) {
 # Output as CSV
 "$cpu,$memPercent,$diskPercent"
 """
-                
-                result = session.run_ps(ps_script)
-                if result.status_code == 0:
-                    # ИСПРАВЛЕНИЕ: корректная обработка вывода с учетом кодировки
-                    output = ""
-                    if hasattr(result, 'std_out') and result.std_out:
-                        if isinstance(result.std_out, bytes):
-                            output = result.std_out.decode('utf-8', errors='ignore')
-                        else:
-                            output = str(result.std_out)
-                    
-                    if output:
-                        parts = output.strip().split(',')
-                        if len(parts) == 3:
-                            try:
-                                resources["cpu"] = float(parts[0]) if parts[0] and parts[0].strip() else 0.0
-                                resources["ram"] = float(parts[1]) if parts[1] and parts[1].strip() else 0.0
-                                resources["disk"] = float(parts[2]) if parts[2] and parts[2].strip() else 0.0
-                            except (ValueError, TypeError) as e:
-                                print(f"Error parsing resources for {ip}: {e}, parts: {parts}")
-                
-                # Если получили хоть какие-то данные
-                if resources["cpu"] > 0 or resources["ram"] > 0 or resources["disk"] > 0:
-                    return resources
-                    
-            except Exception as e:
-                print(f"WinRM error for {ip} with {cred['username']}: {e}")
-                continue
-                
-        return None
-        
+
+
+def get_windows_resources_winrm(ip, timeout=30):
+    """Получение ресурсов через WinRM (кэш сессий, запоминание учетной записи)"""
+    try:
+        import winrm  # noqa: F401
     except ImportError:
         print("WinRM library not available")
         return None
+
+    from extensions.server_checks.winrm_sessions import winrm_sessions, WinRMAuthError
+
+    try:
+        credentials = get_windows_server_credentials(ip)
+        result = winrm_sessions.run_ps(ip, WINRM_RESOURCES_SCRIPT, credentials, timeout)
+    except WinRMAuthError as e:
+        print(f"WinRM error for {ip}: {e}")
+        return None
     except Exception as e:
         print(f"WinRM general error for {ip}: {e}")
         return None
-    
+
+    if result is None or result.status_code != 0:
+        return None
+
+    resources = {
+        "cpu": 0.0, "ram": 0.0, "disk": 0.0,
+        "os": "Windows Server",
+        "timestamp": datetime.now().strftime("%H:%M:%S"),
+        "access_method": "WinRM"
+    }
+
+    # ИСПРАВЛЕНИЕ: корректная обработка вывода с учетом кодировки
+    output = ""
+    if hasattr(result, 'std_out') and result.std_out:
+        if isinstance(result.std_out, bytes):
+            output = result.std_out.decode('utf-8', errors='ignore')
+        else:
+            output = str(result.std_out)
+
+    if output:
+        parts = output.strip().split(',')
+        if len(parts) == 3:
+            try:
+                resources["cpu"] = float(parts[0]) if parts[0] and parts[0].strip() else 0.0
+                resources["ram"] = float(parts[1]) if parts[1] and parts[1].strip() else 0.0
+                resources["disk"] = float(parts[2]) if parts[2] and parts[2].strip() else 0.0
+            except (ValueError, TypeError) as e:
+                print(f"Error parsing resources for {ip}: {e}, parts: {parts}")
+
+    # Если получили хоть какие-то данные
+    if resources["cpu"] > 0 or resources["ram"] > 0 or resources["disk"] > 0:
+        return resources
+
+    return None
+
 def get_windows_resources_wmi(ip, timeout=30):
     """Получение ресурсов через WMI (альтернативный метод)"""
     try:
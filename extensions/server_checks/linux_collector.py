@@ -0,0 +1,280 @@
+"""
+/extensions/server_checks/linux_collector.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Single round-trip Linux metrics collector
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Сбор метрик Linux за один удаленный вызов
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from lib.logging import debug_log
+
+# Файловые системы, которые не являются реальными дисками
+PSEUDO_FILESYSTEMS = ("tmpfs", "devtmpfs", "squashfs", "overlay", "udev")
+
+# Если предыдущий замер CPU старше, счетчики снимаются дважды за один вызов
+CPU_SAMPLE_MAX_AGE = 900
+CPU_SAMPLE_INTERVAL = 1
+
+_SECTION_PREFIX = "@@"
+
+_DF_EXCLUDES = " ".join(f"-x {fs}" for fs in PSEUDO_FILESYSTEMS)
+
+_BASE_SCRIPT = (
+    "echo @@stat; head -1 /proc/stat; "
+    "echo @@meminfo; cat /proc/meminfo; "
+    "echo @@loadavg; cat /proc/loadavg; "
+    "echo @@uptime; cat /proc/uptime; "
+    f"echo @@df; df -P -k {_DF_EXCLUDES} 2>/dev/null || df -P -k; "
+    "echo @@os; (. /etc/os-release 2>/dev/null && echo \"$PRETTY_NAME\")"
+)
+
+_PRIME_SCRIPT = f"echo @@stat0; head -1 /proc/stat; sleep {CPU_SAMPLE_INTERVAL}; "
+
+
+def _split_sections(output: str) -> Dict[str, List[str]]:
+    """Разбивает вывод скрипта на секции по маркерам @@name."""
+    sections: Dict[str, List[str]] = {}
+    current = None
+    for line in output.splitlines():
+        if line.startswith(_SECTION_PREFIX):
+            current = line[len(_SECTION_PREFIX):].strip()
+            sections[current] = []
+        elif current is not None:
+            sections[current].append(line)
+    return sections
+
+
+def parse_cpu_counters(line: str) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает строку cpu из /proc/stat
+
+    Returns:
+        Tuple[int, int]: (total, idle) счетчики в тиках или None
+    """
+    parts = line.split()
+    if not parts or parts[0] != "cpu" or len(parts) < 5:
+        return None
+    try:
+        # user nice system idle iowait irq softirq steal (guest уже входит в user)
+        values = [int(value) for value in parts[1:9]]
+    except ValueError:
+        return None
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return sum(values), idle
+
+
+def cpu_percent(previous: Tuple[int, int], current: Tuple[int, int]) -> Optional[float]:
+    """Вычисляет загрузку CPU по разнице двух замеров счетчиков."""
+    total_delta = current[0] - previous[0]
+    idle_delta = current[1] - previous[1]
+    if total_delta <= 0 or idle_delta < 0:
+        return None
+    return round((total_delta - idle_delta) * 100.0 / total_delta, 1)
+
+
+def parse_meminfo(lines: List[str]) -> Optional[float]:
+    """Вычисляет процент занятой памяти по /proc/meminfo."""
+    values = {}
+    for line in lines:
+        key, _, rest = line.partition(":")
+        fields = rest.split()
+        if fields:
+            try:
+                values[key.strip()] = int(fields[0])
+            except ValueError:
+                continue
+
+    total = values.get("MemTotal", 0)
+    if total <= 0:
+        return None
+
+    available = values.get("MemAvailable")
+    if available is None:
+        available = (
+            values.get("MemFree", 0)
+            + values.get("Buffers", 0)
+            + values.get("Cached", 0)
+        )
+    return round((total - available) * 100.0 / total, 1)
+
+
+def parse_df(lines: List[str]) -> List[Dict]:
+    """Разбирает вывод df -P -k в список файловых систем."""
+    disks = []
+    for line in lines[1:]:
+        parts = line.split()
+        if len(parts) < 6:
+            continue
+        filesystem, mount = parts[0], parts[5]
+        if filesystem in PSEUDO_FILESYSTEMS:
+            continue
+        try:
+            total_kb = int(parts[1])
+            used_kb = int(parts[2])
+            available_kb = int(parts[3])
+        except ValueError:
+            continue
+        if total_kb <= 0:
+            continue
+        # Процент считаем как df: used / (used + available)
+        capacity = used_kb + available_kb
+        percent = round(used_kb * 100.0 / capacity, 1) if capacity else 0.0
+        disks.append({
+            "filesystem": filesystem,
+            "mount": mount,
+            "total_gb": round(total_kb / 1024 / 1024, 1),
+            "used_gb": round(used_kb / 1024 / 1024, 1),
+            "percent": percent,
+        })
+    return disks
+
+
+def format_uptime(seconds: float) -> str:
+    """Форматирует время работы сервера."""
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes = seconds // 60
+    if days > 0:
+        return f"{days}д {hours}ч {minutes}м"
+    if hours > 0:
+        return f"{hours}ч {minutes}м"
+    return f"{minutes}м"
+
+
+class LinuxMetricsCollector:
+    """Сбор метрик Linux одним удаленным вызовом с расчетом CPU по приращениям"""
+
+    def __init__(self, sample_max_age: int = CPU_SAMPLE_MAX_AGE):
+        """Инициализация коллектора"""
+        self.sample_max_age = sample_max_age
+        self._cpu_samples: Dict[str, Tuple[float, Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_previous_sample(self, ip: str) -> Optional[Tuple[int, int]]:
+        """Возвращает предыдущий замер CPU, если он не устарел."""
+        with self._lock:
+            sample = self._cpu_samples.get(ip)
+        if not sample:
+            return None
+        taken_at, counters = sample
+        if time.monotonic() - taken_at > self.sample_max_age:
+            return None
+        return counters
+
+    def _store_sample(self, ip: str, counters: Tuple[int, int]) -> None:
+        """Сохраняет замер CPU для следующего расчета."""
+        with self._lock:
+            self._cpu_samples[ip] = (time.monotonic(), counters)
+
+    def forget(self, ip: str) -> None:
+        """Удаляет сохраненный замер для сервера."""
+        with self._lock:
+            self._cpu_samples.pop(ip, None)
+
+    def build_script(self, prime: bool) -> str:
+        """Формирует удаленную команду сбора метрик."""
+        return (_PRIME_SCRIPT + _BASE_SCRIPT) if prime else _BASE_SCRIPT
+
+    def collect(self, ip: str, timeout: int = 20) -> Optional[Dict]:
+        """
+        Собирает метрики Linux сервера за один SSH вызов
+
+        Args:
+            ip: IP адрес сервера
+            timeout: Таймаут выполнения
+
+        Returns:
+            Dict: Ресурсы сервера или None если сервер недоступен
+        """
+        from extensions.server_checks import run_ssh_command
+
+        previous = self._get_previous_sample(ip)
+        success, output, error = run_ssh_command(ip, self.build_script(prime=previous is None), timeout)
+        if not success and not output:
+            debug_log(f"❌ Не удалось собрать метрики {ip}: {error}")
+            return None
+
+        return self.parse(ip, output, previous)
+
+    def parse(self, ip: str, output: str, previous: Optional[Tuple[int, int]] = None) -> Dict:
+        """
+        Разбирает вывод скрипта сбора метрик
+
+        Args:
+            ip: IP адрес сервера
+            output: Вывод удаленной команды
+            previous: Предыдущий замер счетчиков CPU
+
+        Returns:
+            Dict: Ресурсы в формате get_linux_resources_improved
+        """
+        sections = _split_sections(output)
+        resources = {
+            "cpu": 0.0, "ram": 0.0, "disk": 0.0,
+            "load_avg": "N/A", "uptime": "N/A", "os": "Linux",
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+            "access_method": "SSH",
+        }
+
+        # CPU по приращению счетчиков
+        stat_lines = sections.get("stat") or []
+        current = parse_cpu_counters(stat_lines[0]) if stat_lines else None
+        if previous is None and sections.get("stat0"):
+            previous = parse_cpu_counters(sections["stat0"][0])
+        if current:
+            if previous:
+                cpu = cpu_percent(previous, current)
+                if cpu is not None:
+                    resources["cpu"] = cpu
+            self._store_sample(ip, current)
+
+        # RAM
+        ram = parse_meminfo(sections.get("meminfo", []))
+        if ram is not None:
+            resources["ram"] = ram
+
+        # Load average
+        loadavg = sections.get("loadavg") or []
+        if loadavg:
+            parts = loadavg[0].split()
+            if len(parts) >= 3:
+                resources["load_avg"] = " ".join(parts[:3])
+
+        # Uptime
+        uptime = sections.get("uptime") or []
+        if uptime:
+            try:
+                resources["uptime"] = format_uptime(float(uptime[0].split()[0]))
+            except (ValueError, IndexError):
+                pass
+
+        # Диски: disk - корневая ФС (как раньше), плюс самая заполненная
+        disks = parse_df(sections.get("df", []))
+        if disks:
+            root = next((d for d in disks if d["mount"] == "/"), disks[0])
+            fullest = max(disks, key=lambda d: d["percent"])
+            resources["disk"] = root["percent"]
+            resources["disk_max"] = fullest["percent"]
+            resources["disk_max_mount"] = fullest["mount"]
+            resources["disks"] = disks
+
+        os_lines = [line for line in sections.get("os", []) if line.strip()]
+        if os_lines:
+            resources["os"] = os_lines[0].strip()
+
+        return resources
+
+
+# Глобальный экземпляр коллектора
+linux_collector = LinuxMetricsCollector()
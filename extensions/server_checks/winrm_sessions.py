@@ -0,0 +1,174 @@
+"""
+/extensions/server_checks/winrm_sessions.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+WinRM session cache
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Кэш сессий WinRM
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+from lib.logging import debug_log
+
+
+class WinRMAuthError(Exception):
+    """Ни одна учетная запись не подошла для WinRM"""
+
+
+def _is_auth_error(error: Exception) -> bool:
+    """Определяет, вызвана ли ошибка отказом в аутентификации."""
+    try:
+        from winrm.exceptions import InvalidCredentialsError
+        if isinstance(error, InvalidCredentialsError):
+            return True
+    except ImportError:
+        pass
+
+    code = getattr(error, "code", None)
+    if code in (401, 403):
+        return True
+
+    text = str(error).lower()
+    return "401" in text or "unauthorized" in text
+
+
+def _credential_key(cred: Dict) -> str:
+    """Ключ учетной записи для запоминания удачной."""
+    return cred.get("username", "")
+
+
+class WinRMSessionCache:
+    """Кэш аутентифицированных NTLM-сессий WinRM по хостам"""
+
+    def __init__(self):
+        """Инициализация кэша"""
+        self._sessions: Dict[str, Tuple[object, str]] = {}
+        self._winners: Dict[str, str] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _host_lock(self, ip: str) -> threading.Lock:
+        """Сессия хоста используется одним потоком за раз."""
+        with self._lock:
+            lock = self._host_locks.get(ip)
+            if lock is None:
+                lock = threading.Lock()
+                self._host_locks[ip] = lock
+            return lock
+
+    @staticmethod
+    def build_session(ip: str, cred: Dict, timeout: int):
+        """Создает сессию WinRM с NTLM аутентификацией."""
+        import winrm
+
+        username = cred["username"]
+        password = cred["password"]
+        domain = ""
+
+        # Если имя пользователя содержит домен
+        if "\\" in username:
+            domain, username = username.split("\\", 1)
+
+        auth_user = f"{domain}\\{username}" if domain else username
+        return winrm.Session(
+            ip,
+            auth=(auth_user, password),
+            transport='ntlm',
+            server_cert_validation='ignore',
+            read_timeout_sec=timeout
+        )
+
+    def _ordered_credentials(self, ip: str, credentials: List[Dict]) -> List[Dict]:
+        """Ставит последнюю удачную учетную запись первой."""
+        with self._lock:
+            winner = self._winners.get(ip)
+        if not winner:
+            return list(credentials)
+        return sorted(credentials, key=lambda cred: _credential_key(cred) != winner)
+
+    def _remember(self, ip: str, session, cred: Dict) -> None:
+        """Запоминает рабочую сессию и учетную запись."""
+        with self._lock:
+            self._sessions[ip] = (session, _credential_key(cred))
+            self._winners[ip] = _credential_key(cred)
+
+    def invalidate(self, ip: str, forget_credential: bool = False) -> None:
+        """Сбрасывает сессию хоста (и при необходимости удачную учетную запись)."""
+        with self._lock:
+            self._sessions.pop(ip, None)
+            if forget_credential:
+                self._winners.pop(ip, None)
+
+    def run_ps(self, ip: str, script: str, credentials: List[Dict], timeout: int = 30):
+        """
+        Выполняет PowerShell скрипт, переиспользуя сессию хоста
+
+        Другие учетные записи перебираются только после отказа
+        в аутентификации; сетевые ошибки не приводят к перебору.
+
+        Args:
+            ip: IP адрес
+            script: PowerShell скрипт
+            credentials: Учетные записи хоста
+            timeout: Таймаут чтения
+
+        Returns:
+            Результат run_ps или None при сетевой ошибке
+
+        Raises:
+            WinRMAuthError: если ни одна учетная запись не подошла
+        """
+        with self._host_lock(ip):
+            with self._lock:
+                cached = self._sessions.get(ip)
+
+            rejected = None
+            if cached is not None:
+                session, cred_key = cached
+                try:
+                    return session.run_ps(script)
+                except Exception as e:
+                    if _is_auth_error(e):
+                        debug_log(f"⚠️ WinRM {ip}: учетная запись {cred_key} больше не подходит")
+                        self.invalidate(ip, forget_credential=True)
+                        rejected = cred_key
+                    else:
+                        # Соединение могло быть закрыто сервером - пробуем новую сессию
+                        debug_log(f"⚠️ WinRM {ip}: сессия сброшена ({e})")
+                        self.invalidate(ip)
+
+            for cred in self._ordered_credentials(ip, credentials):
+                if _credential_key(cred) == rejected:
+                    continue
+                try:
+                    session = self.build_session(ip, cred, timeout)
+                    result = session.run_ps(script)
+                except Exception as e:
+                    if _is_auth_error(e):
+                        debug_log(f"WinRM auth failed for {ip} with {cred.get('username')}")
+                        continue
+                    debug_log(f"WinRM error for {ip} with {cred.get('username')}: {e}")
+                    return None
+
+                self._remember(ip, session, cred)
+                return result
+
+        raise WinRMAuthError(f"WinRM: нет подходящих учетных данных для {ip}")
+
+    def get_stats(self) -> Dict:
+        """Возвращает статистику кэша."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "known_credentials": len(self._winners),
+            }
+
+
+# Глобальный экземпляр кэша сессий
+winrm_sessions = WinRMSessionCache()
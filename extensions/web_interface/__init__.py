@@ -11,15 +11,19 @@ Web interface
 Веб-интерфейс
 """
 
-from flask import Flask, jsonify, render_template_string, request
+from flask import Flask, Response, jsonify, make_response, render_template_string, request
 from config.db_settings import WEB_PORT, WEB_HOST
 from config.settings import STATS_FILE
+import hashlib
 import threading
-from datetime import datetime
+from datetime import datetime, timezone
 import json
 import subprocess
 import sys
 
+# Интервал комментария-пинга в потоке событий, секунды
+EVENTS_KEEPALIVE = 15
+
 app = Flask(__name__)
 
 # HTML шаблон с вкладками и темной темой (без вкладки Ресурсы)
@@ -342,19 +346,19 @@ HTML_TEMPLATE = """
                     <h2>📊 Общая статистика</h2>
                     <div class="stat-item">
                         <span>Всего серверов:</span>
-                        <span class="stat-value">{{ stats.total_servers }}</span>
+                        <span class="stat-value" id="statTotal">{{ stats.total_servers }}</span>
                     </div>
                     <div class="stat-item">
                         <span>Доступно:</span>
-                        <span class="stat-value status-up">{{ stats.servers_up }}</span>
+                        <span class="stat-value status-up" id="statUp">{{ stats.servers_up }}</span>
                     </div>
                     <div class="stat-item">
                         <span>Недоступно:</span>
-                        <span class="stat-value status-down">{{ stats.servers_down }}</span>
+                        <span class="stat-value status-down" id="statDown">{{ stats.servers_down }}</span>
                     </div>
                     <div class="stat-item">
                         <span>Доступность:</span>
-                        <span class="stat-value">{{ stats.availability_percentage }}%</span>
+                        <span class="stat-value" id="statAvailability">{{ stats.availability_percentage }}%</span>
                     </div>
                 </div>
                 
@@ -370,7 +374,7 @@ HTML_TEMPLATE = """
                     </div>
                     <div class="stat-item">
                         <span>Последняя проверка:</span>
-                        <span class="stat-value">{{ stats.last_check_time }}</span>
+                        <span class="stat-value" id="statLastCheck">{{ stats.last_check_time }}</span>
                     </div>
                     <div class="stat-item">
                         <span>Интервал:</span>
@@ -390,7 +394,7 @@ HTML_TEMPLATE = """
                     </div>
                     <div class="stat-item">
                         <span>Проблем с ресурсами:</span>
-                        <span class="stat-value status-warning">{{ stats.resource_alerts }}</span>
+                        <span class="stat-value status-warning" id="statResourceAlerts">{{ stats.resource_alerts }}</span>
                     </div>
                     <div class="stat-item">
                         <span>Время работы:</span>
@@ -411,10 +415,12 @@ HTML_TEMPLATE = """
             <h2 style="margin-bottom: 20px;">🖥️ Статус серверов</h2>
             <div class="server-list">
                 {% for server in servers %}
-                <div class="server-item {% if server.status == 'down' %}down{% elif server.status == 'warning' %}warning{% endif %} fade-in">
+                <div class="server-item {% if server.status == 'down' %}down{% elif server.status == 'warning' %}warning{% endif %} fade-in"
+                     data-ip="{{ server.ip }}" data-state="{{ 'up' if server.status == 'warning' else server.status }}"
+                     {% if server.resources %}data-cpu="{{ server.resources.cpu }}" data-ram="{{ server.resources.ram }}" data-disk="{{ server.resources.disk }}"{% endif %}>
                     <div class="server-info">
                         <div class="server-name">{{ server.name }}</div>
-                        <div class="server-details">{{ server.ip }} • {{ server.type.upper() }} • {{ server.os }}</div>
+                        <div class="server-details">{{ server.ip }} • {{ server.type.upper() }} • <span class="server-os">{{ server.os }}</span></div>
                         {% if server.resources %}
                         <div class="server-resources">
                             <div class="resource-item">
@@ -554,7 +560,7 @@ HTML_TEMPLATE = """
                 .then(response => response.json())
                 .then(data => {
                     addLog(data.message);
-                    if (data.success && data.reload !== false) {
+                    if (data.success && data.reload !== false && !liveConnected) {
                         setTimeout(() => location.reload(), 2000);
                     }
                 })
@@ -570,7 +576,7 @@ HTML_TEMPLATE = """
                 .then(response => response.json())
                 .then(data => {
                     addLog(data.message);
-                    if (data.success && data.reload) {
+                    if (data.success && data.reload && !liveConnected) {
                         setTimeout(() => location.reload(), 2000);
                     }
                 })
@@ -689,18 +695,149 @@ HTML_TEMPLATE = """
             }
         };       
         
-        // Авто-обновление каждые 30 секунд
-        setTimeout(() => {
-            location.reload();
-        }, 30000);
-        
-        // Обновление времени
-        function updateLastUpdate() {
-            const now = new Date();
-            document.getElementById('lastUpdate').textContent = now.toLocaleString('ru-RU');
+        // Живое обновление: сервер присылает только изменения
+        const STATUS_TEXT = {
+            up: '✅ Доступен',
+            down: '❌ Недоступен',
+            warning: '⚠️ Высокая нагрузка',
+            unknown: '⏳ Нет данных'
+        };
+        const RESOURCE_LIMITS = {
+            cpu: [80, 90],
+            ram: [85, 95],
+            disk: [80, 90]
+        };
+        const JOB_STATUS_TEXT = {
+            running: '▶️ выполняется',
+            done: '✅ выполнено',
+            failed: '❌ ошибка',
+            cancelled: '🛑 отменено'
+        };
+        let liveConnected = false;
+
+        function resourceClass(value, type) {
+            const [warning, critical] = RESOURCE_LIMITS[type];
+            if (!value) return 'normal';
+            if (value >= critical) return 'critical';
+            if (value >= warning) return 'warning';
+            return 'normal';
         }
-        
-        updateLastUpdate();
+
+        function serverStatus(item) {
+            const state = item.dataset.state;
+            if (state !== 'up') return state;
+            const cpu = +item.dataset.cpu || 0, ram = +item.dataset.ram || 0, disk = +item.dataset.disk || 0;
+            return (cpu > 80 || ram > 85 || disk > 80) ? 'warning' : 'up';
+        }
+
+        function renderServer(item) {
+            const status = serverStatus(item);
+            const badge = item.querySelector('.server-status');
+            [item, badge].forEach(el => {
+                el.classList.toggle('down', status === 'down');
+                el.classList.toggle('warning', status === 'warning');
+            });
+            badge.textContent = STATUS_TEXT[status] || status;
+        }
+
+        function escapeHtml(value) {
+            // Значения приходят с серверов как есть и не должны разбираться как разметка
+            return String(value).replace(/[&<>"']/g, ch => ({
+                '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+            })[ch]);
+        }
+
+        function resourcesHtml(r) {
+            let html = '';
+            [['cpu', '💻 CPU'], ['ram', '🧠 RAM'], ['disk', '💾 Disk']].forEach(([key, label]) => {
+                html += `<div class="resource-item"><span>${label}:</span>` +
+                        `<span class="resource-${key} ${resourceClass(r[key], key)}">${escapeHtml(r[key] || 0)}%</span></div>`;
+            });
+            if (r.load_avg && r.load_avg !== 'N/A') {
+                html += `<div class="resource-item"><span>📊 Load:</span><span>${escapeHtml(r.load_avg)}</span></div>`;
+            }
+            if (r.uptime && r.uptime !== 'N/A') {
+                html += `<div class="resource-item"><span>⏱️ Uptime:</span><span>${escapeHtml(r.uptime)}</span></div>`;
+            }
+            return html;
+        }
+
+        function updateSummary() {
+            const items = document.querySelectorAll('#servers .server-item');
+            let up = 0, down = 0, alerts = 0;
+            items.forEach(item => {
+                if (item.dataset.state === 'up') up++;
+                if (item.dataset.state === 'down') down++;
+                if (+item.dataset.cpu >= 90 || +item.dataset.ram >= 95 || +item.dataset.disk >= 90) alerts++;
+            });
+            document.getElementById('statTotal').textContent = items.length;
+            document.getElementById('statUp').textContent = up;
+            document.getElementById('statDown').textContent = down;
+            document.getElementById('statResourceAlerts').textContent = alerts;
+            document.getElementById('statAvailability').textContent =
+                (items.length ? Math.round(up / items.length * 1000) / 10 : 0) + '%';
+        }
+
+        function findServer(ip) {
+            return document.querySelector(`#servers .server-item[data-ip="${ip}"]`);
+        }
+
+        function connectLive() {
+            if (!window.EventSource) {
+                // Браузер без SSE: обновляем страницу целиком
+                setTimeout(() => location.reload(), 30000);
+                return;
+            }
+            const source = new EventSource('/api/events');
+            source.onopen = () => { liveConnected = true; };
+            source.onerror = () => { liveConnected = false; };
+
+            source.addEventListener('sweep', e => {
+                const data = JSON.parse(e.data);
+                data.changes.forEach(change => {
+                    const item = findServer(change.ip);
+                    if (!item) return;
+                    item.dataset.state = change.up ? 'up' : 'down';
+                    renderServer(item);
+                });
+                document.getElementById('statLastCheck').textContent = data.checked_at;
+                document.getElementById('lastUpdate').textContent = data.checked_at;
+                updateSummary();
+            });
+
+            source.addEventListener('resources', e => {
+                const data = JSON.parse(e.data);
+                Object.entries(data.servers).forEach(([ip, r]) => {
+                    const item = findServer(ip);
+                    if (!item) return;
+                    item.dataset.cpu = r.cpu || 0;
+                    item.dataset.ram = r.ram || 0;
+                    item.dataset.disk = r.disk || 0;
+                    let block = item.querySelector('.server-resources');
+                    if (!block) {
+                        block = document.createElement('div');
+                        block.className = 'server-resources';
+                        item.querySelector('.server-info').appendChild(block);
+                    }
+                    block.innerHTML = resourcesHtml(r);
+                    if (r.os) item.querySelector('.server-os').textContent = r.os;
+                    renderServer(item);
+                });
+                updateSummary();
+            });
+
+            source.addEventListener('job', e => {
+                const job = JSON.parse(e.data);
+                const text = JOB_STATUS_TEXT[job.status];
+                if (!text) return;
+                addLog(`${escapeHtml(job.title)}: ${text}${job.error ? ' — ' + escapeHtml(job.error) : ''}`);
+            });
+
+            // Пропущенные события уже недоступны: загружаем страницу заново
+            source.addEventListener('reset', () => location.reload());
+        }
+
+        connectLive();
     </script>
 </body>
 </html>
@@ -734,173 +871,295 @@ def get_resource_class(value, resource_type):
             return "normal"
     return "normal"
 
-def get_monitoring_stats():
-    """Получает статистику мониторинга"""
+class DashboardView:
+    """Подготовленные данные веб-интерфейса для одного состояния мониторинга"""
+
+    def __init__(self, stats, servers, key):
+        self.stats = stats
+        self.servers = servers
+        self.etag = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=12).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.html = None
+
+
+_dashboard_lock = threading.Lock()
+_dashboard_view = None
+_dashboard_key = None
+
+
+def _dashboard_state_key():
+    """
+    Признак состояния, от которого зависят данные страницы
+
+    Состоит из версий состояния серверов, снимка ресурсов и реестра
+    серверов, режимов мониторинга и времени изменения файла статистики.
+    """
+    from core.monitor_core import monitoring_active, is_silent_time
+    from core.resource_cache import resource_cache
+    from core.server_registry import server_registry
+    from core.server_state import server_state
+
+    snapshot = resource_cache.peek()
     try:
-        # Пробуем получить данные из файла статистики
-        stats_data = {}
-        if STATS_FILE.exists():
-            stats_data = json.loads(STATS_FILE.read_text(encoding="utf-8"))
-        
-        # Получаем текущий статус серверов
-        from core.monitor_core import get_current_server_status, monitoring_active, last_check_time
-        from core.monitor_core import is_silent_time, resource_history
-        from extensions.server_list import initialize_servers
-        
-        current_status = get_current_server_status()
-        servers_list = initialize_servers()
-        
-        # Формируем список серверов для отображения
-        servers_display = []
-        
-        for server in servers_list:
-            is_up = any(s["ip"] == server["ip"] for s in current_status["ok"])
-            is_down = any(s["ip"] == server["ip"] for s in current_status["failed"])
-            
-            status = "up" if is_up else "down"
-            status_display = "✅ Доступен" if is_up else "❌ Недоступен"
-            
-            # Получаем информацию о ресурсах
-            resources_data = None
-            os_info = "Unknown"
-            if server["ip"] in resource_history and resource_history[server["ip"]]:
-                latest_resources = resource_history[server["ip"]][-1]
-                os_info = latest_resources.get("os", "Unknown")
-                
-                # Форматируем ресурсы с классами для окрашивания
-                cpu_value = latest_resources.get("cpu", 0)
-                ram_value = latest_resources.get("ram", 0)
-                disk_value = latest_resources.get("disk", 0)
-                
-                resources_data = {
-                    "cpu": cpu_value,
-                    "ram": ram_value,
-                    "disk": disk_value,
-                    "load_avg": latest_resources.get("load_avg", "N/A"),
-                    "uptime": latest_resources.get("uptime", "N/A"),
-                    "cpu_class": get_resource_class(cpu_value, "cpu"),
-                    "ram_class": get_resource_class(ram_value, "ram"),
-                    "disk_class": get_resource_class(disk_value, "disk")
-                }
-                
-                # Проверяем на проблемы с ресурсами для статуса
-                if resources_data and (cpu_value > 80 or ram_value > 85 or disk_value > 80):
-                    status = "warning"
-                    status_display = "⚠️ Высокая нагрузка"
-            
-            server_data = {
-                "name": server["name"],
-                "ip": server["ip"],
-                "type": server["type"],
-                "os": os_info,
-                "status": status,
-                "status_display": status_display,
-                "resources": resources_data
+        stats_mtime = STATS_FILE.stat().st_mtime
+    except OSError:
+        stats_mtime = None
+    return (
+        server_state.version,
+        snapshot.created if snapshot is not None else None,
+        server_registry.snapshot().created,
+        bool(monitoring_active),
+        bool(is_silent_time()),
+        stats_mtime,
+    )
+
+
+def _format_time(value):
+    return value.strftime("%H:%M:%S") if value else "N/A"
+
+
+def _build_monitoring_stats():
+    """Формирует статистику и список серверов из последнего известного состояния"""
+    stats_data = {}
+    if STATS_FILE.exists():
+        stats_data = json.loads(STATS_FILE.read_text(encoding="utf-8"))
+
+    from core.monitor_core import monitoring_active, is_silent_time
+    from core.metrics_store import metrics_store
+    from core.resource_cache import resource_cache
+    from core.server_state import server_state
+    from extensions.server_checks import initialize_servers
+
+    servers_list = initialize_servers()
+    _, last_sweep, states = server_state.snapshot()
+
+    # Последний обход ресурсов в памяти; после перезапуска - последние значения из хранилища
+    snapshot = resource_cache.peek()
+    if snapshot is not None:
+        latest_by_ip = {ip: row["resources"] for ip, row in snapshot.rows.items() if row["resources"]}
+    else:
+        latest_by_ip = metrics_store.get_latest()
+
+    # Формируем список серверов для отображения
+    servers_display = []
+    servers_up = 0
+    servers_down = 0
+
+    for server in servers_list:
+        state = states.get(server["ip"])
+        if state is None:
+            # Сервер еще не проверялся циклом мониторинга
+            status = "unknown"
+            status_display = "⏳ Нет данных"
+        elif state["up"]:
+            servers_up += 1
+            status = "up"
+            status_display = "✅ Доступен"
+        else:
+            servers_down += 1
+            status = "down"
+            status_display = "❌ Недоступен"
+
+        # Получаем информацию о ресурсах
+        resources_data = None
+        os_info = "Unknown"
+        if latest_by_ip.get(server["ip"]):
+            latest_resources = latest_by_ip[server["ip"]]
+            os_info = latest_resources.get("os", "Unknown")
+
+            # Форматируем ресурсы с классами для окрашивания
+            cpu_value = latest_resources.get("cpu", 0)
+            ram_value = latest_resources.get("ram", 0)
+            disk_value = latest_resources.get("disk", 0)
+
+            resources_data = {
+                "cpu": cpu_value,
+                "ram": ram_value,
+                "disk": disk_value,
+                "load_avg": latest_resources.get("load_avg", "N/A"),
+                "uptime": latest_resources.get("uptime", "N/A"),
+                "cpu_class": get_resource_class(cpu_value, "cpu"),
+                "ram_class": get_resource_class(ram_value, "ram"),
+                "disk_class": get_resource_class(disk_value, "disk")
             }
-            
-            servers_display.append(server_data)
-        
-        # Сортируем серверы: сначала проблемные, потом доступные
-        servers_display.sort(key=lambda x: (0 if x["status"] == "down" else 1 if x["status"] == "warning" else 2))
-        
-        # Рассчитываем статистику
-        total_servers = len(servers_list)
-        servers_up = len(current_status["ok"])
-        servers_down = len(current_status["failed"])
-        availability_percentage = round((servers_up / total_servers) * 100, 1) if total_servers > 0 else 0
-        
-        # Получаем настройки из конфига
-        from config.db_settings import CHECK_INTERVAL, RESOURCE_CHECK_INTERVAL
-        resource_check_minutes = RESOURCE_CHECK_INTERVAL // 60
-        
-        # Считаем проблемы с ресурсами
-        resource_alerts_count = 0
-        for history in resource_history.values():
-            if history:
-                last_resource = history[-1]
-                if (last_resource.get("cpu", 0) >= 90 or 
-                    last_resource.get("ram", 0) >= 95 or 
-                    last_resource.get("disk", 0) >= 90):
-                    resource_alerts_count += 1
-        
-        stats = {
-            "total_servers": total_servers,
-            "servers_up": servers_up,
-            "servers_down": servers_down,
-            "availability_percentage": availability_percentage,
-            "last_check_time": last_check_time.strftime("%H:%M:%S") if last_check_time else "N/A",
-            "check_interval": CHECK_INTERVAL,
-            "monitoring_mode": "🟢 Активен" if monitoring_active else "🔴 Приостановлен",
-            "silent_mode": "🔇 Включен" if is_silent_time() else "🔊 Выключен",
-            "resource_check_status": "🟢 Работает" if monitoring_active and not is_silent_time() else "⏸️ Приостановлен",
-            "resource_check_interval": resource_check_minutes,
-            "resource_alerts": resource_alerts_count,
-            "uptime": stats_data.get("uptime", "N/A")
-        }
-        
-        return stats, servers_display
-        
+
+            # Проверяем на проблемы с ресурсами для статуса
+            if status == "up" and (cpu_value > 80 or ram_value > 85 or disk_value > 80):
+                status = "warning"
+                status_display = "⚠️ Высокая нагрузка"
+
+        servers_display.append({
+            "name": server["name"],
+            "ip": server["ip"],
+            "type": server["type"],
+            "os": os_info,
+            "status": status,
+            "status_display": status_display,
+            "status_since": state["since"].isoformat() if state else None,
+            "last_check": state["checked_at"].isoformat() if state else None,
+            "resources": resources_data
+        })
+
+    # Сортируем серверы: сначала проблемные, потом доступные
+    status_order = {"down": 0, "warning": 1, "unknown": 2}
+    servers_display.sort(key=lambda x: status_order.get(x["status"], 3))
+
+    # Рассчитываем статистику
+    total_servers = len(servers_list)
+    availability_percentage = round((servers_up / total_servers) * 100, 1) if total_servers > 0 else 0
+
+    # Получаем настройки из конфига
+    from config.db_settings import CHECK_INTERVAL, RESOURCE_CHECK_INTERVAL
+    resource_check_minutes = RESOURCE_CHECK_INTERVAL // 60
+
+    # Считаем проблемы с ресурсами
+    resource_alerts_count = 0
+    for last_resource in latest_by_ip.values():
+        if last_resource:
+            if (last_resource.get("cpu", 0) >= 90 or
+                last_resource.get("ram", 0) >= 95 or
+                last_resource.get("disk", 0) >= 90):
+                resource_alerts_count += 1
+
+    silent = is_silent_time()
+    stats = {
+        "total_servers": total_servers,
+        "servers_up": servers_up,
+        "servers_down": servers_down,
+        "availability_percentage": availability_percentage,
+        "last_check_time": _format_time(last_sweep),
+        "resources_time": _format_time(snapshot.taken_at if snapshot is not None else None),
+        "check_interval": CHECK_INTERVAL,
+        "monitoring_mode": "🟢 Активен" if monitoring_active else "🔴 Приостановлен",
+        "silent_mode": "🔇 Включен" if silent else "🔊 Выключен",
+        "resource_check_status": "🟢 Работает" if monitoring_active and not silent else "⏸️ Приостановлен",
+        "resource_check_interval": resource_check_minutes,
+        "resource_alerts": resource_alerts_count,
+        "uptime": stats_data.get("uptime", "N/A")
+    }
+
+    return stats, servers_display
+
+
+def get_dashboard_view():
+    """
+    Данные веб-интерфейса из последнего известного состояния мониторинга
+
+    Страница и API не выполняют проверок серверов: данные пересчитываются
+    только когда меняется состояние, которое записывает цикл мониторинга,
+    иначе возвращается готовый результат.
+    """
+    global _dashboard_view, _dashboard_key
+
+    key = _dashboard_state_key()
+    with _dashboard_lock:
+        if _dashboard_view is not None and key == _dashboard_key:
+            return _dashboard_view
+
+        stats, servers = _build_monitoring_stats()
+        _dashboard_view = DashboardView(stats, servers, key)
+        _dashboard_key = key
+        return _dashboard_view
+
+
+# Данные по умолчанию при ошибке получения статистики
+ERROR_STATS = {
+    "total_servers": 0,
+    "servers_up": 0,
+    "servers_down": 0,
+    "availability_percentage": 0,
+    "last_check_time": "N/A",
+    "check_interval": 0,
+    "monitoring_mode": "❌ Ошибка",
+    "silent_mode": "N/A",
+    "resource_check_status": "❌ Ошибка",
+    "resource_check_interval": 0,
+    "resource_alerts": 0,
+    "uptime": "N/A"
+}
+
+
+def _current_view():
+    """Данные веб-интерфейса, при ошибке - данные по умолчанию (без кэширования)"""
+    try:
+        return get_dashboard_view()
     except Exception as e:
         print(f"❌ Ошибка получения статистики: {e}")
-        # Возвращаем данные по умолчанию при ошибке
-        return {
-            "total_servers": 0,
-            "servers_up": 0,
-            "servers_down": 0,
-            "availability_percentage": 0,
-            "last_check_time": "N/A",
-            "check_interval": 0,
-            "monitoring_mode": "❌ Ошибка",
-            "silent_mode": "N/A",
-            "resource_check_status": "❌ Ошибка",
-            "resource_check_interval": 0,
-            "resource_alerts": 0,
-            "uptime": "N/A"
-        }, []
+        return DashboardView(dict(ERROR_STATS), [], ("error", str(e)))
+
+
+def get_monitoring_stats():
+    """Получает статистику мониторинга"""
+    view = _current_view()
+    return view.stats, view.servers
+
+
+def _conditional(response, view):
+    """Добавляет ETag/Last-Modified; при совпадении с кэшем браузера отвечает 304."""
+    response.set_etag(view.etag)
+    response.last_modified = view.last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 @app.route('/')
 def index():
     """Главная страница веб-интерфейса"""
     try:
-        stats, servers = get_monitoring_stats()
-        
-        return render_template_string(
-            HTML_TEMPLATE,
-            stats=stats,
-            servers=servers,
-            last_update=datetime.now().strftime("%H:%M:%S")
-        )
+        view = _current_view()
+        if view.html is None:
+            view.html = render_template_string(
+                HTML_TEMPLATE,
+                stats=view.stats,
+                servers=view.servers,
+                last_update=view.stats["last_check_time"]
+            )
+        return _conditional(make_response(view.html), view)
     except Exception as e:
         return f"❌ Ошибка загрузки веб-интерфейса: {e}"
 
+# Фоновые задачи, запускаемые из веб-интерфейса: действие -> (тип задачи, описание)
+WEB_JOBS = {
+    "quick": ("availability_check", "Проверка доступности серверов"),
+    "check_all": ("availability_check", "Проверка доступности серверов"),
+    "resources": ("resources_check", "Проверка ресурсов"),
+    "check_resources": ("resources_check", "Проверка ресурсов"),
+    "report": ("morning_report", "Утренний отчет"),
+    "morning_report": ("morning_report", "Утренний отчет"),
+}
+
+
+def _submit_web_job(action):
+    """
+    Запускает тяжелое действие фоновой задачей
+
+    Повторное нажатие, пока задача выполняется, возвращает ту же задачу.
+    """
+    from core.job_runner import job_runner
+    from core import monitor_core
+
+    kind, title = WEB_JOBS[action]
+    if kind == "availability_check":
+        job, created = monitor_core.submit_availability_check()
+    elif kind == "resources_check":
+        job, created = monitor_core.submit_resources_check()
+    else:
+        job, created = job_runner.submit(kind, monitor_core.send_morning_report, title=title)
+
+    if created:
+        message = f"⏳ {job.title}: задача {job.id} запущена"
+    else:
+        message = f"⏳ {job.title}: задача {job.id} уже выполняется"
+    return jsonify({"success": True, "message": message, "job": job.to_dict(with_result=False), "reload": False}), 202
+
 @app.route('/api/run_check')
 def api_run_check():
     """API для запуска проверок"""
     check_type = request.args.get('type', 'quick')
     
     try:
-        if check_type == 'quick':
-            # Запуск быстрой проверки доступности
-            from core.monitor_core import get_current_server_status
-            status = get_current_server_status()
-            message = f"✅ Быстрая проверка выполнена: {len(status['ok'])} доступно, {len(status['failed'])} недоступно"
-            
-        elif check_type == 'resources':
-            # Запуск проверки ресурсов
-            from core.monitor_core import check_resources_automatically
-            check_resources_automatically()
-            message = "✅ Проверка ресурсов выполнена. Данные обновятся через 1-2 минуты."
-            
-        elif check_type == 'report':
-            # Формирование отчета
-            from core.monitor_core import send_morning_report
-            send_morning_report()
-            message = "✅ Отчет сформирован и отправлен в Telegram"
-            
-        else:
-            message = "❌ Неизвестный тип проверки"
-            
-        return jsonify({"success": True, "message": message, "reload": check_type != 'resources'})
+        if check_type in WEB_JOBS:
+            return _submit_web_job(check_type)
+        return jsonify({"success": True, "message": "❌ Неизвестный тип проверки", "reload": False})
         
     except Exception as e:
         return jsonify({"success": False, "message": f"❌ Ошибка: {str(e)}"})
@@ -911,21 +1170,9 @@ def api_run_action():
     action = request.args.get('action', '')
     
     try:
-        if action == 'check_all':
-            from core.monitor_core import get_current_server_status
-            status = get_current_server_status()
-            message = f"✅ Проверка всех серверов выполнена: {len(status['ok'])} доступно, {len(status['failed'])} недоступно"
-            
-        elif action == 'check_resources':
-            from core.monitor_core import check_resources_automatically
-            check_resources_automatically()
-            message = "✅ Проверка ресурсов запущена. Данные обновятся через 1-2 минуты."
-            
-        elif action == 'morning_report':
-            from core.monitor_core import send_morning_report
-            send_morning_report()
-            message = "✅ Утренний отчет отправлен в Telegram"
-            
+        if action in WEB_JOBS:
+            return _submit_web_job(action)
+
         elif action == 'restart_service':
             # Перезапуск сервиса (осторожно!)
             subprocess.run(['systemctl', 'restart', 'server-monitor.service'], check=True)
@@ -945,43 +1192,102 @@ def api_run_action():
         return jsonify({
             "success": True, 
             "message": message, 
-            "reload": action not in ['check_resources', 'toggle_monitoring', 'toggle_silent']
+            "reload": action == 'restart_service'
         })
         
     except Exception as e:
         return jsonify({"success": False, "message": f"❌ Ошибка: {str(e)}"})
 
+@app.route('/api/jobs')
+def api_jobs():
+    """API: последние фоновые задачи"""
+    from core.job_runner import job_runner
+    return jsonify({"jobs": [job.to_dict(with_result=False) for job in job_runner.list()]})
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    """API: состояние и результат фоновой задачи"""
+    from core.job_runner import job_runner
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "❌ Задача не найдена"}), 404
+    return jsonify({"success": True, "job": job.to_dict()})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """API: отмена фоновой задачи"""
+    from core.job_runner import job_runner
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "❌ Задача не найдена"}), 404
+    if not job_runner.cancel(job_id):
+        return jsonify({"success": False, "message": f"⚠️ Задача {job_id} уже завершена", "job": job.to_dict()}), 409
+    return jsonify({"success": True, "message": f"🛑 Отмена задачи {job_id} запрошена", "job": job.to_dict(with_result=False)})
+
 @app.route('/api/status')
 def api_status():
     """API endpoint для получения статуса"""
-    stats, servers = get_monitoring_stats()
-    return jsonify({
+    view = _current_view()
+    return _conditional(jsonify({
         "status": "ok", 
         "message": "Система мониторинга работает",
         "data": {
-            "stats": stats,
-            "servers": servers,
-            "timestamp": datetime.now().isoformat()
+            "stats": view.stats,
+            "servers": view.servers,
+            "timestamp": view.last_modified.isoformat()
         }
-    })
+    }), view)
 
 @app.route('/api/servers')
 def api_servers():
     """API endpoint для получения списка серверов"""
-    stats, servers = get_monitoring_stats()
-    return jsonify({
-        "servers": servers,
-        "count": len(servers),
-        "timestamp": datetime.now().isoformat()
-    })
+    view = _current_view()
+    return _conditional(jsonify({
+        "servers": view.servers,
+        "count": len(view.servers),
+        "timestamp": view.last_modified.isoformat()
+    }), view)
 
 @app.route('/api/stats')
 def api_stats():
     """API endpoint для получения статистики"""
-    stats, servers = get_monitoring_stats()
-    return jsonify({
-        "statistics": stats,
-        "timestamp": datetime.now().isoformat()
+    view = _current_view()
+    return _conditional(jsonify({
+        "statistics": view.stats,
+        "timestamp": view.last_modified.isoformat()
+    }), view)
+
+@app.route('/api/events')
+def api_events():
+    """Поток событий (SSE): изменения доступности и ресурсов серверов"""
+    from core.live_events import live_events
+
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        # Новое подключение: страница уже показывает текущее состояние
+        last_id = live_events.last_id
+
+    def stream():
+        after_id = last_id
+        if after_id > live_events.last_id:
+            # Номер от предыдущего запуска сервиса
+            yield "event: reset\ndata: {}\n\n"
+            return
+        yield "retry: 5000\n\n"
+        while True:
+            frames, after_id, missed = live_events.wait(after_id, EVENTS_KEEPALIVE)
+            if missed:
+                yield "event: reset\ndata: {}\n\n"
+                return
+            if frames:
+                yield "".join(frames)
+            else:
+                yield ": ping\n\n"
+
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
     })
 
 @app.route('/health')
@@ -994,7 +1300,7 @@ def api_manage_servers():
     """API для управления списком серверов"""
     if request.method == 'GET':
         # Получить список серверов
-        from extensions.server_list import initialize_servers
+        from extensions.server_checks import initialize_servers
         servers = initialize_servers()
         return jsonify({"servers": servers})
     
@@ -1020,7 +1326,7 @@ def start_web_server():
     """Запускает веб-сервер"""
     print(f"🌐 Запуск веб-интерфейса на http://{WEB_HOST}:{WEB_PORT}")
     try:
-        app.run(host=WEB_HOST, port=WEB_PORT, debug=False, use_reloader=False)
+        app.run(host=WEB_HOST, port=WEB_PORT, debug=False, use_reloader=False, threaded=True)
     except Exception as e:
         print(f"❌ Ошибка запуска веб-сервера: {e}")
 
@@ -11,10 +11,16 @@ Unified alert system
 Единая система оповещений
 """
 
+import atexit
+import hashlib
+import ipaddress
+import threading
 import time
-from typing import List, Optional, Dict, Any
+from collections import deque
+from typing import Deque, List, Optional, Dict, Any
 from datetime import datetime, time as dt_time
 from lib.logging import debug_log, error_log, setup_logging
+from lib.telegram_dispatcher import telegram_dispatcher as _dispatcher
 
 # Логгер для этого модуля
 _logger = setup_logging("alerts")
@@ -23,8 +29,22 @@ _logger = setup_logging("alerts")
 _telegram_bot = None
 _chat_ids = []
 _silent_override: Optional[bool] = None
-_alert_history: List[Dict[str, Any]] = []
 _max_history_size = 1000
+_alert_history: Deque[Dict[str, Any]] = deque(maxlen=_max_history_size)
+# Отпечаток сообщения -> time.monotonic() последней отправки
+_cooldown_index: Dict[bytes, float] = {}
+# Размер индекса кд, при котором из него удаляются истекшие записи
+_cooldown_prune_at = _max_history_size
+# День (YYYY-MM-DD) -> тип алерта -> {"total", "sent"}
+_daily_stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+_daily_stats_days = 7
+_history_lock = threading.Lock()
+# События доступности, ожидающие окончания окна агрегации
+_pending_events: List[Dict[str, Any]] = []
+_aggregation_timer: Optional[threading.Timer] = None
+_aggregation_lock = threading.Lock()
+# Серверов одной подсети в сводке, остальные только считаются
+_summary_servers_per_group = 10
 
 def configure_alerts(
     silent_start: Optional[int] = None,
@@ -32,6 +52,8 @@ def configure_alerts(
     enabled: Optional[bool] = None,
     cooldown_seconds: Optional[int] = None,
     thresholds: Optional[Dict[str, Dict[str, Any]]] = None,
+    aggregation_window: Optional[float] = None,
+    aggregation_threshold: Optional[int] = None,
 ) -> None:
     """
     Настраивает базовые параметры алертов из внешних настроек.
@@ -42,6 +64,8 @@ def configure_alerts(
         enabled: Включены ли алерты
         cooldown_seconds: Минимальный интервал между одинаковыми алертами
         thresholds: Переопределение порогов для типов алертов
+        aggregation_window: Окно сбора событий доступности в сводку, секунды
+        aggregation_threshold: С какого числа событий за окно отправляется сводка
     """
     if silent_start is not None:
         _config.silent_start = silent_start
@@ -53,6 +77,10 @@ def configure_alerts(
         _config.cooldown_seconds = cooldown_seconds
     if thresholds:
         _config.thresholds.update(thresholds)
+    if aggregation_window is not None:
+        _config.aggregation_window = aggregation_window
+    if aggregation_threshold is not None:
+        _config.aggregation_threshold = aggregation_threshold
 
 class AlertConfig:
     """Конфигурация алертов"""
@@ -64,6 +92,8 @@ class AlertConfig:
         self.cooldown_seconds = 300  # 5 минут между одинаковыми алертами
         self.max_retries = 3
         self.retry_delay = 5
+        self.aggregation_window = 20  # сбор событий доступности в одну сводку
+        self.aggregation_threshold = 3  # меньше событий за окно - отдельные алерты
         
         # Пороги для разных типов алертов
         self.thresholds = {
@@ -86,6 +116,7 @@ def init_telegram_bot(bot_instance, chat_ids: List[str]) -> None:
     global _telegram_bot, _chat_ids
     _telegram_bot = bot_instance
     _chat_ids = chat_ids
+    _dispatcher.configure(max_retries=_config.max_retries, retry_delay=_config.retry_delay)
     debug_log(f"Telegram бот инициализирован для {len(chat_ids)} чатов")
 
 def set_silent_override(enabled: Optional[bool]) -> None:
@@ -187,7 +218,7 @@ def send_alert(
         metadata: Дополнительные метаданные
         
     Returns:
-        True если сообщение отправлено успешно
+        True если сообщение принято к отправке
     """
     if not should_send_alert(alert_type, force):
         return False
@@ -217,7 +248,7 @@ def send_alert(
     log_func = log_levels.get(alert_type, debug_log)
     log_func(f"Отправка алерта [{alert_type}]: {message[:100]}...")
     
-    # Отправляем через все доступные каналы
+    # Ставим в очередь всех доступных каналов
     sent = False
     errors = []
     
@@ -227,11 +258,13 @@ def send_alert(
         if telegram_sent:
             sent = True
         else:
-            errors.append("Telegram: ошибка отправки")
+            errors.append("Telegram: сообщение не поставлено в очередь")
     
     # Записываем в историю
+    now = time.time()
     _record_alert({
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.fromtimestamp(now).isoformat(),
+        "ts": now,
         "message": message,
         "type": alert_type,
         "sent": sent,
@@ -244,48 +277,157 @@ def send_alert(
 
 def _send_telegram_alert(message: str, alert_type: str) -> bool:
     """
-    Отправка алерта через Telegram
+    Постановка алерта в очередь отправки Telegram
+    
+    Отправку, лимиты Telegram и повторы выполняет фоновый поток
+    telegram_dispatcher, вызывающий поток не ждет ответа API.
     
     Args:
         message: Текст сообщения
         alert_type: Тип алерта
         
     Returns:
-        True если отправлено успешно
+        True если сообщение поставлено в очередь
     """
     if not _telegram_bot or not _chat_ids:
         error_log("Telegram бот не инициализирован")
         return False
     
-    success_count = 0
-    total_chats = len(_chat_ids)
-    
-    for i, chat_id in enumerate(_chat_ids):
-        try:
-            # Для критических алертов добавляем дополнительное форматирование
-            if alert_type == "critical":
-                formatted_message = f"*{message}*"
-            else:
-                formatted_message = message
-            
-            _telegram_bot.send_message(
-                chat_id=chat_id,
-                text=formatted_message,
-                parse_mode='Markdown' if alert_type == "critical" else None
-            )
-            success_count += 1
-            
-            # Небольшая задержка между отправками чтобы не превысить лимиты
-            if i < total_chats - 1:
-                time.sleep(0.1)
-                
-        except Exception as e:
-            error_log(f"Ошибка отправки в чат {chat_id}: {e}")
-    
-    success_rate = success_count / total_chats if total_chats > 0 else 0
-    debug_log(f"Telegram алерт отправлен: {success_count}/{total_chats} успешно ({success_rate:.0%})")
-    
-    return success_count > 0
+    # Для критических алертов добавляем дополнительное форматирование
+    if alert_type == "critical":
+        formatted_message = f"*{message}*"
+        parse_mode = 'Markdown'
+    else:
+        formatted_message = message
+        parse_mode = None
+    
+    queued_count = 0
+    for chat_id in _chat_ids:
+        if _dispatcher.enqueue(_telegram_bot, chat_id, formatted_message, parse_mode):
+            queued_count += 1
+    
+    debug_log(f"Telegram алерт поставлен в очередь: {queued_count}/{len(_chat_ids)} чатов")
+    
+    return queued_count > 0
+
+def report_server_event(
+    event: str,
+    ip: str,
+    name: Optional[str],
+    server_type: Optional[str],
+    message: str,
+    alert_type: str = "info"
+) -> None:
+    """
+    Передает событие доступности сервера в окно агрегации
+    
+    События копятся aggregation_window секунд. Если за окно их набралось
+    не меньше aggregation_threshold, отправляется одна сводка по подсетям,
+    иначе - исходные сообщения по отдельности.
+    
+    Args:
+        event: "down" или "up"
+        ip: IP сервера
+        name: Имя сервера
+        server_type: Тип сервера (ssh, rdp, ping)
+        message: Отдельное сообщение о событии
+        alert_type: Тип алерта
+    """
+    global _aggregation_timer
+    
+    if _config.aggregation_window <= 0:
+        send_alert(message, alert_type, tags=[f"server_{event}"], metadata={"ip": ip})
+        return
+    
+    with _aggregation_lock:
+        _pending_events.append({
+            "event": event,
+            "ip": ip,
+            "name": name or ip,
+            "type": server_type or "",
+            "message": message,
+            "alert_type": alert_type,
+            "ts": time.time(),
+        })
+        if _aggregation_timer is None:
+            _aggregation_timer = threading.Timer(_config.aggregation_window, flush_server_events)
+            _aggregation_timer.daemon = True
+            _aggregation_timer.start()
+
+def flush_server_events() -> int:
+    """
+    Отправляет накопленные события доступности
+    
+    Returns:
+        Количество отправленных сообщений
+    """
+    global _aggregation_timer
+    
+    with _aggregation_lock:
+        events = list(_pending_events)
+        _pending_events.clear()
+        if _aggregation_timer is not None:
+            _aggregation_timer.cancel()
+            _aggregation_timer = None
+    
+    grouped: Dict[tuple, List[Dict[str, Any]]] = {}
+    for event in events:
+        grouped.setdefault((event["event"], event["alert_type"]), []).append(event)
+    
+    sent_count = 0
+    for (event, alert_type), items in grouped.items():
+        if len(items) < _config.aggregation_threshold:
+            for item in items:
+                if send_alert(item["message"], alert_type, tags=[f"server_{event}"], metadata={"ip": item["ip"]}):
+                    sent_count += 1
+            continue
+        
+        debug_log(f"📦 Сводка по {len(items)} событиям '{event}' вместо отдельных алертов")
+        if send_alert(
+            _format_events_summary(event, items),
+            alert_type,
+            tags=["aggregated", f"server_{event}"],
+            metadata={"events": items}
+        ):
+            sent_count += 1
+    
+    return sent_count
+
+def _event_group(ip: str) -> str:
+    """Подсеть /24 сервера (для имен хостов - сам хост)"""
+    try:
+        return str(ipaddress.ip_network(f"{ip}/24", strict=False))
+    except ValueError:
+        return ip
+
+def _format_events_summary(event: str, items: List[Dict[str, Any]]) -> str:
+    """Сводка событий доступности, сгруппированная по подсетям и типам серверов"""
+    if event == "down":
+        lines = [f"🚨 Не отвечают серверы: {len(items)}"]
+    else:
+        lines = [f"✅ Снова доступны серверы: {len(items)}"]
+    
+    by_group: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        by_group.setdefault(_event_group(item["ip"]), []).append(item)
+    
+    for group, group_items in sorted(by_group.items(), key=lambda entry: -len(entry[1])):
+        type_counts: Dict[str, int] = {}
+        for item in group_items:
+            server_type = (item["type"] or "?").upper()
+            type_counts[server_type] = type_counts.get(server_type, 0) + 1
+        types = ", ".join(f"{server_type}: {count}" for server_type, count in sorted(type_counts.items()))
+        lines.append("")
+        lines.append(f"🌐 {group} - {len(group_items)} ({types})")
+        for item in group_items[:_summary_servers_per_group]:
+            lines.append(f"• {item['name']} ({item['ip']})")
+        if len(group_items) > _summary_servers_per_group:
+            lines.append(f"• ... и еще {len(group_items) - _summary_servers_per_group}")
+    
+    return "\n".join(lines)
+
+# Накопленные события отправляются и при завершении процесса
+atexit.register(flush_server_events)
 
 def _is_cooldown_active(message: str, check_period: int = None) -> bool:
     """
@@ -299,16 +441,22 @@ def _is_cooldown_active(message: str, check_period: int = None) -> bool:
         True если кд активен
     """
     period = check_period or _config.cooldown_seconds
-    now = time.time()
+    last_sent = _cooldown_index.get(_fingerprint(message))
     
-    # Ищем похожие сообщения в истории
-    for alert in reversed(_alert_history):
-        if alert["message"] == message and alert["sent"]:
-            alert_time = datetime.fromisoformat(alert["timestamp"]).timestamp()
-            if now - alert_time < period:
-                return True
-    
-    return False
+    return last_sent is not None and time.monotonic() - last_sent < period
+
+def _fingerprint(message: str) -> bytes:
+    """Отпечаток текста сообщения для индекса кд"""
+    return hashlib.blake2b(message.encode("utf-8", "replace"), digest_size=16).digest()
+
+def _prune_cooldown_index(now: float) -> None:
+    """Удаляет из индекса кд записи, чей кд уже истек"""
+    global _cooldown_prune_at
+    expired = [key for key, sent_at in _cooldown_index.items() if now - sent_at >= _config.cooldown_seconds]
+    for key in expired:
+        del _cooldown_index[key]
+    # Порог растет вместе с индексом, чтобы очистка не выполнялась на каждом алерте
+    _cooldown_prune_at = max(_max_history_size, 2 * len(_cooldown_index))
 
 def _record_alert(alert_data: Dict[str, Any]) -> None:
     """
@@ -317,13 +465,29 @@ def _record_alert(alert_data: Dict[str, Any]) -> None:
     Args:
         alert_data: Данные алерта
     """
-    global _alert_history
-    
-    _alert_history.append(alert_data)
+    timestamp = alert_data.setdefault("ts", time.time())
+    day = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
     
-    # Ограничиваем размер истории
-    if len(_alert_history) > _max_history_size:
-        _alert_history = _alert_history[-_max_history_size:]
+    with _history_lock:
+        # Размер истории ограничен deque
+        _alert_history.append(alert_data)
+        
+        if alert_data.get("sent"):
+            now = time.monotonic()
+            _cooldown_index[_fingerprint(alert_data["message"])] = now
+            if len(_cooldown_index) > _cooldown_prune_at:
+                _prune_cooldown_index(now)
+        
+        # Статистика копится по дням сразу, без разбора истории
+        day_stats = _daily_stats.get(day)
+        if day_stats is None:
+            day_stats = _daily_stats[day] = {}
+            for old_day in sorted(_daily_stats)[:-_daily_stats_days]:
+                del _daily_stats[old_day]
+        type_stats = day_stats.setdefault(alert_data["type"], {"total": 0, "sent": 0})
+        type_stats["total"] += 1
+        if alert_data.get("sent"):
+            type_stats["sent"] += 1
     
     # Логируем в файл для отладки
     if alert_data.get("sent"):
@@ -349,7 +513,8 @@ def get_alert_history(
     Returns:
         Список алертов
     """
-    filtered_history = _alert_history
+    with _history_lock:
+        filtered_history = list(_alert_history)
     
     if alert_type:
         filtered_history = [a for a in filtered_history if a["type"] == alert_type]
@@ -366,9 +531,11 @@ def clear_alert_history() -> int:
     Returns:
         Количество удаленных записей
     """
-    global _alert_history
-    count = len(_alert_history)
-    _alert_history = []
+    with _history_lock:
+        count = len(_alert_history)
+        _alert_history.clear()
+        _cooldown_index.clear()
+        _daily_stats.clear()
     debug_log(f"История алертов очищена, удалено {count} записей")
     return count
 
@@ -379,28 +546,19 @@ def get_alert_stats() -> Dict[str, Any]:
     Returns:
         Словарь со статистикой
     """
-    now = datetime.now()
-    today_start = datetime(now.year, now.month, now.day)
-    
-    # Фильтруем алерты за сегодня
-    today_alerts = [
-        a for a in _alert_history 
-        if datetime.fromisoformat(a["timestamp"]) >= today_start
-    ]
-    
-    # Группируем по типам
-    by_type = {}
-    for alert in today_alerts:
-        alert_type = alert["type"]
-        if alert_type not in by_type:
-            by_type[alert_type] = {"total": 0, "sent": 0}
-        by_type[alert_type]["total"] += 1
-        if alert["sent"]:
-            by_type[alert_type]["sent"] += 1
+    today = datetime.now().strftime("%Y-%m-%d")
+    
+    # Счетчики за сегодня уже сгруппированы по типам в _record_alert
+    with _history_lock:
+        by_type = {
+            alert_type: dict(counts)
+            for alert_type, counts in _daily_stats.get(today, {}).items()
+        }
+        history_size = len(_alert_history)
     
     return {
-        "total_all_time": len(_alert_history),
-        "total_today": len(today_alerts),
+        "total_all_time": history_size,
+        "total_today": sum(counts["total"] for counts in by_type.values()),
         "by_type": by_type,
         "silent_mode": is_silent_time(),
         "silent_override": _silent_override
@@ -16,6 +16,7 @@ import subprocess
 import time
 from typing import Optional, Tuple
 from lib.logging import debug_log
+from lib.probe import ping_host, probe_port
 
 def check_port(ip: str, port: int, timeout: int = 5) -> bool:
     """
@@ -29,6 +30,11 @@ def check_port(ip: str, port: int, timeout: int = 5) -> bool:
     Returns:
         True если порт доступен
     """
+    probe = probe_port(ip, port, timeout=timeout)
+    if probe is not None:
+        return probe["reachable"]
+
+    # Цикл проб недоступен - используем блокирующее соединение
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.settimeout(timeout)
@@ -50,6 +56,11 @@ def check_ping(ip: str, timeout: int = 10) -> bool:
     Returns:
         True если сервер отвечает на ping
     """
+    probe = ping_host(ip, count=2, timeout=2)
+    if probe is not None:
+        return probe["reachable"]
+
+    # ICMP сокеты недоступны - используем системный ping
     try:
         result = subprocess.run(
             ['ping', '-c', '2', '-W', '2', ip],
@@ -95,6 +106,10 @@ def get_network_latency(ip: str, count: int = 3) -> Optional[float]:
     Returns:
         Средняя задержка в мс или None при ошибке
     """
+    probe = ping_host(ip, count=count, timeout=1)
+    if probe is not None:
+        return probe["latency_ms"]
+
     try:
         total_time = 0
         successful = 0
@@ -0,0 +1,354 @@
+"""
+/lib/probe.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Asynchronous TCP and ICMP probes
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Асинхронные TCP и ICMP пробы
+"""
+
+import asyncio
+import itertools
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from lib.logging import debug_log
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+_icmp_mode_lock = threading.Lock()
+_icmp_mode: Optional[str] = None
+_icmp_mode_checked = False
+
+# Порядковые номера пакетов общие для всех потоков, чтобы ответы не путались
+_sequence = itertools.count(1)
+_sequence_lock = threading.Lock()
+
+
+def _next_sequence() -> int:
+    """Возвращает следующий номер ICMP пакета."""
+    with _sequence_lock:
+        return next(_sequence) & 0xFFFF
+
+
+def _checksum(data: bytes) -> int:
+    """Вычисляет контрольную сумму ICMP (RFC 1071)."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _build_echo_request(identifier: int, sequence: int) -> bytes:
+    """Формирует пакет ICMP Echo Request."""
+    payload = struct.pack("!d", time.monotonic()) + b"monitoring-probe"
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = _checksum(header + payload)
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence)
+    return header + payload
+
+
+def _open_icmp_socket(mode: str) -> socket.socket:
+    """Открывает ICMP сокет указанного типа ('dgram' или 'raw')."""
+    sock_type = socket.SOCK_DGRAM if mode == "dgram" else socket.SOCK_RAW
+    sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+    sock.setblocking(False)
+    return sock
+
+
+def get_icmp_mode() -> Optional[str]:
+    """
+    Определяет доступный способ отправки ICMP без запуска процессов
+
+    Сначала пробуется непривилегированный сокет (net.ipv4.ping_group_range),
+    затем raw сокет (требует root или CAP_NET_RAW).
+
+    Returns:
+        'dgram', 'raw' или None если ICMP сокеты недоступны
+    """
+    global _icmp_mode, _icmp_mode_checked
+
+    with _icmp_mode_lock:
+        if _icmp_mode_checked:
+            return _icmp_mode
+
+        for mode in ("dgram", "raw"):
+            try:
+                _open_icmp_socket(mode).close()
+                _icmp_mode = mode
+                break
+            except OSError:
+                continue
+
+        _icmp_mode_checked = True
+        if _icmp_mode:
+            debug_log(f"✅ ICMP пробы через сокет ({_icmp_mode})")
+        else:
+            debug_log("⚠️ ICMP сокеты недоступны, будет использован системный ping")
+        return _icmp_mode
+
+
+class IcmpPinger:
+    """Отправка ICMP Echo множеству хостов через один сокет в цикле событий"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, mode: str):
+        """Открывает сокет и регистрирует обработчик ответов в цикле событий."""
+        self.loop = loop
+        self.mode = mode
+        self.sock = _open_icmp_socket(mode)
+        # Для dgram сокета ядро подставляет свой идентификатор, поэтому
+        # ответы сопоставляются по адресу и номеру пакета
+        self.identifier = os.getpid() & 0xFFFF
+        self._pending: Dict[Tuple[str, int], asyncio.Future] = {}
+        loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def close(self) -> None:
+        """Снимает обработчик и закрывает сокет."""
+        try:
+            self.loop.remove_reader(self.sock.fileno())
+        finally:
+            self.sock.close()
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    def _on_readable(self) -> None:
+        """Читает все доступные ответы и завершает ожидающие пробы."""
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                debug_log(f"⚠️ Ошибка чтения ICMP сокета: {e}")
+                return
+
+            received = time.monotonic()
+            if self.mode == "raw":
+                # raw сокет возвращает пакет вместе с IP заголовком
+                header_length = (packet[0] & 0x0F) * 4
+                packet = packet[header_length:]
+
+            if len(packet) < 8:
+                continue
+
+            icmp_type, _, _, identifier, sequence = struct.unpack("!BBHHH", packet[:8])
+            if icmp_type != ICMP_ECHO_REPLY:
+                continue
+            if self.mode == "raw" and identifier != self.identifier:
+                continue
+
+            future = self._pending.get((address[0], sequence))
+            if future is not None and not future.done():
+                future.set_result(received)
+
+    async def ping_once(self, ip: str, timeout: float) -> Optional[float]:
+        """
+        Отправляет один ICMP Echo Request
+
+        Args:
+            ip: IP адрес
+            timeout: Таймаут ожидания ответа в секундах
+
+        Returns:
+            Задержка в мс или None если ответа нет
+        """
+        sequence = _next_sequence()
+        key = (ip, sequence)
+        future = self.loop.create_future()
+        self._pending[key] = future
+
+        try:
+            packet = _build_echo_request(self.identifier, sequence)
+            sent = time.monotonic()
+            # BlockingIOError при переполненном буфере считается потерей пакета
+            self.sock.sendto(packet, (ip, 0))
+            received = await asyncio.wait_for(future, timeout)
+            return (received - sent) * 1000
+        except asyncio.TimeoutError:
+            return None
+        except OSError as e:
+            debug_log(f"ICMP probe error for {ip}: {e}")
+            return None
+        finally:
+            self._pending.pop(key, None)
+
+    async def ping(self, ip: str, count: int = 2, timeout: float = 2) -> Dict:
+        """
+        Пингует хост несколько раз
+
+        Пакеты отправляются одновременно, поэтому недоступный хост
+        занимает одно время ожидания, а не count.
+
+        Args:
+            ip: IP адрес
+            count: Количество пакетов
+            timeout: Таймаут ожидания ответов
+
+        Returns:
+            Dict: reachable, latency_ms (среднее), received, sent
+        """
+        results = await asyncio.gather(*(self.ping_once(ip, timeout) for _ in range(max(1, count))))
+        latencies = [latency for latency in results if latency is not None]
+
+        return {
+            "ip": ip,
+            "method": "icmp",
+            "reachable": bool(latencies),
+            "latency_ms": sum(latencies) / len(latencies) if latencies else None,
+            "received": len(latencies),
+            "sent": max(1, count),
+        }
+
+
+async def tcp_probe(ip: str, port: int, timeout: float = 5) -> Dict:
+    """
+    Неблокирующая проверка TCP порта
+
+    Args:
+        ip: IP адрес
+        port: Номер порта
+        timeout: Таймаут соединения в секундах
+
+    Returns:
+        Dict: reachable, latency_ms, error
+    """
+    started = time.monotonic()
+    error = None
+    reachable = False
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        reachable = True
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    except asyncio.TimeoutError:
+        error = "timeout"
+    except OSError as e:
+        error = e.strerror or str(e)
+
+    latency = (time.monotonic() - started) * 1000
+    return {
+        "ip": ip,
+        "method": "tcp",
+        "port": port,
+        "reachable": reachable,
+        "latency_ms": latency if reachable else None,
+        "error": error,
+    }
+
+
+class ProbeLoop:
+    """
+    Общий для процесса цикл событий сетевых проб
+
+    Проверки из потоков обхода отправляются в один цикл событий в фоновом
+    потоке. TCP соединения открываются неблокирующими, поток обхода не
+    занят на время ожидания. Все ICMP пакеты идут через один сокет, и
+    каждый ответ разбирается один раз, сколько бы хостов ни проверялось
+    одновременно.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pinger: Optional[IcmpPinger] = None
+        self._pinger_failed = False
+
+    @staticmethod
+    async def _create_pinger(mode: str) -> IcmpPinger:
+        return IcmpPinger(asyncio.get_running_loop(), mode)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Запускает цикл событий при первой пробе (под блокировкой)."""
+        if self._loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="net-probe", daemon=True)
+            thread.start()
+            self._loop = loop
+        return self._loop
+
+    def _get_pinger(self) -> Optional[IcmpPinger]:
+        """Открывает ICMP сокет при первой ICMP пробе."""
+        with self._lock:
+            if self._pinger is not None or self._pinger_failed:
+                return self._pinger
+
+            mode = get_icmp_mode()
+            if mode is None:
+                self._pinger_failed = True
+                return None
+
+            try:
+                future = asyncio.run_coroutine_threadsafe(self._create_pinger(mode), self._get_loop())
+                self._pinger = future.result(timeout=5)
+            except Exception as e:
+                debug_log(f"⚠️ Не удалось открыть ICMP сокет: {e}")
+                self._pinger_failed = True
+            return self._pinger
+
+    def tcp(self, ip: str, port: int, timeout: float = 5) -> Dict:
+        """Проверяет TCP порт в общем цикле событий (вызывается из любого потока)."""
+        with self._lock:
+            loop = self._get_loop()
+        future = asyncio.run_coroutine_threadsafe(tcp_probe(ip, port, timeout=timeout), loop)
+        return future.result(timeout=timeout + 5)
+
+    def ping(self, ip: str, count: int = 2, timeout: float = 2) -> Optional[Dict]:
+        """
+        Пингует хост через общий сокет (вызывается из любого потока)
+
+        Returns:
+            Optional[Dict]: Результат пробы или None если ICMP сокеты недоступны
+        """
+        pinger = self._get_pinger()
+        if pinger is None:
+            return None
+        future = asyncio.run_coroutine_threadsafe(pinger.ping(ip, count=count, timeout=timeout), pinger.loop)
+        return future.result(timeout=timeout + 5)
+
+
+# Глобальный экземпляр цикла сетевых проб
+probe_loop = ProbeLoop()
+
+
+def probe_port(ip: str, port: int, timeout: float = 5) -> Optional[Dict]:
+    """
+    Проверяет TCP порт без блокирующего connect в вызывающем потоке
+
+    Returns:
+        Optional[Dict]: Результат пробы или None при сбое цикла проб
+    """
+    try:
+        return probe_loop.tcp(ip, port, timeout=timeout)
+    except Exception as e:
+        debug_log(f"TCP probe error for {ip}:{port}: {e}")
+        return None
+
+
+def ping_host(ip: str, count: int = 2, timeout: float = 2) -> Optional[Dict]:
+    """
+    Пингует один хост без запуска процесса
+
+    Returns:
+        Optional[Dict]: Результат пробы или None если ICMP сокеты недоступны
+    """
+    try:
+        return probe_loop.ping(ip, count=count, timeout=timeout)
+    except Exception as e:
+        debug_log(f"ICMP probe error for {ip}: {e}")
+        return None
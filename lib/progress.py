@@ -0,0 +1,157 @@
+"""
+/lib/progress.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Throttled Telegram progress reporter
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Прогресс долгих проверок в Telegram с ограничением частоты
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+from lib.logging import debug_log
+from lib.utils import progress_bar
+
+# Обычный интервал между правками сообщения, секунды
+PROGRESS_MIN_INTERVAL = 3.0
+
+# Скачок прогресса (в процентах), при котором сообщение правится раньше интервала
+PROGRESS_MIN_STEP = 10.0
+
+# Минимальный интервал между правками в любом случае, секунды
+PROGRESS_MIN_GAP = 1.0
+
+
+class ProgressReporter:
+    """
+    Прогресс долгой проверки в сообщении Telegram
+
+    update() только запоминает последнее состояние и сразу возвращает
+    управление. Сообщение правит отдельный поток: не чаще раза в
+    min_interval секунд (или раньше, если прогресс вырос на min_step
+    процентов), промежуточные состояния пропускаются, одинаковый текст
+    повторно не отправляется. finish() останавливает поток и выводит
+    итоговый текст, поэтому устаревший прогресс не затрет результат.
+    """
+
+    def __init__(
+        self,
+        bot,
+        chat_id,
+        message_id: int,
+        title: str = "",
+        min_interval: float = PROGRESS_MIN_INTERVAL,
+        min_step: float = PROGRESS_MIN_STEP,
+        formatter: Optional[Callable[[float, str], str]] = None,
+    ):
+        """
+        Args:
+            bot: Telegram бот
+            chat_id: Чат сообщения с прогрессом
+            message_id: Сообщение с прогрессом
+            title: Заголовок над полосой прогресса
+            min_interval: Интервал между правками, секунды
+            min_step: Скачок прогресса для внеочередной правки, проценты
+            formatter: formatter(прогресс, статус) -> текст вместо стандартного
+        """
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self.min_interval = min_interval
+        self.min_step = min_step
+        self.formatter = formatter
+
+        self._cond = threading.Condition()
+        self._pending: Optional[tuple] = None
+        self._closed = False
+        self._editing = False
+        self._thread: Optional[threading.Thread] = None
+        self._last_edit = 0.0
+        self._last_progress: Optional[float] = None
+        self._last_text: Optional[str] = None
+
+    def _render(self, progress: float, status: str) -> str:
+        if self.formatter is not None:
+            return self.formatter(progress, status)
+        return f"{self.title}\n{progress_bar(progress)}\n\n{status}"
+
+    def update(self, progress: float, status: str = "") -> None:
+        """Сообщает новое состояние (без ожидания Telegram)."""
+        progress = max(0.0, min(float(progress), 100.0))
+        text = self._render(progress, status)
+        with self._cond:
+            if self._closed or text == self._last_text:
+                return
+            self._pending = (progress, text)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="progress-reporter", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _delay(self, progress: float, now: float) -> float:
+        """Сколько ждать до правки сообщения с данным прогрессом."""
+        elapsed = now - self._last_edit
+        if self._last_progress is not None and abs(progress - self._last_progress) >= self.min_step:
+            return PROGRESS_MIN_GAP - elapsed
+        return self.min_interval - elapsed
+
+    def _run(self) -> None:
+        """Цикл потока правки сообщения."""
+        while True:
+            with self._cond:
+                while not self._closed and self._pending is None:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                progress, text = self._pending
+                delay = self._delay(progress, time.monotonic())
+                if delay > 0:
+                    # За время ожидания может прийти более новое состояние
+                    self._cond.wait(delay)
+                    continue
+                self._pending = None
+                if text == self._last_text:
+                    continue
+                self._editing = True
+
+            try:
+                self.bot.edit_message_text(chat_id=self.chat_id, message_id=self.message_id, text=text)
+            except Exception as e:
+                debug_log(f"⚠️ Не удалось обновить прогресс: {e}")
+            finally:
+                with self._cond:
+                    self._editing = False
+                    self._last_edit = time.monotonic()
+                    self._last_progress = progress
+                    self._last_text = text
+                    self._cond.notify_all()
+
+    def close(self) -> None:
+        """Останавливает правки прогресса и дожидается текущей правки."""
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify_all()
+            while self._editing:
+                self._cond.wait()
+
+    def finish(self, text: str, **kwargs) -> None:
+        """
+        Выводит итоговый текст вместо прогресса
+
+        Args:
+            text: Итоговый текст
+            **kwargs: Параметры edit_message_text (parse_mode, reply_markup)
+        """
+        self.close()
+        self.bot.edit_message_text(chat_id=self.chat_id, message_id=self.message_id, text=text, **kwargs)
+
+
+__all__ = ["ProgressReporter"]
@@ -0,0 +1,148 @@
+"""
+/lib/sqlite_db.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Shared SQLite connection manager
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Общий менеджер соединений SQLite
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Union
+
+from lib.logging import debug_log
+
+# Ожидание снятия блокировки другим соединением, секунды
+BUSY_TIMEOUT = 30.0
+
+# Размер кэша подготовленных выражений на соединение
+STATEMENT_CACHE_SIZE = 256
+
+
+class SQLiteDatabase:
+    """
+    Соединения с одной БД SQLite
+
+    Каждый поток получает постоянное соединение для записи и отдельное
+    соединение только для чтения. БД переводится в режим WAL, поэтому
+    чтение (меню бота, отчеты) не блокирует запись (прием писем) и наоборот.
+    Подготовленные выражения кэшируются соединением, пока оно живо.
+    """
+
+    def __init__(self, path: Union[str, Path], busy_timeout: float = BUSY_TIMEOUT):
+        """
+        Args:
+            path: Путь к файлу БД
+            busy_timeout: Ожидание блокировки, секунды
+        """
+        self.path = Path(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wal_enabled = False
+
+    def _enable_wal(self, conn: sqlite3.Connection) -> None:
+        """Переводит БД в режим WAL (режим сохраняется в файле БД)."""
+        with self._lock:
+            if self._wal_enabled:
+                return
+            try:
+                mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+                self._wal_enabled = True
+                if str(mode).lower() != "wal":
+                    debug_log(f"⚠️ {self.path.name}: режим WAL недоступен ({mode})")
+            except sqlite3.Error as e:
+                debug_log(f"⚠️ {self.path.name}: не удалось включить WAL: {e}")
+
+    def connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """
+        Открывает новое настроенное соединение
+
+        Соединение принадлежит вызывающему коду и закрывается им.
+        Для обычной работы используйте connection() и reader().
+        """
+        if read_only:
+            conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                timeout=self.busy_timeout,
+                cached_statements=STATEMENT_CACHE_SIZE,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA query_only = ON")
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=self.busy_timeout,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+        )
+        self._enable_wal(conn)
+        # В режиме WAL NORMAL безопасен и не делает fsync на каждую транзакцию
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока для записи."""
+        conn = getattr(self._local, "writer", None)
+        if conn is None:
+            conn = self.connect()
+            self._local.writer = conn
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Соединение текущего потока только для чтения."""
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            if not self._wal_enabled:
+                # Режим WAL включает только пишущее соединение
+                self.connection()
+            conn = self.connect(read_only=True)
+            self._local.reader = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Транзакция на соединении потока: commit при успехе, rollback при ошибке."""
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Выполняет запрос на чтение."""
+        return self.reader().execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        """Закрывает соединения текущего потока."""
+        for name in ("writer", "reader"):
+            conn = getattr(self._local, name, None)
+            if conn is not None:
+                conn.close()
+                setattr(self._local, name, None)
+
+
+_databases: Dict[str, SQLiteDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path: Union[str, Path]) -> SQLiteDatabase:
+    """Возвращает общий менеджер соединений для файла БД."""
+    key = str(Path(path).resolve())
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = SQLiteDatabase(key)
+            _databases[key] = database
+        return database
+
+
+__all__ = ["SQLiteDatabase", "get_database"]
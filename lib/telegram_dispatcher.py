@@ -0,0 +1,299 @@
+"""
+/lib/telegram_dispatcher.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Background Telegram message dispatcher
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Фоновая очередь отправки сообщений Telegram
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, Unauthorized
+
+from lib.logging import debug_log, error_log
+
+# Лимиты Telegram Bot API: 30 сообщений в секунду на бота,
+# 20 сообщений в минуту в одну группу, около 1 сообщения в секунду в личный чат
+GLOBAL_RATE = 30.0
+GROUP_RATE = 20.0 / 60.0
+GROUP_BURST = 20
+PRIVATE_RATE = 1.0
+PRIVATE_BURST = 3
+
+# Сколько ждать следующие сообщения в чат, чтобы отправить их одним, секунды
+COALESCE_WINDOW = 1.0
+
+# Максимальная длина текста сообщения Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+COALESCE_SEPARATOR = "\n\n"
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        """Забирает один токен."""
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Pending:
+    """Сообщение в очереди чата"""
+
+    __slots__ = ("bot", "text", "parse_mode", "count", "attempts", "not_before")
+
+    def __init__(self, bot, text: str, parse_mode: Optional[str], not_before: float):
+        self.bot = bot
+        self.text = text
+        self.parse_mode = parse_mode
+        self.count = 1
+        self.attempts = 0
+        self.not_before = not_before
+
+
+class _ChatQueue:
+    """Очередь и лимит одного чата"""
+
+    __slots__ = ("items", "bucket", "blocked_until")
+
+    def __init__(self, chat_id: Any):
+        self.items: Deque[_Pending] = deque()
+        # Идентификаторы групп и каналов отрицательные
+        if str(chat_id).startswith("-"):
+            self.bucket = TokenBucket(GROUP_RATE, GROUP_BURST)
+        else:
+            self.bucket = TokenBucket(PRIVATE_RATE, PRIVATE_BURST)
+        self.blocked_until = 0.0
+
+
+class TelegramDispatcher:
+    """
+    Фоновая отправка сообщений Telegram
+
+    enqueue() только ставит сообщение в очередь чата и сразу возвращает
+    управление: отправкой занимается отдельный поток. Поток соблюдает общий
+    лимит бота и лимит каждого чата (ведра токенов), при ответе 429 ждет
+    retry_after, сетевые ошибки повторяет с экспоненциальной задержкой.
+    Сообщения, накопившиеся в очереди чата, отправляются одним сообщением.
+    """
+
+    def __init__(self, max_retries: int = 3, retry_delay: float = 5.0):
+        """
+        Args:
+            max_retries: Повторов при сетевых ошибках
+            retry_delay: Начальная задержка повтора, секунды
+        """
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._chats: Dict[Any, _ChatQueue] = {}
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._inflight = 0
+        self._stats = {
+            "queued": 0,
+            "sent": 0,
+            "coalesced": 0,
+            "retried": 0,
+            "rate_limited": 0,
+            "dropped": 0,
+        }
+
+    def configure(self, max_retries: Optional[int] = None, retry_delay: Optional[float] = None) -> None:
+        """Настройка повторов отправки."""
+        with self._cond:
+            if max_retries is not None:
+                self.max_retries = max_retries
+            if retry_delay is not None:
+                self.retry_delay = retry_delay
+
+    def enqueue(self, bot, chat_id: Any, text: str, parse_mode: Optional[str] = None) -> bool:
+        """
+        Ставит сообщение в очередь чата
+
+        Returns:
+            True если сообщение принято к отправке
+        """
+        if bot is None or not text:
+            return False
+
+        with self._cond:
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _ChatQueue(chat_id)
+            chat.items.append(_Pending(bot, text, parse_mode, time.monotonic() + COALESCE_WINDOW))
+            self._stats["queued"] += 1
+            self._ensure_worker()
+            self._cond.notify_all()
+        return True
+
+    def _ensure_worker(self) -> None:
+        """Запускает поток отправки (под блокировкой)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _next_ready(self, now: float) -> Tuple[Any, Optional[float]]:
+        """Чат, сообщение в который можно отправить раньше всех, и время ожидания."""
+        global_wait = self._global.wait_time(now)
+        best_chat, best_delay = None, None
+        for chat_id, chat in self._chats.items():
+            if not chat.items:
+                continue
+            ready_at = max(
+                chat.items[0].not_before,
+                chat.blocked_until,
+                now + chat.bucket.wait_time(now),
+                now + global_wait,
+            )
+            delay = ready_at - now
+            if best_delay is None or delay < best_delay:
+                best_chat, best_delay = chat_id, delay
+        return best_chat, best_delay
+
+    @staticmethod
+    def _take_batch(chat: _ChatQueue) -> _Pending:
+        """Забирает из очереди первое сообщение, присоединяя к нему следующие."""
+        batch = chat.items.popleft()
+        while chat.items:
+            item = chat.items[0]
+            if item.bot is not batch.bot or item.parse_mode != batch.parse_mode:
+                break
+            if len(batch.text) + len(COALESCE_SEPARATOR) + len(item.text) > MAX_MESSAGE_LENGTH:
+                break
+            chat.items.popleft()
+            batch.text = f"{batch.text}{COALESCE_SEPARATOR}{item.text}"
+            batch.count += item.count
+            batch.attempts = max(batch.attempts, item.attempts)
+        return batch
+
+    def _run(self) -> None:
+        """Цикл потока отправки."""
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    chat_id, delay = self._next_ready(now)
+                    if chat_id is not None and delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                chat = self._chats[chat_id]
+                batch = self._take_batch(chat)
+                self._global.consume(now)
+                chat.bucket.consume(now)
+                self._inflight += 1
+
+            try:
+                self._deliver(chat_id, chat, batch)
+            finally:
+                with self._cond:
+                    self._inflight -= 1
+                    self._cond.notify_all()
+
+    def _deliver(self, chat_id: Any, chat: _ChatQueue, batch: _Pending) -> None:
+        """Отправляет сообщение, при ошибке возвращает его в очередь или отбрасывает."""
+        try:
+            batch.bot.send_message(chat_id=chat_id, text=batch.text, parse_mode=batch.parse_mode)
+        except RetryAfter as e:
+            retry_after = float(getattr(e, "retry_after", self.retry_delay))
+            debug_log(f"⏳ Telegram: лимит для чата {chat_id}, повтор через {retry_after:.0f}с")
+            with self._cond:
+                chat.blocked_until = time.monotonic() + retry_after
+                chat.items.appendleft(batch)
+                self._stats["rate_limited"] += 1
+            return
+        except (BadRequest, Unauthorized) as e:
+            error_log(f"❌ Ошибка отправки в чат {chat_id}: {e}")
+            with self._cond:
+                self._stats["dropped"] += batch.count
+            return
+        except (NetworkError, OSError) as e:
+            batch.attempts += 1
+            if batch.attempts > self.max_retries:
+                error_log(f"❌ Ошибка отправки в чат {chat_id} после {self.max_retries} повторов: {e}")
+                with self._cond:
+                    self._stats["dropped"] += batch.count
+                return
+            delay = self.retry_delay * 2 ** (batch.attempts - 1)
+            debug_log(f"⚠️ Ошибка отправки в чат {chat_id}: {e}, повтор через {delay:.0f}с")
+            with self._cond:
+                batch.not_before = time.monotonic() + delay
+                chat.items.appendleft(batch)
+                self._stats["retried"] += 1
+            return
+        except Exception as e:
+            error_log(f"❌ Ошибка отправки в чат {chat_id}: {e}")
+            with self._cond:
+                self._stats["dropped"] += batch.count
+            return
+
+        with self._cond:
+            self._stats["sent"] += 1
+            self._stats["coalesced"] += batch.count - 1
+        if batch.count > 1:
+            debug_log(f"📨 Telegram: {batch.count} сообщений объединены в одно для чата {chat_id}")
+
+    def pending(self) -> int:
+        """Количество сообщений, ожидающих отправки."""
+        with self._cond:
+            return sum(len(chat.items) for chat in self._chats.values()) + self._inflight
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Ждет отправки всех сообщений из очереди
+
+        Returns:
+            True если очередь опустела за timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while any(chat.items for chat in self._chats.values()) or self._inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики отправки."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = sum(len(chat.items) for chat in self._chats.values()) + self._inflight
+        return stats
+
+
+# Глобальный экземпляр очереди отправки
+telegram_dispatcher = TelegramDispatcher()
+
+# Сообщения, поставленные перед завершением процесса, успевают уйти
+atexit.register(telegram_dispatcher.flush)
+
+
+__all__ = ["TelegramDispatcher", "TokenBucket", "telegram_dispatcher"]
@@ -0,0 +1,238 @@
+"""
+/modules/backup_queries.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Backup history queries
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Запросы к истории бэкапов
+"""
+
+from __future__ import annotations
+
+# Запросы меню бэкапов и отчета к backups.db. Бот и отчет выполняют именно
+# эти строки, а modules.backup_schema.benchmark проверяет их планы.
+
+# === PROXMOX ===
+
+# Диапазон вместо date(received_at) = ?, чтобы работал индекс по received_at
+TODAY_STATUS_QUERY = """
+    SELECT host_name, backup_status, COUNT(*) as report_count, MAX(received_at) as last_report
+    FROM proxmox_backups
+    WHERE received_at >= ? AND received_at < ?
+    GROUP BY host_name, backup_status
+    ORDER BY host_name, last_report DESC
+"""
+
+RECENT_BACKUPS_QUERY = """
+    SELECT host_name, backup_status, duration, total_size, error_message, received_at
+    FROM proxmox_backups
+    WHERE received_at >= ?
+    ORDER BY received_at DESC
+    LIMIT 15
+"""
+
+HOST_STATUS_QUERY = """
+    SELECT backup_status, duration, total_size, error_message, received_at
+    FROM proxmox_backups
+    WHERE host_name = ?
+    ORDER BY received_at DESC
+    LIMIT 5
+"""
+
+FAILED_BACKUPS_QUERY = """
+    SELECT host_name, backup_status, error_message, received_at
+    FROM proxmox_backups
+    WHERE backup_status = 'failed'
+    AND received_at >= ?
+    ORDER BY received_at DESC
+"""
+
+# Таблица последнего состояния: одна строка на хост вместо просмотра истории
+ALL_HOSTS_QUERY = "SELECT host_name FROM proxmox_latest ORDER BY host_name"
+
+HOST_RECENT_STATUS_QUERY = """
+    SELECT backup_status, received_at
+    FROM proxmox_backups
+    WHERE host_name = ? AND received_at >= ?
+    ORDER BY received_at DESC
+"""
+
+# === БАЗЫ ДАННЫХ ===
+
+DATABASE_STATS_QUERY = """
+    SELECT backup_type, database_name, database_display_name,
+           backup_status, COUNT(*) as backup_count, MAX(received_at) as last_backup
+    FROM database_backups
+    WHERE received_at >= ?
+    GROUP BY backup_type, database_name, database_display_name, backup_status
+    ORDER BY backup_type, database_name, last_backup DESC
+"""
+
+DATABASE_DETAILS_QUERY = """
+    SELECT backup_status, task_type, error_count, email_subject, received_at
+    FROM database_backups
+    WHERE backup_type = ? AND database_name = ? AND received_at >= ?
+    ORDER BY received_at DESC
+    LIMIT 10
+"""
+
+DATABASE_RECENT_STATUS_QUERY = """
+    SELECT backup_status, received_at, error_count
+    FROM database_backups
+    WHERE backup_type = ? AND database_name = ? AND received_at >= ?
+    ORDER BY received_at DESC
+"""
+
+# Таблица последнего состояния: одна строка на БД вместо просмотра истории
+DATABASE_MENU_QUERY = """
+    SELECT backup_type, database_name
+    FROM database_latest
+    ORDER BY backup_type, database_name
+"""
+
+LATEST_BACKUP_TYPE_QUERY = """
+    SELECT backup_type
+    FROM database_backups
+    WHERE database_name = ? AND received_at >= ?
+    ORDER BY received_at DESC
+    LIMIT 1
+"""
+
+DATABASE_DISPLAY_NAME_QUERY = """
+    SELECT database_display_name
+    FROM database_backups
+    WHERE backup_type = ? AND database_name = ?
+      AND database_display_name IS NOT NULL
+      AND TRIM(database_display_name) != ''
+    ORDER BY received_at DESC
+    LIMIT 1
+"""
+
+
+def recent_history_query(table: str, key_columns: tuple, value_columns: tuple) -> str:
+    """
+    Последние записи по каждому ключу одним запросом
+
+    Параметры запроса: (начало периода, число записей на ключ).
+    """
+    keys = ", ".join(key_columns)
+    values = ", ".join(value_columns)
+    return f"""
+    SELECT {keys}, {values}
+    FROM (
+        SELECT {keys}, {values},
+               ROW_NUMBER() OVER (PARTITION BY {keys} ORDER BY received_at DESC) AS rn
+        FROM {table}
+        WHERE received_at >= ?
+    )
+    WHERE rn <= ?
+    ORDER BY {keys}, rn
+"""
+
+
+HOSTS_HISTORY_KEYS = ("host_name",)
+HOSTS_RECENT_HISTORY_QUERY = recent_history_query(
+    "proxmox_backups", HOSTS_HISTORY_KEYS, ("backup_status", "received_at")
+)
+
+DATABASES_HISTORY_KEYS = ("backup_type", "database_name")
+DATABASES_RECENT_HISTORY_QUERY = recent_history_query(
+    "database_backups", DATABASES_HISTORY_KEYS, ("backup_status", "received_at", "error_count")
+)
+
+# === ПОЧТОВЫЙ СЕРВЕР И ОСТАТКИ ===
+
+MAIL_BACKUPS_QUERY = """
+    SELECT backup_status, total_size, backup_path, received_at
+    FROM mail_server_backups
+    WHERE received_at >= ?
+    ORDER BY received_at DESC
+    LIMIT ?
+"""
+
+STOCK_LOADS_QUERY = """
+    WITH normalized AS (
+        SELECT
+            id,
+            COALESCE(source_name, 'Основное предприятие') AS source_name,
+            CASE
+                WHEN supplier_name IS NULL OR supplier_name = 'неизвестно'
+                    THEN COALESCE(source_name, 'Основное предприятие')
+                ELSE supplier_name
+            END AS supplier_name,
+            status,
+            rows_count,
+            error_sample,
+            received_at
+        FROM stock_load_results
+        WHERE received_at >= ?
+    ),
+    ranked AS (
+        SELECT
+            *,
+            ROW_NUMBER() OVER (
+                PARTITION BY source_name, supplier_name
+                ORDER BY received_at DESC, id DESC
+            ) AS row_num
+        FROM normalized
+    )
+    SELECT source_name, supplier_name, status, rows_count, error_sample, received_at
+    FROM ranked
+    WHERE row_num = 1
+    ORDER BY source_name, supplier_name
+"""
+
+# === ОТЧЕТ ===
+
+REPORT_MAIL_RECENT_QUERY = """
+    SELECT backup_status, total_size, backup_path, received_at
+    FROM mail_server_backups
+    WHERE received_at >= ?
+    ORDER BY received_at DESC
+    LIMIT 1
+"""
+
+# MAX(received_at) читается из индекса, без просмотра таблицы
+REPORT_MAIL_LATEST_QUERY = """
+    SELECT backup_status, total_size, backup_path, received_at
+    FROM mail_server_backups
+    WHERE received_at = (SELECT MAX(received_at) FROM mail_server_backups)
+    LIMIT 1
+"""
+
+REPORT_STOCK_LOADS_QUERY = """
+    SELECT supplier_name, status, rows_count, error_sample, received_at
+    FROM stock_load_results
+    WHERE received_at >= ?
+    ORDER BY received_at DESC
+"""
+
+
+__all__ = [
+    "ALL_HOSTS_QUERY",
+    "DATABASES_HISTORY_KEYS",
+    "DATABASES_RECENT_HISTORY_QUERY",
+    "DATABASE_DETAILS_QUERY",
+    "DATABASE_DISPLAY_NAME_QUERY",
+    "DATABASE_MENU_QUERY",
+    "DATABASE_RECENT_STATUS_QUERY",
+    "DATABASE_STATS_QUERY",
+    "FAILED_BACKUPS_QUERY",
+    "HOSTS_HISTORY_KEYS",
+    "HOSTS_RECENT_HISTORY_QUERY",
+    "HOST_RECENT_STATUS_QUERY",
+    "HOST_STATUS_QUERY",
+    "LATEST_BACKUP_TYPE_QUERY",
+    "MAIL_BACKUPS_QUERY",
+    "RECENT_BACKUPS_QUERY",
+    "REPORT_MAIL_LATEST_QUERY",
+    "REPORT_MAIL_RECENT_QUERY",
+    "REPORT_STOCK_LOADS_QUERY",
+    "STOCK_LOADS_QUERY",
+    "TODAY_STATUS_QUERY",
+    "recent_history_query",
+]
@@ -0,0 +1,237 @@
+"""
+/modules/backup_retention.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Backup history retention and compaction
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Хранение и сжатие истории бэкапов
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from lib.logging import debug_log, error_log
+from lib.sqlite_db import get_database
+from modules.backup_schema import create_schema
+
+# Таблица истории -> (выражение сущности, колонка статуса) для дневных итогов
+RETENTION_TABLES = {
+    "proxmox_backups": ("host_name", "backup_status"),
+    "database_backups": ("COALESCE(backup_type, '') || ':' || database_name", "backup_status"),
+    "zfs_pool_status": ("server_name || ':' || pool_name", "pool_state"),
+    "mail_server_backups": ("host_name", "backup_status"),
+    "stock_load_results": ("COALESCE(source_name, '') || ':' || supplier_name", "status"),
+}
+
+# Строк за одну транзакцию: прием писем не ждет блокировку дольше одной пачки
+DELETE_BATCH_SIZE = 5000
+
+# Страниц за один шаг incremental_vacuum
+VACUUM_STEP_PAGES = 2000
+
+
+def _timestamp(days: float) -> str:
+    """Граница хранения в формате received_at."""
+    return (datetime.now() - timedelta(days=float(days))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class BackupRetention:
+    """
+    Очистка истории backups.db
+
+    Строки старше срока хранения таблицы сначала сворачиваются в
+    backup_daily_stats (число записей по дню, сущности и статусу), затем
+    удаляются пачками. У строк старше BACKUP_SUBJECT_KEEP_DAYS очищается
+    тема письма. Освободившиеся страницы возвращаются incremental_vacuum.
+    """
+
+    def __init__(self, db_path: str | Path | None = None):
+        """
+        Args:
+            db_path: Путь к БД бэкапов (по умолчанию из BACKUP_DATABASE_CONFIG)
+        """
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.last_report: dict | None = None
+
+    @property
+    def db_path(self) -> Path:
+        if self._db_path is None:
+            from config.db_settings import BACKUP_DATABASE_CONFIG
+            self._db_path = BACKUP_DATABASE_CONFIG["backups_db"]
+        return Path(self._db_path)
+
+    @staticmethod
+    def _settings() -> tuple[dict, float]:
+        """Сроки хранения таблиц и срок хранения темы письма."""
+        from config.db_settings import BACKUP_RETENTION_DAYS, BACKUP_SUBJECT_KEEP_DAYS
+        from config.settings import BACKUP_RETENTION_DAYS as DEFAULT_RETENTION_DAYS
+
+        retention = dict(DEFAULT_RETENTION_DAYS)
+        if isinstance(BACKUP_RETENTION_DAYS, dict):
+            retention.update(BACKUP_RETENTION_DAYS)
+        return retention, float(BACKUP_SUBJECT_KEEP_DAYS)
+
+    @staticmethod
+    def _size(conn: sqlite3.Connection) -> int:
+        """Размер БД в байтах (без свободных страниц)."""
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        return page_size * page_count
+
+    @staticmethod
+    def _expire(conn: sqlite3.Connection, table: str, cutoff: str) -> tuple[int, int]:
+        """
+        Сворачивает и удаляет строки старше cutoff
+
+        Returns:
+            tuple: (удалено строк, добавлено/обновлено дневных итогов)
+        """
+        entity, status = RETENTION_TABLES[table]
+        batch = f"SELECT id FROM {table} WHERE received_at < ? ORDER BY id LIMIT {DELETE_BATCH_SIZE}"
+        deleted = 0
+        rolled_up = 0
+        while True:
+            with conn:
+                cursor = conn.execute(
+                    f"""
+                    INSERT INTO backup_daily_stats
+                    (source, day, entity, status, records, first_at, last_at)
+                    SELECT ?, date(received_at), {entity}, {status}, COUNT(*),
+                           MIN(received_at), MAX(received_at)
+                    FROM {table}
+                    WHERE id IN ({batch})
+                    GROUP BY date(received_at), {entity}, {status}
+                    ON CONFLICT(source, day, entity, status) DO UPDATE SET
+                        records = records + excluded.records,
+                        first_at = MIN(first_at, excluded.first_at),
+                        last_at = MAX(last_at, excluded.last_at)
+                    """,
+                    (table, cutoff),
+                )
+                rolled_up += max(cursor.rowcount, 0)
+                cursor = conn.execute(f"DELETE FROM {table} WHERE id IN ({batch})", (cutoff,))
+                count = cursor.rowcount
+            deleted += count
+            if count < DELETE_BATCH_SIZE:
+                return deleted, rolled_up
+
+    @staticmethod
+    def _strip_subjects(conn: sqlite3.Connection, table: str, cutoff: str) -> int:
+        """Очищает тему письма у строк старше cutoff."""
+        cleared = 0
+        while True:
+            with conn:
+                cursor = conn.execute(
+                    f"""
+                    UPDATE {table} SET email_subject = NULL
+                    WHERE id IN (
+                        SELECT id FROM {table}
+                        WHERE received_at < ? AND email_subject IS NOT NULL
+                        LIMIT {DELETE_BATCH_SIZE}
+                    )
+                    """,
+                    (cutoff,),
+                )
+            cleared += cursor.rowcount
+            if cursor.rowcount < DELETE_BATCH_SIZE:
+                return cleared
+
+    @staticmethod
+    def _vacuum(conn: sqlite3.Connection) -> None:
+        """Возвращает свободные страницы файловой системе."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Режим INCREMENTAL включается только полной перестройкой файла (один раз)
+            debug_log("🔄 backups.db: включение incremental auto_vacuum (полный VACUUM)")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+                conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    def run(self) -> dict:
+        """
+        Выполняет очистку
+
+        Returns:
+            dict: {"rows": {таблица: удалено}, "rolled_up", "subjects_cleared",
+                   "bytes_before", "bytes_after", "bytes_reclaimed", "duration"}
+        """
+        with self._lock:
+            started = time.monotonic()
+            retention, subject_days = self._settings()
+            report = {"rows": {}, "rolled_up": 0, "subjects_cleared": 0}
+
+            conn = get_database(self.db_path).connect()
+            try:
+                create_schema(conn)
+                report["bytes_before"] = self._size(conn)
+
+                for table in RETENTION_TABLES:
+                    days = retention.get(table)
+                    if not days:
+                        continue
+                    deleted, rolled_up = self._expire(conn, table, _timestamp(days))
+                    report["rows"][table] = deleted
+                    report["rolled_up"] += rolled_up
+                    if subject_days and subject_days < float(days):
+                        report["subjects_cleared"] += self._strip_subjects(
+                            conn, table, _timestamp(subject_days)
+                        )
+
+                self._vacuum(conn)
+                report["bytes_after"] = self._size(conn)
+            finally:
+                conn.close()
+
+            report["bytes_reclaimed"] = max(report["bytes_before"] - report["bytes_after"], 0)
+            report["duration"] = round(time.monotonic() - started, 2)
+            self.last_report = report
+
+            debug_log(
+                f"🧹 Очистка истории бэкапов: удалено {sum(report['rows'].values())} строк "
+                f"({report['rows']}), итогов {report['rolled_up']}, "
+                f"тем очищено {report['subjects_cleared']}, "
+                f"освобождено {report['bytes_reclaimed'] / 1024 / 1024:.1f} МБ "
+                f"за {report['duration']}с"
+            )
+            return report
+
+    def start_scheduler(self) -> None:
+        """Запускает периодическую очистку в фоновом потоке."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.run()
+                except Exception as e:
+                    error_log(f"❌ Ошибка очистки истории бэкапов: {e}")
+                try:
+                    from config.db_settings import BACKUP_RETENTION_INTERVAL
+                    interval = max(int(BACKUP_RETENTION_INTERVAL), 3600)
+                except Exception:
+                    interval = 86400
+                time.sleep(interval)
+
+        self._thread = threading.Thread(target=loop, name="backup-retention", daemon=True)
+        self._thread.start()
+
+
+# Глобальный экземпляр очистки истории бэкапов
+backup_retention = BackupRetention()
+
+
+__all__ = ["BackupRetention", "RETENTION_TABLES", "backup_retention"]
@@ -0,0 +1,400 @@
+"""
+/modules/backup_schema.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Backup database schema and migrations
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Схема и миграции базы бэкапов
+"""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from lib.logging import debug_log, error_log
+from lib.sqlite_db import get_database
+from modules import backup_queries
+from modules.backup_state import create_latest_tables
+
+# Таблицы истории и исходные индексы
+HISTORY_SCHEMA = [
+    """
+        CREATE TABLE IF NOT EXISTS proxmox_backups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            host_name TEXT NOT NULL,
+            backup_status TEXT NOT NULL,
+            task_type TEXT,
+            duration TEXT,
+            total_size TEXT,
+            error_message TEXT,
+            email_subject TEXT,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    """
+        CREATE INDEX IF NOT EXISTS idx_backups_host_date
+        ON proxmox_backups(host_name, received_at)
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS zfs_pool_status (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            server_name TEXT NOT NULL,
+            pool_name TEXT NOT NULL,
+            pool_index INTEGER,
+            pool_state TEXT NOT NULL,
+            email_subject TEXT,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(server_name, pool_name, received_at)
+        )
+    """,
+    """
+        CREATE INDEX IF NOT EXISTS idx_zfs_server_date
+        ON zfs_pool_status(server_name, received_at)
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS mail_server_backups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            host_name TEXT NOT NULL,
+            backup_status TEXT NOT NULL,
+            total_size TEXT,
+            backup_path TEXT,
+            email_subject TEXT,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(host_name, backup_path, received_at)
+        )
+    """,
+    """
+        CREATE INDEX IF NOT EXISTS idx_mail_backup_date
+        ON mail_server_backups(host_name, received_at)
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS stock_load_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_name TEXT NOT NULL,
+            source_name TEXT,
+            file_path TEXT,
+            status TEXT NOT NULL,
+            rows_count INTEGER,
+            error_count INTEGER DEFAULT 0,
+            error_sample TEXT,
+            attachment_name TEXT,
+            log_timestamp TEXT,
+            email_subject TEXT,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(supplier_name, file_path, log_timestamp, received_at)
+        )
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS database_backups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            host_name TEXT NOT NULL,
+            database_name TEXT NOT NULL,
+            database_display_name TEXT,
+            backup_status TEXT NOT NULL,
+            backup_type TEXT,
+            task_type TEXT,
+            error_count INTEGER DEFAULT 0,
+            email_subject TEXT,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(host_name, database_name, received_at)
+        )
+    """,
+    """
+        CREATE INDEX IF NOT EXISTS idx_stock_load_date
+        ON stock_load_results(received_at)
+    """,
+]
+
+# Миграции: (версия, выражения). Номер примененной версии хранится в PRAGMA user_version
+MIGRATIONS = [
+    (1, [
+        # Диапазон по дате: статус за сегодня, последние бэкапы, пакетные статусы меню
+        """
+        CREATE INDEX IF NOT EXISTS idx_proxmox_date_status
+        ON proxmox_backups(received_at, backup_status, host_name)
+        """,
+        # Неудачные бэкапы за период
+        """
+        CREATE INDEX IF NOT EXISTS idx_proxmox_status_date
+        ON proxmox_backups(backup_status, received_at)
+        """,
+        # История конкретной БД (детали, статус), покрывающий
+        """
+        CREATE INDEX IF NOT EXISTS idx_db_backups_key_date
+        ON database_backups(backup_type, database_name, received_at, backup_status, error_count)
+        """,
+        # Последний тип бэкапа БД по имени
+        """
+        CREATE INDEX IF NOT EXISTS idx_db_backups_name_date
+        ON database_backups(database_name, received_at, backup_type)
+        """,
+        # Последний бэкап почтового сервера
+        """
+        CREATE INDEX IF NOT EXISTS idx_mail_backup_received
+        ON mail_server_backups(received_at)
+        """,
+    ]),
+    (2, [
+        # Дневные итоги по строкам истории, удаленным по сроку хранения
+        """
+        CREATE TABLE IF NOT EXISTS backup_daily_stats (
+            source TEXT NOT NULL,
+            day TEXT NOT NULL,
+            entity TEXT NOT NULL,
+            status TEXT NOT NULL,
+            records INTEGER NOT NULL,
+            first_at TIMESTAMP,
+            last_at TIMESTAMP,
+            PRIMARY KEY (source, day, entity, status)
+        )
+        """,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_ready: set[str] = set()
+_ready_lock = threading.Lock()
+
+
+def _add_missing_columns(conn: sqlite3.Connection) -> None:
+    """Колонки, добавленные после создания таблиц."""
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(stock_load_results)")}
+    if "source_name" not in existing_columns:
+        conn.execute("ALTER TABLE stock_load_results ADD COLUMN source_name TEXT")
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Применяет недостающие миграции
+
+    Returns:
+        int: Версия схемы после миграции
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        started = time.monotonic()
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+        conn.execute("ANALYZE")
+        version = target
+        debug_log(f"✅ Схема БД бэкапов обновлена до версии {target} за {time.monotonic() - started:.1f}с")
+    return version
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    """Создает таблицы истории, таблицы состояния и применяет миграции."""
+    for statement in HISTORY_SCHEMA:
+        conn.execute(statement)
+    _add_missing_columns(conn)
+    conn.commit()
+    create_latest_tables(conn)
+    apply_migrations(conn)
+
+
+def ensure_schema(db_path: str | Path) -> bool:
+    """Один раз за процесс проверяет схему БД бэкапов."""
+    database = get_database(db_path)
+    key = str(database.path)
+    with _ready_lock:
+        if key in _ready:
+            return True
+        try:
+            create_schema(database.connection())
+        except sqlite3.Error as e:
+            error_log(f"❌ Не удалось обновить схему БД бэкапов: {e}")
+            return False
+        _ready.add(key)
+        return True
+
+
+def day_start(days_ago: int = 0) -> str:
+    """
+    Начало суток в формате received_at (days_ago=-1 - начало завтрашнего дня)
+
+    Используется вместо date(received_at) в условиях, чтобы работали индексы.
+    """
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_ago)
+    return day.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# === ПРОВЕРКА ПЛАНОВ ЗАПРОСОВ ===
+
+def _hours_ago(hours: int) -> str:
+    return (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Таблицы истории: любой SCAN по ним растет вместе с историей, даже по индексу
+HISTORY_TABLES = (
+    "proxmox_backups",
+    "database_backups",
+    "mail_server_backups",
+    "stock_load_results",
+    "zfs_pool_status",
+)
+
+# Запросы меню бэкапов и отчета: имя -> (SQL из modules.backup_queries, параметры)
+BENCHMARK_QUERIES = {
+    "today_status": (backup_queries.TODAY_STATUS_QUERY, lambda: (day_start(0), day_start(-1))),
+    "recent_backups": (backup_queries.RECENT_BACKUPS_QUERY, lambda: (_hours_ago(24),)),
+    "host_status": (backup_queries.HOST_STATUS_QUERY, lambda: ("host-1",)),
+    "failed_backups": (backup_queries.FAILED_BACKUPS_QUERY, lambda: (day_start(1),)),
+    "all_hosts": (backup_queries.ALL_HOSTS_QUERY, lambda: ()),
+    "host_recent_status": (backup_queries.HOST_RECENT_STATUS_QUERY, lambda: ("host-1", _hours_ago(48))),
+    "hosts_bulk_status": (backup_queries.HOSTS_RECENT_HISTORY_QUERY, lambda: (_hours_ago(72), 3)),
+    "database_stats": (backup_queries.DATABASE_STATS_QUERY, lambda: (_hours_ago(24),)),
+    "database_details": (
+        backup_queries.DATABASE_DETAILS_QUERY,
+        lambda: ("company_database", "db_1", _hours_ago(168)),
+    ),
+    "database_recent_status": (
+        backup_queries.DATABASE_RECENT_STATUS_QUERY,
+        lambda: ("company_database", "db_1", _hours_ago(48)),
+    ),
+    "databases_bulk_status": (backup_queries.DATABASES_RECENT_HISTORY_QUERY, lambda: (_hours_ago(72), 3)),
+    "database_menu": (backup_queries.DATABASE_MENU_QUERY, lambda: ()),
+    "latest_backup_type": (backup_queries.LATEST_BACKUP_TYPE_QUERY, lambda: ("db_1", _hours_ago(48))),
+    "database_display_name": (backup_queries.DATABASE_DISPLAY_NAME_QUERY, lambda: ("company_database", "db_1")),
+    "mail_backups": (backup_queries.MAIL_BACKUPS_QUERY, lambda: (_hours_ago(72), 10)),
+    "stock_loads": (backup_queries.STOCK_LOADS_QUERY, lambda: (_hours_ago(24),)),
+    "report_mail_recent": (backup_queries.REPORT_MAIL_RECENT_QUERY, lambda: (_hours_ago(16),)),
+    "report_mail_latest": (backup_queries.REPORT_MAIL_LATEST_QUERY, lambda: ()),
+    "report_stock_loads": (backup_queries.REPORT_STOCK_LOADS_QUERY, lambda: (_hours_ago(24),)),
+}
+
+
+def _scans_history(step: str) -> bool:
+    """Шаг плана просматривает таблицу истории (с индексом или без)."""
+    parts = step.split()
+    return len(parts) > 1 and parts[0] == "SCAN" and parts[1] in HISTORY_TABLES
+
+
+def _fill_synthetic_history(conn: sqlite3.Connection, days: int, hosts: int, databases: int) -> None:
+    """Заполняет БД синтетической историей: два бэкапа в сутки на хост и БД."""
+    rng = random.Random(42)
+    now = datetime.now()
+    proxmox_rows = []
+    database_rows = []
+    mail_rows = []
+    stock_rows = []
+    for day in range(days):
+        for run in range(2):
+            moment = now - timedelta(days=day, hours=12 * run)
+            for host in range(hosts):
+                received_at = (moment - timedelta(seconds=host)).strftime("%Y-%m-%d %H:%M:%S")
+                status = "failed" if rng.random() < 0.03 else "success"
+                proxmox_rows.append((f"host-{host}", status, "vzdump", received_at))
+            for db in range(databases):
+                received_at = (moment - timedelta(seconds=db)).strftime("%Y-%m-%d %H:%M:%S")
+                status = "failed" if rng.random() < 0.03 else "success"
+                backup_type = "company_database" if db % 2 else "client"
+                database_rows.append(("srv", f"db_{db}", status, backup_type, received_at))
+        received_at = (now - timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S")
+        mail_rows.append(("mail", "success", f"/backup/{day}", received_at))
+        for supplier in range(20):
+            stock_rows.append((f"supplier-{supplier}", f"/stock/{supplier}.csv", "success", received_at))
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO proxmox_backups (host_name, backup_status, task_type, received_at) VALUES (?, ?, ?, ?)",
+            proxmox_rows,
+        )
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO database_backups
+            (host_name, database_name, backup_status, backup_type, received_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            database_rows,
+        )
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO mail_server_backups (host_name, backup_status, backup_path, received_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            mail_rows,
+        )
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO stock_load_results (supplier_name, file_path, status, received_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            stock_rows,
+        )
+
+
+def benchmark(days: int = 365, hosts: int = 30, databases: int = 60, runs: int = 20) -> list[dict]:
+    """
+    Проверяет планы запросов на синтетической истории
+
+    Создает временную БД с историей за days дней, применяет схему и для
+    каждого запроса из BENCHMARK_QUERIES выводит план и среднее время.
+
+    Returns:
+        list: [{"name", "plan", "ms", "full_scan"}]
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(str(Path(tmp) / "backups.db"))
+        for statement in HISTORY_SCHEMA:
+            conn.execute(statement)
+        _add_missing_columns(conn)
+        _fill_synthetic_history(conn, days, hosts, databases)
+        create_latest_tables(conn)
+        apply_migrations(conn)
+
+        total = conn.execute("SELECT COUNT(*) FROM proxmox_backups").fetchone()[0]
+        total += conn.execute("SELECT COUNT(*) FROM database_backups").fetchone()[0]
+        print(f"История: {days} дней, {total} записей бэкапов")
+
+        for name, (sql, params) in BENCHMARK_QUERIES.items():
+            args = params()
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", args)]
+            started = time.perf_counter()
+            for _ in range(runs):
+                conn.execute(sql, args).fetchall()
+            elapsed_ms = (time.perf_counter() - started) * 1000 / runs
+            full_scan = any(_scans_history(step) for step in plan)
+            results.append({"name": name, "plan": plan, "ms": elapsed_ms, "full_scan": full_scan})
+            mark = "❌" if full_scan else "✅"
+            print(f"{mark} {name}: {elapsed_ms:.2f} мс")
+            for step in plan:
+                print(f"      {step}")
+        conn.close()
+    return results
+
+
+__all__ = [
+    "BENCHMARK_QUERIES",
+    "HISTORY_SCHEMA",
+    "HISTORY_TABLES",
+    "MIGRATIONS",
+    "SCHEMA_VERSION",
+    "apply_migrations",
+    "benchmark",
+    "create_schema",
+    "day_start",
+    "ensure_schema",
+]
+
+
+if __name__ == "__main__":
+    # python -m modules.backup_schema [дней истории]
+    benchmark_days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    benchmark_results = benchmark(benchmark_days)
+    sys.exit(1 if any(item["full_scan"] for item in benchmark_results) else 0)
@@ -0,0 +1,150 @@
+"""
+/modules/backup_state.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Latest backup state tables
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Таблицы последнего состояния бэкапов
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from lib.logging import debug_log
+
+# Таблица последнего состояния -> (DDL, исходная таблица истории, заполнение из истории)
+LATEST_TABLES = {
+    "proxmox_latest": (
+        """
+        CREATE TABLE IF NOT EXISTS proxmox_latest (
+            host_name TEXT PRIMARY KEY,
+            backup_status TEXT NOT NULL,
+            received_at TIMESTAMP NOT NULL
+        )
+        """,
+        "proxmox_backups",
+        """
+        INSERT OR IGNORE INTO proxmox_latest (host_name, backup_status, received_at)
+        SELECT host_name, backup_status, MAX(received_at)
+        FROM proxmox_backups
+        GROUP BY host_name
+        """,
+    ),
+    "database_latest": (
+        """
+        CREATE TABLE IF NOT EXISTS database_latest (
+            backup_type TEXT NOT NULL DEFAULT '',
+            database_name TEXT NOT NULL,
+            backup_status TEXT NOT NULL,
+            error_count INTEGER DEFAULT 0,
+            received_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (backup_type, database_name)
+        )
+        """,
+        "database_backups",
+        """
+        INSERT OR IGNORE INTO database_latest
+        (backup_type, database_name, backup_status, error_count, received_at)
+        SELECT COALESCE(backup_type, ''), database_name, backup_status, error_count, MAX(received_at)
+        FROM database_backups
+        GROUP BY backup_type, database_name
+        """,
+    ),
+    "zfs_pool_latest": (
+        """
+        CREATE TABLE IF NOT EXISTS zfs_pool_latest (
+            server_name TEXT NOT NULL,
+            pool_name TEXT NOT NULL,
+            pool_state TEXT NOT NULL,
+            received_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (server_name, pool_name)
+        )
+        """,
+        "zfs_pool_status",
+        """
+        INSERT OR IGNORE INTO zfs_pool_latest (server_name, pool_name, pool_state, received_at)
+        SELECT server_name, pool_name, pool_state, MAX(received_at)
+        FROM zfs_pool_status
+        GROUP BY server_name, pool_name
+        """,
+    ),
+}
+
+# Обновление выполняется только если запись не старее сохраненной,
+# поэтому порядок обработки писем на результат не влияет
+PROXMOX_LATEST_UPSERT = """
+    INSERT INTO proxmox_latest (host_name, backup_status, received_at)
+    VALUES (?, ?, ?)
+    ON CONFLICT(host_name) DO UPDATE SET
+        backup_status = excluded.backup_status,
+        received_at = excluded.received_at
+    WHERE excluded.received_at >= proxmox_latest.received_at
+"""
+
+DATABASE_LATEST_UPSERT = """
+    INSERT INTO database_latest (backup_type, database_name, backup_status, error_count, received_at)
+    VALUES (COALESCE(?, ''), ?, ?, ?, ?)
+    ON CONFLICT(backup_type, database_name) DO UPDATE SET
+        backup_status = excluded.backup_status,
+        error_count = excluded.error_count,
+        received_at = excluded.received_at
+    WHERE excluded.received_at >= database_latest.received_at
+"""
+
+ZFS_LATEST_UPSERT = """
+    INSERT INTO zfs_pool_latest (server_name, pool_name, pool_state, received_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(server_name, pool_name) DO UPDATE SET
+        pool_state = excluded.pool_state,
+        received_at = excluded.received_at
+    WHERE excluded.received_at >= zfs_pool_latest.received_at
+"""
+
+
+def create_latest_tables(conn: sqlite3.Connection) -> None:
+    """
+    Создает таблицы последнего состояния
+
+    Новая таблица сразу заполняется из истории, дальше ее поддерживает
+    прием писем.
+    """
+    existing = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    for table, (ddl, history_table, backfill) in LATEST_TABLES.items():
+        if table in existing:
+            continue
+        conn.execute(ddl)
+        if history_table in existing:
+            conn.execute(backfill)
+            debug_log(f"✅ {table}: заполнена из {history_table}")
+    conn.commit()
+
+
+def refresh_zfs_server(conn: sqlite3.Connection, server_name: str) -> None:
+    """Пересчитывает последнее состояние пулов сервера по истории."""
+    conn.execute("DELETE FROM zfs_pool_latest WHERE server_name = ?", (server_name,))
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO zfs_pool_latest (server_name, pool_name, pool_state, received_at)
+        SELECT server_name, pool_name, pool_state, MAX(received_at)
+        FROM zfs_pool_status
+        WHERE server_name = ?
+        GROUP BY server_name, pool_name
+        """,
+        (server_name,),
+    )
+
+
+__all__ = [
+    "DATABASE_LATEST_UPSERT",
+    "PROXMOX_LATEST_UPSERT",
+    "ZFS_LATEST_UPSERT",
+    "create_latest_tables",
+    "refresh_zfs_server",
+]
@@ -0,0 +1,415 @@
+"""
+/modules/mail_ingest.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Maildir ingest pipeline
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Конвейер приема писем из Maildir
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config.db_settings import MAIL_MONITOR_LOG_FILE
+from lib.logging import setup_logging
+from lib.sqlite_db import get_database
+
+logger = setup_logging("mail_monitor", log_file=MAIL_MONITOR_LOG_FILE)
+
+# Маски событий inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+# Признак конца потока для писателя
+_STOP = object()
+
+
+def list_maildir(directory: Path) -> list[Path]:
+    """Список файлов писем в каталоге."""
+    try:
+        with os.scandir(directory) as entries:
+            return [Path(entry.path) for entry in entries if entry.is_file()]
+    except FileNotFoundError:
+        logger.error(f"Директория не существует: {directory}")
+        return []
+
+
+class MaildirWatcher:
+    """Обнаружение новых писем: inotify, при недоступности - периодический опрос"""
+
+    def __init__(self, directory: Path, poll_interval: int = 30) -> None:
+        """
+        Args:
+            directory: Каталог Maildir/new
+            poll_interval: Интервал опроса (и полного пересканирования при inotify)
+        """
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self._fd: int | None = None
+        self._last_scan = 0.0
+        self._init_inotify()
+
+    @property
+    def mode(self) -> str:
+        """Текущий способ обнаружения писем."""
+        return "inotify" if self._fd is not None else "poll"
+
+    def _init_inotify(self) -> None:
+        """Подключает inotify через libc, при ошибке остается режим опроса."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            if not hasattr(libc, "inotify_init1"):
+                return
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1")
+            wd = libc.inotify_add_watch(
+                fd,
+                os.fsencode(str(self.directory)),
+                IN_MOVED_TO | IN_CLOSE_WRITE,
+            )
+            if wd < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch")
+            self._fd = fd
+            logger.info("👁️ Отслеживание %s через inotify", self.directory)
+        except Exception as exc:
+            logger.warning("⚠️ inotify недоступен (%s), используется опрос каталога", exc)
+            self._fd = None
+
+    def scan(self) -> list[Path]:
+        """Полный список файлов в каталоге."""
+        self._last_scan = time.monotonic()
+        return list_maildir(self.directory)
+
+    def wait(self) -> list[Path]:
+        """
+        Ждет появления новых писем
+
+        В режиме inotify возвращает файлы из событий, а раз в poll_interval
+        делает полное сканирование как страховку от потерянных событий.
+
+        Returns:
+            list[Path]: Кандидаты на обработку (могут повторяться)
+        """
+        if self._fd is None:
+            remaining = self.poll_interval - (time.monotonic() - self._last_scan)
+            if remaining > 0:
+                time.sleep(remaining)
+            return self.scan()
+
+        remaining = max(0.0, self.poll_interval - (time.monotonic() - self._last_scan))
+        try:
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+        except (OSError, ValueError) as exc:
+            logger.warning("⚠️ Ошибка ожидания inotify (%s), переход на опрос", exc)
+            self.close()
+            return self.scan()
+
+        if not readable:
+            return self.scan()
+
+        paths, rescan = self._read_events()
+        if rescan:
+            return self.scan()
+        return paths
+
+    def _read_events(self) -> tuple[list[Path], bool]:
+        """Читает события inotify, возвращает (файлы, нужен_полный_скан)."""
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        except OSError as exc:
+            logger.warning("⚠️ Ошибка чтения inotify (%s), переход на опрос", exc)
+            self.close()
+            return [], True
+
+        paths: list[Path] = []
+        rescan = False
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            _, mask, _, name_len = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+            elif mask & IN_IGNORED:
+                # Каталог удален или перемонтирован - наблюдение больше не работает
+                logger.warning("⚠️ Наблюдение за %s снято, переход на опрос", self.directory)
+                self.close()
+                rescan = True
+            elif name:
+                paths.append(self.directory / os.fsdecode(name))
+        return paths, rescan
+
+    def close(self) -> None:
+        """Закрывает дескриптор inotify."""
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+
+class MailIngestPipeline:
+    """
+    Конвейер обработки писем
+
+    Обнаружение файлов -> пул потоков разбора -> единственный писатель,
+    который фиксирует результаты в backups.db пакетными транзакциями.
+    Письмо переносится в cur только после фиксации его записей, поэтому
+    при падении процесса необработанные письма останутся в new.
+    """
+
+    def __init__(
+        self,
+        processor,
+        workers: int | None = None,
+        batch_size: int | None = None,
+        flush_interval: float = 2.0,
+    ) -> None:
+        """
+        Args:
+            processor: BackupProcessor для разбора писем
+            workers: Число потоков разбора (по умолчанию MAIL_INGEST_WORKERS)
+            batch_size: Писем в одной транзакции (по умолчанию MAIL_INGEST_BATCH_SIZE)
+            flush_interval: Максимальная задержка фиксации неполного пакета (секунды)
+        """
+        from config.db_settings import MAIL_INGEST_BATCH_SIZE, MAIL_INGEST_WORKERS
+
+        self.processor = processor
+        self.workers = max(1, int(workers or MAIL_INGEST_WORKERS))
+        self.batch_size = max(1, int(batch_size or MAIL_INGEST_BATCH_SIZE))
+        self.flush_interval = flush_interval
+
+        self._inflight: set[str] = set()
+        self._inflight_lock = threading.Lock()
+        self._processed = 0
+        self._processed_lock = threading.Lock()
+
+    # === РАЗБОР ===
+
+    def _parse(self, file_path: Path, results: queue.Queue) -> None:
+        """Разбирает письмо в потоке пула и передает результат писателю."""
+        logger.info(f"🔍 Обнаружено новое письмо: {file_path.name}")
+        try:
+            result, statements, messages = self.processor.parse_email_for_batch(file_path)
+        except Exception as exc:
+            logger.error(f"Ошибка парсинга файла {file_path}: {exc}")
+            result, statements, messages = None, [], []
+        results.put((file_path, result, statements, messages))
+
+    def _submit(self, executor: ThreadPoolExecutor, paths: list[Path], results: queue.Queue) -> int:
+        """Отправляет в разбор файлы, которые еще не обрабатываются."""
+        submitted = 0
+        for file_path in paths:
+            key = str(file_path)
+            with self._inflight_lock:
+                if key in self._inflight:
+                    continue
+                self._inflight.add(key)
+            if not file_path.is_file():
+                self._release(file_path)
+                continue
+            executor.submit(self._parse, file_path, results)
+            submitted += 1
+        return submitted
+
+    def _release(self, file_path: Path) -> None:
+        """Снимает отметку об обработке файла."""
+        with self._inflight_lock:
+            self._inflight.discard(str(file_path))
+
+    # === ЗАПИСЬ ===
+
+    def _execute(self, conn: sqlite3.Connection, items: list) -> None:
+        """Выполняет записи писем в одной транзакции."""
+        with conn:
+            for _, _, statements, _ in items:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        """
+        Фиксирует пакет и переносит в cur письма, записи которых зафиксированы
+
+        Письма, которые не удалось записать, остаются в new и будут
+        обработаны при следующем сканировании.
+        """
+        committed = batch
+        try:
+            self._execute(conn, batch)
+        except sqlite3.Error as exc:
+            # Изолируем письмо, из-за которого не прошла транзакция
+            logger.error(f"❌ Ошибка пакетной записи ({len(batch)} писем): {exc}")
+            committed = []
+            for item in batch:
+                try:
+                    self._execute(conn, [item])
+                    committed.append(item)
+                except sqlite3.Error as item_exc:
+                    logger.error(f"❌ Ошибка сохранения письма {item[0].name} в БД, оставлено в new: {item_exc}")
+                    self._release(item[0])
+
+        processed = 0
+        for file_path, result, _, messages in committed:
+            for message, args in messages:
+                logger.info(message, *args)
+            self._move_to_cur(file_path, result)
+            self._release(file_path)
+            if result:
+                processed += 1
+
+        with self._processed_lock:
+            self._processed += processed
+        logger.info(f"💾 Записан пакет: {len(committed)} из {len(batch)} писем, распознано {processed}")
+
+    def _move_to_cur(self, file_path: Path, result) -> None:
+        """Переносит обработанное письмо в cur."""
+        from config.db_settings import MAILDIR_CUR
+
+        new_path = MAILDIR_CUR / file_path.name
+        try:
+            shutil.move(str(file_path), str(new_path))
+            self.processor.processed_files.add(str(new_path))
+            if result:
+                logger.info(f"✅ Письмо перемещено в cur: {file_path.name}")
+            else:
+                logger.warning(f"⚠️ Не удалось обработать письмо: {file_path.name}")
+        except FileNotFoundError:
+            # Письмо уже забрал другой обработчик
+            pass
+        except Exception as exc:
+            logger.error(f"❌ Ошибка перемещения письма: {exc}")
+            self.processor.processed_files.add(str(file_path))
+
+    def _writer(self, conn: sqlite3.Connection, results: queue.Queue) -> None:
+        """Единственный писатель в backups.db."""
+        batch: list = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = results.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is not None and item is not _STOP:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                flush = (
+                    len(batch) >= self.batch_size
+                    or item is None
+                    or item is _STOP
+                )
+                if batch and flush:
+                    try:
+                        self._commit_batch(conn, batch)
+                    except Exception as exc:
+                        logger.error(f"❌ Ошибка записи пакета писем: {exc}")
+                        for file_path, *_ in batch:
+                            self._release(file_path)
+                    batch = []
+                    deadline = None
+
+                if item is _STOP:
+                    return
+        finally:
+            conn.close()
+
+    # === ЗАПУСК ===
+
+    def _start(self):
+        """Запускает пул разбора и поток писателя."""
+        # Очередь ограничена, чтобы разбор не опережал запись без предела
+        results: queue.Queue = queue.Queue(maxsize=self.batch_size * 4)
+        # Отдельное соединение писателя: оно живет в своем потоке до остановки конвейера
+        conn = get_database(self.processor.db_path).connect()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mail-parse")
+        writer = threading.Thread(target=self._writer, args=(conn, results), name="mail-writer", daemon=True)
+        writer.start()
+        return results, executor, writer
+
+    @staticmethod
+    def _stop(results: queue.Queue, executor: ThreadPoolExecutor, writer: threading.Thread) -> None:
+        """Дожидается разбора и записи всех отправленных писем."""
+        executor.shutdown(wait=True)
+        results.put(_STOP)
+        writer.join()
+
+    def run_once(self, paths: list[Path] | None = None) -> int:
+        """
+        Обрабатывает текущее содержимое Maildir/new
+
+        Returns:
+            int: Количество распознанных писем
+        """
+        from config.db_settings import MAILDIR_NEW
+
+        if paths is None:
+            paths = list_maildir(MAILDIR_NEW)
+        if not paths:
+            return 0
+
+        self._processed = 0
+        results, executor, writer = self._start()
+        try:
+            self._submit(executor, paths, results)
+        finally:
+            self._stop(results, executor, writer)
+        return self._processed
+
+    def run_forever(self, poll_interval: int | None = None) -> None:
+        """Основной цикл: ждет новые письма и обрабатывает их по мере появления."""
+        from config.db_settings import MAIL_POLL_INTERVAL, MAILDIR_NEW
+
+        watcher = MaildirWatcher(MAILDIR_NEW, int(poll_interval or MAIL_POLL_INTERVAL))
+        logger.info(
+            "📧 Прием писем: %s, потоков разбора %s, пакет %s",
+            watcher.mode,
+            self.workers,
+            self.batch_size,
+        )
+        results, executor, writer = self._start()
+        try:
+            # Письма, накопившиеся до запуска
+            self._submit(executor, watcher.scan(), results)
+            while True:
+                try:
+                    self._submit(executor, watcher.wait(), results)
+                except Exception as exc:
+                    logger.error(f"❌ Ошибка в основном цикле: {exc}")
+                    time.sleep(60)
+        finally:
+            watcher.close()
+            self._stop(results, executor, writer)
+
+
+__all__ = ["MaildirWatcher", "MailIngestPipeline"]
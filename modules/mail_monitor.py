@@ -13,15 +13,17 @@ Mailbox monitoring
 
 from __future__ import annotations
 
+import binascii
+import codecs
 import email.policy
+import io
 import re
-import shutil
-import sqlite3
-import time
+import threading
 from datetime import datetime
 from email import message_from_bytes
 from email.utils import parsedate_to_datetime
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from config.db_settings import (
     BACKUP_DATABASE_CONFIG,
@@ -31,21 +33,27 @@ from config.db_settings import (
     MAILDIR_CUR,
     MAILDIR_NEW,
     MAIL_MONITOR_LOG_FILE,
+    SETTINGS_DB_FILE,
     ZFS_SERVERS,
 )
 from core.config_manager import config_manager
 from extensions.extension_manager import extension_manager
 from lib.logging import setup_logging
+from lib.sqlite_db import get_database
+from modules.backup_schema import create_schema
+from modules.backup_state import DATABASE_LATEST_UPSERT, PROXMOX_LATEST_UPSERT, ZFS_LATEST_UPSERT
+from modules.mail_rules import MailRuleEngine, SubjectMatch, compile_stock_patterns, match_any
 
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 logger = setup_logging("mail_monitor", log_file=MAIL_MONITOR_LOG_FILE)
 
 
-def get_database_patterns_from_config() -> dict[str, list[str]]:
+def get_database_patterns_from_config(all_patterns: object = None) -> dict[str, list[str]]:
     """Правильно извлекает паттерны из конфигурации."""
     try:
-        all_patterns = BACKUP_PATTERNS
+        if all_patterns is None:
+            all_patterns = BACKUP_PATTERNS
 
         if isinstance(all_patterns, str):
             try:
@@ -316,120 +324,263 @@ def get_stock_load_patterns_from_config() -> dict[str, list[str]]:
         }
 
 
-class BackupProcessor:
-    """Обработчик бэкапов."""
+# Паттерны, которые применяются в дополнение к настройкам
+DATABASE_FALLBACK_PATTERNS = {
+    "barnaul": [
+        r"cobian\s+brn\s+backup\s+([\w.-]+),\s*errors[:=]\s*([\w\d]+)?",
+    ],
+    "client": [
+        r"rubicon-1c\s+([\w.-]+)\s+dump\s+complete",
+        r"backup\s+1c7\.7\s+([\w.-]+)\s+ok",
+    ],
+}
+MAIL_BACKUP_DEFAULT_PATTERN = (
+    r"^\s*бэкап\s+zimbra\s*-\s*"
+    r"(?P<size>\d+(?:[.,]\d+)?\s*[TGMK]?(?:i?B)?)\s+"
+    r"(?P<path>/\S+)\s*$"
+)
+STOCK_FILE_ENTRY_DEFAULT_PATTERN = (
+    r"^\d{2}\.\d{2}\.\d{2}\s+\d{2}:\d{2}:\d{2}:\s+"
+    r"(?P<supplier>.+?)\s{2,}(?P<path>(?:[A-Za-z]:\\|\\\\[^\\]+\\).+)$"
+)
+PROXMOX_SUBJECT_KEYWORDS = [
+    "vzdump backup status",
+    "proxmox backup",
+    "backup successful",
+    "backup failed",
+]
+
+_LOG_TIMESTAMP_RE = re.compile(r"^(\d{2}\.\d{2}\.\d{2}\s+\d{2}:\d{2}:\d{2})")
+_ERROR_COUNT_RE = re.compile(r"\d+")
+
+# Потоковое чтение вложений: размер блока и кодировка, если текст не UTF-8
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+ATTACHMENT_FALLBACK_ENCODING = "cp1251"
+
+# Сколько строк ошибок хранить в записи остатков (остальные только считаются)
+STOCK_LOAD_ERROR_LINES_KEPT = 10
+
+
+def _first_match(regexes: list[re.Pattern], line: str) -> re.Match | None:
+    """Первое совпадение строки со списком паттернов."""
+    for regex in regexes:
+        match = regex.search(line)
+        if match:
+            return match
+    return None
+
+
+def _new_stock_entry(supplier: str, path: str | None, log_timestamp: str | None) -> dict:
+    """Новая запись результата загрузки остатков."""
+    return {
+        "supplier_name": supplier,
+        "file_path": path,
+        "rows_count": None,
+        "errors": [],
+        "error_count": 0,
+        "has_success": False,
+        "has_failure": False,
+        "log_timestamp": log_timestamp,
+    }
+
+
+def _finalize_stock_entry(entry: dict) -> dict:
+    """Вычисляет итоговый статус записи остатков."""
+    has_success = entry.get("has_success", False)
+    has_failure = entry.get("has_failure", False)
+    if has_success and has_failure:
+        status = "warning"
+    elif has_success:
+        status = "success"
+    elif has_failure:
+        status = "failed"
+    else:
+        status = "unknown"
+
+    entry["status"] = status
+    entry["error_sample"] = entry["errors"][0][:500] if entry.get("errors") else None
+    return entry
+
+
+class _TransferDecoder(io.RawIOBase):
+    """Поблочное декодирование base64/quoted-printable содержимого вложения"""
+
+    def __init__(self, payload: str, transfer_encoding: str, chunk_size: int = ATTACHMENT_CHUNK_SIZE):
+        super().__init__()
+        self._payload = payload
+        self._encoding = transfer_encoding
+        self._chunk_size = chunk_size
+        self._pos = 0
+        self._tail = ""
+        self._block = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._block and self._pos < len(self._payload):
+            self._block = memoryview(self._next_block())
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+    def _next_block(self) -> bytes:
+        """Декодирует следующий блок исходного текста."""
+        chunk = self._payload[self._pos:self._pos + self._chunk_size]
+        self._pos += len(chunk)
+        at_end = self._pos >= len(self._payload)
+
+        if self._encoding == "base64":
+            data = self._tail + "".join(chunk.split())
+            usable = len(data) if at_end else len(data) - len(data) % 4
+            self._tail = data[usable:]
+            data = data[:usable]
+            if at_end and len(data) % 4:
+                data += "=" * (-len(data) % 4)
+            try:
+                return binascii.a2b_base64(data)
+            except binascii.Error:
+                return b""
 
-    def __init__(self) -> None:
-        self.db_path = BACKUP_DATABASE_CONFIG["backups_db"]
-        self.processed_files: set[str] = set()
-        self.init_database()
+        # quoted-printable: режем по границе строки, чтобы не разорвать =XX
+        if not at_end:
+            cut = chunk.rfind("\n") + 1
+            if cut:
+                self._pos -= len(chunk) - cut
+                chunk = chunk[:cut]
+        return binascii.a2b_qp(chunk.encode("ascii", "replace"))
 
-    def init_database(self) -> None:
-        """Инициализация базы данных."""
+
+class _AttachmentLines:
+    """
+    Строки вложения с определением кодировки по ходу чтения
+
+    Если кодировка не указана в charset, текст читается как строгий UTF-8.
+    На первой ошибке декодирования вложение открывается заново с начала
+    в cp1251, уже отданные строки пропускаются (граница строки в обеих
+    кодировках - один и тот же байт, а отданные строки были ASCII или
+    корректным UTF-8).
+    """
+
+    def __init__(self, open_raw, charset: str | None):
+        self._open_raw = open_raw
+        self._charset = charset
+        self._stream: io.TextIOWrapper | None = None
+
+    def _open(self, encoding: str, errors: str) -> io.TextIOWrapper:
+        self.close()
+        stream = io.BufferedReader(self._open_raw(), ATTACHMENT_CHUNK_SIZE)
+        self._stream = io.TextIOWrapper(stream, encoding=encoding, errors=errors)
+        return self._stream
+
+    def __iter__(self) -> Iterator[str]:
+        if self._charset:
+            yield from self._open(self._charset, "replace")
+            return
+
+        consumed = 0
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
+            for line in self._open("utf-8", "strict"):
+                consumed += 1
+                yield line
+            return
+        except UnicodeDecodeError:
+            logger.debug("Вложение не в UTF-8, повторное чтение в %s", ATTACHMENT_FALLBACK_ENCODING)
 
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS proxmox_backups (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    host_name TEXT NOT NULL,
-                    backup_status TEXT NOT NULL,
-                    task_type TEXT,
-                    duration TEXT,
-                    total_size TEXT,
-                    error_message TEXT,
-                    email_subject TEXT,
-                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """
-            )
+        lines = self._open(ATTACHMENT_FALLBACK_ENCODING, "replace")
+        for _ in range(consumed):
+            next(lines, None)
+        yield from lines
 
-            cursor.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_backups_host_date
-                ON proxmox_backups(host_name, received_at)
-            """
-            )
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
 
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS zfs_pool_status (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    server_name TEXT NOT NULL,
-                    pool_name TEXT NOT NULL,
-                    pool_index INTEGER,
-                    pool_state TEXT NOT NULL,
-                    email_subject TEXT,
-                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(server_name, pool_name, received_at)
-                )
-            """
-            )
+    def __enter__(self) -> "_AttachmentLines":
+        return self
 
-            cursor.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_zfs_server_date
-                ON zfs_pool_status(server_name, received_at)
-            """
-            )
+    def __exit__(self, *exc) -> None:
+        self.close()
 
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS mail_server_backups (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    host_name TEXT NOT NULL,
-                    backup_status TEXT NOT NULL,
-                    total_size TEXT,
-                    backup_path TEXT,
-                    email_subject TEXT,
-                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(host_name, backup_path, received_at)
-                )
-            """
-            )
 
-            cursor.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_mail_backup_date
-                ON mail_server_backups(host_name, received_at)
-            """
-            )
+def _part_charset(part) -> str | None:
+    """Кодировка из параметра charset, если Python ее знает."""
+    charset = part.get_content_charset()
+    if not charset:
+        return None
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
 
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS stock_load_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    supplier_name TEXT NOT NULL,
-                    source_name TEXT,
-                    file_path TEXT,
-                    status TEXT NOT NULL,
-                    rows_count INTEGER,
-                    error_count INTEGER DEFAULT 0,
-                    error_sample TEXT,
-                    attachment_name TEXT,
-                    log_timestamp TEXT,
-                    email_subject TEXT,
-                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(supplier_name, file_path, log_timestamp, received_at)
-                )
-            """
-            )
 
-            cursor.execute("PRAGMA table_info(stock_load_results)")
-            existing_columns = {row[1] for row in cursor.fetchall()}
-            if "source_name" not in existing_columns:
-                cursor.execute("ALTER TABLE stock_load_results ADD COLUMN source_name TEXT")
+def open_attachment_lines(part) -> _AttachmentLines:
+    """
+    Открывает вложение как поток строк
 
-            cursor.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_stock_load_date
-                ON stock_load_results(received_at)
-            """
-            )
+    base64 и quoted-printable декодируются блоками, текст - инкрементально,
+    поэтому декодированное содержимое не копируется в память целиком.
+    """
+    transfer_encoding = str(part.get("content-transfer-encoding", "")).strip().lower()
+    if transfer_encoding in ("base64", "quoted-printable"):
+        payload = part.get_payload(decode=False) or ""
+
+        def open_raw():
+            return _TransferDecoder(payload, transfer_encoding)
+    else:
+        data = part.get_payload(decode=True) or b""
+
+        def open_raw():
+            return io.BytesIO(data)
+
+    return _AttachmentLines(open_raw, _part_charset(part))
+
+
+def load_mail_rule_patterns() -> dict:
+    """Собирает исходные паттерны для движка правил писем."""
+    all_patterns = config_manager.get_setting("BACKUP_PATTERNS", BACKUP_PATTERNS, use_cache=False)
+    database = get_database_patterns_from_config(all_patterns)
+
+    stock = get_stock_load_patterns_from_config()
+    file_entry = stock.get("file_entry", [])
+    if STOCK_FILE_ENTRY_DEFAULT_PATTERN not in file_entry:
+        stock["file_entry"] = [*file_entry, STOCK_FILE_ENTRY_DEFAULT_PATTERN]
+
+    return {
+        "database": {
+            "company": database.get("company", []),
+            "client": database.get("client", []) + DATABASE_FALLBACK_PATTERNS["client"],
+            "barnaul": database.get("barnaul", []) + DATABASE_FALLBACK_PATTERNS["barnaul"],
+            "yandex": database.get("yandex", []),
+        },
+        "zfs": get_zfs_patterns_from_config(),
+        "mail": get_mail_patterns_from_config() or [MAIL_BACKUP_DEFAULT_PATTERN],
+        "stock_load": stock,
+        "proxmox": [re.escape(keyword) for keyword in PROXMOX_SUBJECT_KEYWORDS],
+    }
+
+
+# Глобальный экземпляр движка правил писем
+mail_rule_engine = MailRuleEngine(load_mail_rule_patterns, SETTINGS_DB_FILE)
+
+
+class BackupProcessor:
+    """Обработчик бэкапов."""
+
+    def __init__(self) -> None:
+        self.db_path = BACKUP_DATABASE_CONFIG["backups_db"]
+        self.processed_files: set[str] = set()
+        # Буфер отложенных записей потока (см. parse_email_for_batch)
+        self._local = threading.local()
+        self.init_database()
 
-            conn.commit()
+    def init_database(self) -> None:
+        """Инициализация базы данных."""
+        try:
+            conn = get_database(self.db_path).connect()
+            create_schema(conn)
             conn.close()
             logger.info("База данных бэкапов инициализирована")
 
@@ -439,82 +590,110 @@ class BackupProcessor:
 
     def process_new_emails(self) -> int:
         """Обрабатывает новые письма из директории new."""
-        maildir_new = MAILDIR_NEW
-        maildir_cur = MAILDIR_CUR
+        from modules.mail_ingest import MailIngestPipeline
 
-        if not maildir_new.exists():
-            logger.error(f"Директория не существует: {maildir_new}")
+        if not MAILDIR_NEW.exists():
+            logger.error(f"Директория не существует: {MAILDIR_NEW}")
             return 0
 
-        processed_count = 0
-        for file_path in maildir_new.iterdir():
-            if not file_path.is_file():
-                continue
+        return MailIngestPipeline(self).run_once()
 
-            logger.info(f"🔍 Обнаружено новое письмо: {file_path.name}")
+    def _write(self, statements: list[tuple[str, tuple]], message: str, *args) -> None:
+        """
+        Записывает строки в БД и логирует сообщение об успешной записи
 
-            result = self.parse_email_file(file_path)
-
-            if result:
-                try:
-                    new_path = maildir_cur / file_path.name
-                    shutil.move(str(file_path), str(new_path))
-                    logger.info(f"✅ Письмо перемещено в cur: {file_path.name}")
-                    self.processed_files.add(str(new_path))
-                except Exception as exc:
-                    logger.error(f"❌ Ошибка перемещения письма: {exc}")
-                    self.processed_files.add(str(file_path))
+        Внутри parse_email_for_batch записи не выполняются, а накапливаются
+        для пакетной фиксации писателем конвейера. Сообщение в этом случае
+        логирует писатель после фиксации пакета.
+        """
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.extend(statements)
+            self._local.messages.append((message, args))
+            return
 
-                processed_count += 1
-            else:
-                logger.warning(f"⚠️ Не удалось обработать письмо: {file_path.name}")
-                try:
-                    new_path = maildir_cur / file_path.name
-                    shutil.move(str(file_path), str(new_path))
-                    self.processed_files.add(str(new_path))
-                except Exception as exc:
-                    logger.error(f"❌ Ошибка перемещения непрочитанного письма: {exc}")
+        with get_database(self.db_path).transaction() as conn:
+            for sql, params in statements:
+                conn.execute(sql, params)
+        logger.info(message, *args)
 
-        return processed_count
+    def parse_email_for_batch(
+        self,
+        file_path: Path,
+    ) -> tuple[dict | None, list[tuple[str, tuple]], list[tuple[str, tuple]]]:
+        """
+        Разбирает письмо без записи в БД
+
+        Returns:
+            tuple: (результат parse_email_file, отложенные записи,
+                    сообщения для лога после фиксации записей)
+        """
+        self._local.pending = []
+        self._local.messages = []
+        try:
+            result = self.parse_email_file(file_path)
+            return result, self._local.pending, self._local.messages
+        finally:
+            self._local.pending = None
+            self._local.messages = None
 
-    def parse_database_backup(self, subject: str, body: str) -> dict | None:
+    def parse_database_backup(
+        self,
+        subject: str,
+        body: str,
+        subject_match: SubjectMatch | None = None,
+    ) -> dict | None:
         """Парсит бэкапы баз данных из темы письма."""
         try:
             logger.info(f"🎯 Парсим бэкап БД: '{subject}'")
             backup_info: dict = {}
 
             subject_lower = subject.lower()
-
-            patterns = get_database_patterns_from_config()
-            fallback_patterns = {
-                "barnaul": [
-                    r"cobian\s+brn\s+backup\s+([\w.-]+),\s*errors[:=]\s*([\w\d]+)?",
-                ],
-                "client": [
-                    r"rubicon-1c\s+([\w.-]+)\s+dump\s+complete",
-                    r"backup\s+1c7\.7\s+([\w.-]+)\s+ok",
-                ],
-            }
+            if subject_match is None:
+                subject_match = mail_rule_engine.get().classify(subject)
 
             def parse_error_count(raw_value: str | None) -> int:
                 if not raw_value:
                     return 0
-                digits = re.findall(r"\d+", raw_value)
+                digits = _ERROR_COUNT_RE.findall(raw_value)
                 return int(digits[0]) if digits else 0
 
-            for pattern in patterns.get("company", []):
-                match = re.search(pattern, subject_lower, re.IGNORECASE)
-                if match:
-                    db_name = match.group(1).strip() if match.groups() else "unknown"
-                    logger.info(
-                        "✅ Найден бэкап company_database: '%s' по паттерну: %s",
-                        db_name,
-                        pattern,
-                    )
+            found = subject_match.find("database:company")
+            if found:
+                rule, match = found
+                db_name = match.group(1).strip() if match.groups() else "unknown"
+                logger.info(
+                    "✅ Найден бэкап company_database: '%s' по паттерну: %s",
+                    db_name,
+                    rule.pattern,
+                )
 
-                    company_dbs = DATABASE_BACKUP_CONFIG.get("company_databases", {})
-                    display_name = company_dbs.get(db_name, db_name)
+                company_dbs = DATABASE_BACKUP_CONFIG.get("company_databases", {})
+                display_name = company_dbs.get(db_name, db_name)
+
+                backup_info = {
+                    "host_name": "sr-bup",
+                    "backup_status": "success",
+                    "task_type": "database_dump",
+                    "database_name": db_name,
+                    "database_display_name": display_name,
+                    "backup_type": "company_database",
+                }
+                return backup_info
+
+            found = subject_match.find("database:client")
+            if found:
+                rule, match = found
+                db_name = match.group(1).strip() if match.groups() else "unknown"
+                logger.info(
+                    "✅ Найден бэкап client: '%s' по паттерну: %s",
+                    db_name,
+                    rule.pattern,
+                )
 
+                company_dbs = DATABASE_BACKUP_CONFIG.get("company_databases", {})
+                if db_name in company_dbs:
+                    display_name = company_dbs.get(db_name, db_name)
                     backup_info = {
                         "host_name": "sr-bup",
                         "backup_status": "success",
@@ -525,92 +704,67 @@ class BackupProcessor:
                     }
                     return backup_info
 
-            client_patterns = patterns.get("client", []) + fallback_patterns["client"]
-            for pattern in client_patterns:
-                match = re.search(pattern, subject_lower, re.IGNORECASE)
-                if match:
-                    db_name = match.group(1).strip() if match.groups() else "unknown"
-                    logger.info(
-                        "✅ Найден бэкап client: '%s' по паттерну: %s",
-                        db_name,
-                        pattern,
-                    )
-
-                    company_dbs = DATABASE_BACKUP_CONFIG.get("company_databases", {})
-                    if db_name in company_dbs:
-                        display_name = company_dbs.get(db_name, db_name)
-                        backup_info = {
-                            "host_name": "sr-bup",
-                            "backup_status": "success",
-                            "task_type": "database_dump",
-                            "database_name": db_name,
-                            "database_display_name": display_name,
-                            "backup_type": "company_database",
-                        }
-                        return backup_info
-
-                    client_dbs = DATABASE_BACKUP_CONFIG.get("client_databases", {})
-                    display_name = client_dbs.get(db_name, db_name)
+                client_dbs = DATABASE_BACKUP_CONFIG.get("client_databases", {})
+                display_name = client_dbs.get(db_name, db_name)
 
-                    backup_info = {
-                        "host_name": "kc-1c" if "kc-1c" in subject_lower else "rubicon-1c",
-                        "backup_status": "success",
-                        "task_type": "client_database_dump",
-                        "database_name": db_name,
-                        "database_display_name": display_name,
-                        "backup_type": "client",
-                    }
-                    return backup_info
-
-            barnaul_patterns = patterns.get("barnaul", []) + fallback_patterns["barnaul"]
-            for pattern in barnaul_patterns:
-                match = re.search(pattern, subject_lower, re.IGNORECASE)
-                if match:
-                    db_name = match.group(1).strip() if match.groups() else "unknown"
-                    error_value = match.group(2) if match.groups() and len(match.groups()) > 1 else None
-                    error_count = parse_error_count(error_value)
-                    logger.info(
-                        "✅ Найден бэкап barnaul: '%s' по паттерну: %s",
-                        db_name,
-                        pattern,
-                    )
-
-                    barnaul_dbs = DATABASE_BACKUP_CONFIG.get("barnaul_backups", {})
-                    display_name = barnaul_dbs.get(db_name, db_name)
+                backup_info = {
+                    "host_name": "kc-1c" if "kc-1c" in subject_lower else "rubicon-1c",
+                    "backup_status": "success",
+                    "task_type": "client_database_dump",
+                    "database_name": db_name,
+                    "database_display_name": display_name,
+                    "backup_type": "client",
+                }
+                return backup_info
+
+            found = subject_match.find("database:barnaul")
+            if found:
+                rule, match = found
+                db_name = match.group(1).strip() if match.groups() else "unknown"
+                error_value = match.group(2) if match.groups() and len(match.groups()) > 1 else None
+                error_count = parse_error_count(error_value)
+                logger.info(
+                    "✅ Найден бэкап barnaul: '%s' по паттерну: %s",
+                    db_name,
+                    rule.pattern,
+                )
 
-                    backup_info = {
-                        "host_name": "brn-backup",
-                        "backup_status": "success" if error_count == 0 else "failed",
-                        "task_type": "cobian_backup",
-                        "database_name": db_name,
-                        "database_display_name": display_name,
-                        "error_count": error_count,
-                        "backup_type": "barnaul",
-                    }
-                    return backup_info
+                barnaul_dbs = DATABASE_BACKUP_CONFIG.get("barnaul_backups", {})
+                display_name = barnaul_dbs.get(db_name, db_name)
+
+                backup_info = {
+                    "host_name": "brn-backup",
+                    "backup_status": "success" if error_count == 0 else "failed",
+                    "task_type": "cobian_backup",
+                    "database_name": db_name,
+                    "database_display_name": display_name,
+                    "error_count": error_count,
+                    "backup_type": "barnaul",
+                }
+                return backup_info
 
-            for pattern in patterns.get("yandex", []):
-                match = re.search(pattern, subject_lower, re.IGNORECASE)
-                if match:
-                    db_name = match.group(1).strip().upper() if match.groups() else "UNKNOWN"
-                    logger.info(
-                        "✅ Найден бэкап yandex: '%s' по паттерну: %s",
-                        db_name,
-                        pattern,
-                    )
+            found = subject_match.find("database:yandex")
+            if found:
+                rule, match = found
+                db_name = match.group(1).strip().upper() if match.groups() else "UNKNOWN"
+                logger.info(
+                    "✅ Найден бэкап yandex: '%s' по паттерну: %s",
+                    db_name,
+                    rule.pattern,
+                )
 
-                    yandex_dbs = DATABASE_BACKUP_CONFIG.get("yandex_backups", {})
-                    display_name = yandex_dbs.get(db_name, db_name)
+                yandex_dbs = DATABASE_BACKUP_CONFIG.get("yandex_backups", {})
+                display_name = yandex_dbs.get(db_name, db_name)
 
-                    backup_info = {
-                        "host_name": "yandex-backup",
-                        "backup_status": "success",
-                        "task_type": "yandex_backup",
-                        "database_name": db_name,
-                        "database_display_name": display_name,
-                        "backup_type": "yandex",
-                    }
-                    return backup_info
+                backup_info = {
+                    "host_name": "yandex-backup",
+                    "backup_status": "success",
+                    "task_type": "yandex_backup",
+                    "database_name": db_name,
+                    "database_display_name": display_name,
+                    "backup_type": "yandex",
+                }
+                return backup_info
 
             logger.info(f"❌ Ни один паттерн не подошел для темы: '{subject}'")
             return None
@@ -625,34 +779,14 @@ class BackupProcessor:
     def save_database_backup(self, backup_info: dict, subject: str, email_date: datetime | None = None) -> None:
         """Сохраняет информацию о бэкапе базы данных, игнорируя дубликаты."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS database_backups (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    host_name TEXT NOT NULL,
-                    database_name TEXT NOT NULL,
-                    database_display_name TEXT,
-                    backup_status TEXT NOT NULL,
-                    backup_type TEXT,
-                    task_type TEXT,
-                    error_count INTEGER DEFAULT 0,
-                    email_subject TEXT,
-                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(host_name, database_name, received_at)
-                )
-            """
-            )
-
+            statements: list[tuple[str, tuple]] = []
             received_at = (
                 email_date.strftime("%Y-%m-%d %H:%M:%S")
                 if email_date
                 else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             )
 
-            cursor.execute(
+            statements.append((
                 """
                 INSERT OR IGNORE INTO database_backups
                 (host_name, database_name, database_display_name, backup_status, backup_type,
@@ -670,10 +804,20 @@ class BackupProcessor:
                     subject[:500],
                     received_at,
                 ),
-            )
+            ))
+            statements.append((
+                DATABASE_LATEST_UPSERT,
+                (
+                    backup_info.get("backup_type"),
+                    backup_info["database_name"],
+                    backup_info["backup_status"],
+                    backup_info.get("error_count", 0),
+                    received_at,
+                ),
+            ))
 
-            conn.commit()
-            logger.info(
+            self._write(
+                statements,
                 "✅ Сохранен бэкап БД: %s - %s",
                 backup_info["database_display_name"],
                 backup_info["backup_status"],
@@ -681,31 +825,31 @@ class BackupProcessor:
 
         except Exception as exc:
             logger.error(f"❌ Ошибка сохранения бэкапа БД в БД: {exc}")
-        finally:
-            if "conn" in locals():
-                conn.close()
 
-    def parse_zfs_status(self, subject: str) -> list[dict] | None:
+    def parse_zfs_status(
+        self,
+        subject: str,
+        subject_match: SubjectMatch | None = None,
+    ) -> list[dict] | None:
         """Парсит статусы ZFS массивов из темы письма."""
         if not extension_manager.is_extension_enabled("zfs_monitor"):
             return None
 
-        patterns = get_zfs_patterns_from_config()
-        if not patterns:
+        rules = mail_rule_engine.get()
+        if not rules.by_category["zfs"]:
             logger.info("⚠️ Паттерны ZFS не настроены")
             return None
+        if subject_match is None:
+            subject_match = rules.classify(subject)
 
         matched_server = None
-        for pattern in patterns:
-            match = re.search(pattern, subject, re.IGNORECASE)
-            if not match:
-                continue
-
+        found = subject_match.find("zfs")
+        if found:
+            _, match = found
             if match.groupdict().get("server"):
                 matched_server = match.group("server")
             elif match.groups():
                 matched_server = match.group(1)
-            break
 
         if not matched_server:
             return None
@@ -758,9 +902,7 @@ class BackupProcessor:
     ) -> None:
         """Сохраняет статусы ZFS массивов в БД."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
+            statements: list[tuple[str, tuple]] = []
             received_at = (
                 email_date.strftime("%Y-%m-%d %H:%M:%S")
                 if email_date
@@ -768,7 +910,7 @@ class BackupProcessor:
             )
 
             for entry in entries:
-                cursor.execute(
+                statements.append((
                     """
                     INSERT OR IGNORE INTO zfs_pool_status
                     (server_name, pool_name, pool_index, pool_state, email_subject, received_at)
@@ -782,10 +924,14 @@ class BackupProcessor:
                         subject[:500],
                         received_at,
                     ),
-                )
-
-            conn.commit()
-            logger.info(
+                ))
+                statements.append((
+                    ZFS_LATEST_UPSERT,
+                    (entry["server_name"], entry["pool_name"], entry["pool_state"], received_at),
+                ))
+
+            self._write(
+                statements,
                 "✅ Сохранены статусы ZFS: %s (%s шт.)",
                 entries[0]["server_name"] if entries else "unknown",
                 len(entries),
@@ -793,32 +939,23 @@ class BackupProcessor:
 
         except Exception as exc:
             logger.error(f"❌ Ошибка сохранения ZFS статуса в БД: {exc}")
-        finally:
-            if "conn" in locals():
-                conn.close()
 
-    def parse_mail_backup(self, subject: str) -> dict | None:
+    def parse_mail_backup(
+        self,
+        subject: str,
+        subject_match: SubjectMatch | None = None,
+    ) -> dict | None:
         """Парсит результат бэкапа почтового сервера из темы письма."""
         if not extension_manager.is_extension_enabled("mail_backup_monitor"):
             return None
 
-        default_pattern = (
-            r"^\s*бэкап\s+zimbra\s*-\s*"
-            r"(?P<size>\d+(?:[.,]\d+)?\s*[TGMK]?(?:i?B)?)\s+"
-            r"(?P<path>/\S+)\s*$"
-        )
-        patterns = get_mail_patterns_from_config()
-        if not patterns:
-            patterns = [default_pattern]
-
-        match = None
-        for pattern in patterns:
-            match = re.search(pattern, subject, re.IGNORECASE)
-            if match:
-                break
+        if subject_match is None:
+            subject_match = mail_rule_engine.get().classify(subject)
 
-        if not match:
+        found = subject_match.find("mail")
+        if not found:
             return None
+        _, match = found
 
         match_groups = match.groupdict()
         size = match_groups.get("size")
@@ -848,16 +985,14 @@ class BackupProcessor:
     ) -> None:
         """Сохраняет результат бэкапа почтового сервера."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
+            statements: list[tuple[str, tuple]] = []
             received_at = (
                 email_date.strftime("%Y-%m-%d %H:%M:%S")
                 if email_date
                 else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             )
 
-            cursor.execute(
+            statements.append((
                 """
                 INSERT OR IGNORE INTO mail_server_backups
                 (host_name, backup_status, total_size, backup_path, email_subject, received_at)
@@ -871,10 +1006,10 @@ class BackupProcessor:
                     subject[:500],
                     received_at,
                 ),
-            )
+            ))
 
-            conn.commit()
-            logger.info(
+            self._write(
+                statements,
                 "✅ Сохранен бэкап почтового сервера: %s (%s)",
                 backup_info.get("total_size") or "неизвестно",
                 backup_info.get("backup_path") or "без пути",
@@ -882,42 +1017,13 @@ class BackupProcessor:
 
         except Exception as exc:
             logger.error(f"❌ Ошибка сохранения бэкапа почтового сервера: {exc}")
-        finally:
-            if "conn" in locals():
-                conn.close()
-
-    def _match_subject_patterns(self, subject: str, patterns: list[str]) -> bool:
-        """Проверяет тему письма по списку паттернов."""
-        normalized_subject = re.sub(r"\s+", " ", subject).strip()
-        for pattern in patterns:
-            try:
-                if re.search(pattern, subject, re.IGNORECASE):
-                    return True
-                if normalized_subject != subject and re.search(pattern, normalized_subject, re.IGNORECASE):
-                    return True
-            except re.error as exc:
-                logger.warning("⚠️ Некорректный паттерн '%s': %s", pattern, exc)
-        return False
-
-    def _decode_attachment_payload(self, payload: bytes | None) -> str:
-        """Пытается декодировать содержимое вложения."""
-        if not payload:
-            return ""
-
-        for encoding in ("utf-8", "cp1251", "windows-1251", "latin-1"):
-            try:
-                return payload.decode(encoding)
-            except UnicodeDecodeError:
-                continue
-
-        return payload.decode("utf-8", errors="ignore")
 
     def _extract_matching_attachments(
         self,
         msg,
-        filename_patterns: list[str],
+        filename_regexes: list[re.Pattern],
     ) -> list[dict]:
-        """Возвращает список вложений, подходящих под паттерны имени файла."""
+        """Возвращает список вложений, подходящих под паттерны имени файла (без декодирования)."""
         matched: list[dict] = []
         if not msg.is_multipart():
             return matched
@@ -926,114 +1032,72 @@ class BackupProcessor:
             filename = part.get_filename()
             if not filename:
                 continue
-            if filename_patterns and not self._match_subject_patterns(
-                filename,
-                filename_patterns,
-            ):
+            if filename_regexes and not match_any(filename_regexes, filename):
                 continue
 
-            payload = part.get_payload(decode=True)
-            content = self._decode_attachment_payload(payload)
             matched.append(
                 {
                     "filename": filename,
-                    "content": content,
+                    "part": part,
                 }
             )
 
         return matched
 
-    def _match_stock_load_source(self, subject: str, patterns: dict[str, list[str]]) -> str:
-        """Определяет источник отчёта по теме письма."""
-        sources = patterns.get("sources", [])
-        if isinstance(sources, list):
-            for source in sources:
-                if not isinstance(source, dict):
-                    continue
-                name = str(source.get("name") or "").strip()
-                if not name:
-                    continue
-                subject_patterns = source.get("subject", [])
-                if not isinstance(subject_patterns, list):
-                    continue
-                if self._match_subject_patterns(subject, subject_patterns):
-                    return name
-        return "Основное предприятие"
-
     def parse_stock_load_log(
         self,
         content: str,
         patterns: dict[str, list[str]],
+        compiled: dict[str, list[re.Pattern]] | None = None,
     ) -> list[dict]:
         """Парсит содержимое лога загрузки остатков."""
-        file_entry_patterns = patterns.get("file_entry", [])
-        success_patterns = patterns.get("success", [])
-        failure_patterns = patterns.get("failure", [])
-        ignore_patterns = patterns.get("ignore", [])
-
-        default_file_entry = (
-            r"^\d{2}\.\d{2}\.\d{2}\s+\d{2}:\d{2}:\d{2}:\s+"
-            r"(?P<supplier>.+?)\s{2,}(?P<path>(?:[A-Za-z]:\\|\\\\[^\\]+\\).+)$"
-        )
-        if default_file_entry not in file_entry_patterns:
-            file_entry_patterns = [*file_entry_patterns, default_file_entry]
+        return list(self.iter_stock_load_entries(io.StringIO(content), patterns, compiled))
 
-        file_entry_regexes = [re.compile(pat, re.IGNORECASE) for pat in file_entry_patterns]
-        success_regexes = [re.compile(pat, re.IGNORECASE) for pat in success_patterns]
-        failure_regexes = [re.compile(pat, re.IGNORECASE) for pat in failure_patterns]
-        ignore_regexes = [re.compile(pat, re.IGNORECASE) for pat in ignore_patterns]
-
-        entries: list[dict] = []
-        current: dict | None = None
-        fallback_entry = {
-            "supplier_name": "неизвестно",
-            "file_path": None,
-            "rows_count": None,
-            "errors": [],
-            "has_success": False,
-            "has_failure": False,
-            "log_timestamp": None,
-        }
-
-        def finalize_current() -> None:
-            nonlocal current
-            if not current:
-                return
-
-            has_success = current.get("has_success", False)
-            has_failure = current.get("has_failure", False)
-            if has_success and has_failure:
-                status = "warning"
-            elif has_success:
-                status = "success"
-            elif has_failure:
-                status = "failed"
-            else:
-                status = "unknown"
+    def iter_stock_load_entries(
+        self,
+        lines: Iterable[str],
+        patterns: dict[str, list[str]],
+        compiled: dict[str, list[re.Pattern]] | None = None,
+    ) -> Iterator[dict]:
+        """
+        Потоково разбирает лог загрузки остатков
+
+        Запись поставщика выдается, как только начинается следующая,
+        поэтому объем памяти не зависит от размера лога.
+
+        Args:
+            lines: Строки лога (файл, поток вложения или список)
+            patterns: Исходные паттерны остатков
+            compiled: Скомпилированные паттерны (если уже есть)
+        """
+        if compiled is None:
+            file_entry_patterns = patterns.get("file_entry", [])
+            if STOCK_FILE_ENTRY_DEFAULT_PATTERN not in file_entry_patterns:
+                patterns = {
+                    **patterns,
+                    "file_entry": [*file_entry_patterns, STOCK_FILE_ENTRY_DEFAULT_PATTERN],
+                }
+            compiled = compile_stock_patterns(patterns)
 
-            current["status"] = status
-            current["error_count"] = len(current.get("errors", []))
-            if current.get("errors"):
-                current["error_sample"] = current["errors"][0][:500]
-            else:
-                current["error_sample"] = None
+        file_entry_regexes = compiled["file_entry"]
+        success_regexes = compiled["success"]
+        failure_regexes = compiled["failure"]
+        ignore_regexes = compiled["ignore"]
 
-            entries.append(current)
-            current = None
+        current: dict | None = None
+        emitted = False
+        fallback_entry = _new_stock_entry("неизвестно", None, None)
 
-        for raw_line in content.splitlines():
+        for raw_line in lines:
             line = raw_line.strip()
             if not line:
                 continue
 
-            file_match = None
-            for regex in file_entry_regexes:
-                file_match = regex.search(line)
-                if file_match:
-                    break
-
+            file_match = _first_match(file_entry_regexes, line)
             if file_match:
-                finalize_current()
+                if current:
+                    yield _finalize_stock_entry(current)
+                    emitted = True
 
                 supplier = None
                 path = None
@@ -1049,97 +1113,24 @@ class BackupProcessor:
                 supplier = " ".join((supplier or "").split()) or "неизвестно"
                 path = path.strip() if isinstance(path, str) else None
 
-                timestamp_match = re.match(
-                    r"^(\d{2}\.\d{2}\.\d{2}\s+\d{2}:\d{2}:\d{2})",
-                    line,
-                )
+                timestamp_match = _LOG_TIMESTAMP_RE.match(line)
                 log_timestamp = timestamp_match.group(1) if timestamp_match else None
 
-                current = {
-                    "supplier_name": supplier,
-                    "file_path": path,
-                    "rows_count": None,
-                    "errors": [],
-                    "has_success": False,
-                    "has_failure": False,
-                    "log_timestamp": log_timestamp,
-                }
+                current = _new_stock_entry(supplier, path, log_timestamp)
                 continue
 
-            if not current:
-                ignored = False
-                for regex in ignore_regexes:
-                    if regex.search(line):
-                        ignored = True
-                        break
-                if ignored:
-                    continue
-
-                success_match = None
-                for regex in success_regexes:
-                    success_match = regex.search(line)
-                    if success_match:
-                        break
-
-                if success_match:
-                    fallback_entry["has_success"] = True
-                    if fallback_entry["log_timestamp"] is None:
-                        timestamp_match = re.match(
-                            r"^(\d{2}\.\d{2}\.\d{2}\s+\d{2}:\d{2}:\d{2})",
-                            line,
-                        )
-                        fallback_entry["log_timestamp"] = (
-                            timestamp_match.group(1) if timestamp_match else None
-                        )
-                    rows_value = None
-                    match_groups = success_match.groupdict()
-                    if match_groups:
-                        rows_value = match_groups.get("rows")
-                    if rows_value is None and success_match.lastindex:
-                        rows_value = success_match.group(1)
-                    try:
-                        fallback_entry["rows_count"] = (
-                            int(str(rows_value)) if rows_value else None
-                        )
-                    except ValueError:
-                        fallback_entry["rows_count"] = None
-                    continue
-
-                failure_match = None
-                for regex in failure_regexes:
-                    failure_match = regex.search(line)
-                    if failure_match:
-                        break
-
-                if failure_match:
-                    fallback_entry["has_failure"] = True
-                    if fallback_entry["log_timestamp"] is None:
-                        timestamp_match = re.match(
-                            r"^(\d{2}\.\d{2}\.\d{2}\s+\d{2}:\d{2}:\d{2})",
-                            line,
-                        )
-                        fallback_entry["log_timestamp"] = (
-                            timestamp_match.group(1) if timestamp_match else None
-                        )
-                    fallback_entry["errors"].append(line)
-                continue
+            # Строки до первого файла относятся к общей записи
+            target = current if current else fallback_entry
 
-            ignored = False
-            for regex in ignore_regexes:
-                if regex.search(line):
-                    ignored = True
-                    break
-            if ignored:
+            if _first_match(ignore_regexes, line):
                 continue
 
-            success_match = None
-            for regex in success_regexes:
-                success_match = regex.search(line)
-                if success_match:
-                    break
-
+            success_match = _first_match(success_regexes, line)
             if success_match:
-                current["has_success"] = True
+                target["has_success"] = True
+                if current is None and target["log_timestamp"] is None:
+                    timestamp_match = _LOG_TIMESTAMP_RE.match(line)
+                    target["log_timestamp"] = timestamp_match.group(1) if timestamp_match else None
                 rows_value = None
                 match_groups = success_match.groupdict()
                 if match_groups:
@@ -1147,46 +1138,26 @@ class BackupProcessor:
                 if rows_value is None and success_match.lastindex:
                     rows_value = success_match.group(1)
                 try:
-                    current["rows_count"] = int(str(rows_value)) if rows_value else None
+                    target["rows_count"] = int(str(rows_value)) if rows_value else None
                 except ValueError:
-                    current["rows_count"] = None
+                    target["rows_count"] = None
                 continue
 
-            failure_match = None
-            for regex in failure_regexes:
-                failure_match = regex.search(line)
-                if failure_match:
-                    break
+            if _first_match(failure_regexes, line):
+                target["has_failure"] = True
+                if current is None and target["log_timestamp"] is None:
+                    timestamp_match = _LOG_TIMESTAMP_RE.match(line)
+                    target["log_timestamp"] = timestamp_match.group(1) if timestamp_match else None
+                target["error_count"] += 1
+                if len(target["errors"]) < STOCK_LOAD_ERROR_LINES_KEPT:
+                    target["errors"].append(line)
 
-            if failure_match:
-                current["has_failure"] = True
-                current["errors"].append(line)
-                continue
+        if current:
+            yield _finalize_stock_entry(current)
+            emitted = True
 
-        finalize_current()
-
-        if not entries and (fallback_entry["has_success"] or fallback_entry["has_failure"]):
-            has_success = fallback_entry.get("has_success", False)
-            has_failure = fallback_entry.get("has_failure", False)
-            if has_success and has_failure:
-                status = "warning"
-            elif has_success:
-                status = "success"
-            elif has_failure:
-                status = "failed"
-            else:
-                status = "unknown"
-
-            fallback_entry["status"] = status
-            fallback_entry["error_count"] = len(fallback_entry.get("errors", []))
-            if fallback_entry.get("errors"):
-                fallback_entry["error_sample"] = fallback_entry["errors"][0][:500]
-            else:
-                fallback_entry["error_sample"] = None
-
-            entries.append(fallback_entry)
-
-        return entries
+        if not emitted and (fallback_entry["has_success"] or fallback_entry["has_failure"]):
+            yield _finalize_stock_entry(fallback_entry)
 
     def save_stock_load_entries(
         self,
@@ -1201,9 +1172,7 @@ class BackupProcessor:
             return
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
+            statements: list[tuple[str, tuple]] = []
             received_at = (
                 email_date.strftime("%Y-%m-%d %H:%M:%S")
                 if email_date
@@ -1214,7 +1183,7 @@ class BackupProcessor:
                 supplier_name = entry.get("supplier_name")
                 if not supplier_name or supplier_name == "неизвестно":
                     supplier_name = source_name or "неизвестно"
-                cursor.execute(
+                statements.append((
                     """
                     INSERT OR IGNORE INTO stock_load_results
                     (supplier_name, source_name, file_path, status, rows_count, error_count, error_sample,
@@ -1234,62 +1203,49 @@ class BackupProcessor:
                         subject[:500],
                         received_at,
                     ),
-                )
+                ))
 
-            conn.commit()
-            logger.info("✅ Сохранены результаты загрузки остатков: %s", len(entries))
+            self._write(statements, "✅ Сохранены результаты загрузки остатков: %s", len(entries))
 
         except Exception as exc:
             logger.error(f"❌ Ошибка сохранения остатков в БД: {exc}")
-        finally:
-            if "conn" in locals():
-                conn.close()
 
     def parse_stock_load_email(
         self,
         subject: str,
         msg,
         email_date: datetime | None,
+        subject_match: SubjectMatch | None = None,
     ) -> dict | None:
         """Парсит письмо с логами загрузки остатков."""
         if not extension_manager.is_extension_enabled("stock_load_monitor"):
             return None
 
-        patterns = get_stock_load_patterns_from_config()
-        subject_patterns = patterns.get("subject", [])
-        sources = patterns.get("sources", [])
+        rules = mail_rule_engine.get()
+        if subject_match is None:
+            subject_match = rules.classify(subject)
+
         matches_subject = (
-            self._match_subject_patterns(subject, subject_patterns)
-            if subject_patterns
+            subject_match.matches("stock")
+            if rules.by_category["stock"]
             else True
         )
-        matches_source = False
-        if isinstance(sources, list) and sources:
-            for source in sources:
-                if not isinstance(source, dict):
-                    continue
-                source_subject = source.get("subject", [])
-                if not isinstance(source_subject, list):
-                    continue
-                if self._match_subject_patterns(subject, source_subject):
-                    matches_source = True
-                    break
+        source = subject_match.find("stock_source")
 
-        if not matches_subject and not matches_source:
+        if not matches_subject and not source:
             return None
 
-        source_name = self._match_stock_load_source(subject, patterns)
+        source_name = source[0].name if source else "Основное предприятие"
 
-        attachment_patterns = patterns.get("attachment", [])
-        attachments = self._extract_matching_attachments(msg, attachment_patterns)
+        attachments = self._extract_matching_attachments(msg, rules.stock["attachment"])
         if not attachments:
             logger.warning("⚠️ Лог остатков не найден во вложениях письма: %s", subject)
             return None
 
         all_entries: list[dict] = []
         for attachment in attachments:
-            content = attachment.get("content", "")
-            entries = self.parse_stock_load_log(content, patterns)
+            with open_attachment_lines(attachment["part"]) as lines:
+                entries = list(self.iter_stock_load_entries(lines, rules.stock_raw, rules.stock))
             self.save_stock_load_entries(
                 entries,
                 subject,
@@ -1349,7 +1305,14 @@ class BackupProcessor:
                 logger.warning("❌ Дата письма отсутствует, используем текущее время")
                 email_date = datetime.now()
 
-            db_backup_info = self.parse_database_backup(subject, self.get_email_body(msg))
+            # Тема классифицируется один раз для всех категорий
+            subject_match = mail_rule_engine.get().classify(subject)
+
+            db_backup_info = self.parse_database_backup(
+                subject,
+                self.get_email_body(msg),
+                subject_match,
+            )
             if db_backup_info:
                 logger.info(
                     "📊 Обнаружен бэкап базы данных: %s",
@@ -1358,21 +1321,21 @@ class BackupProcessor:
                 self.save_database_backup(db_backup_info, subject, email_date)
                 return db_backup_info
 
-            zfs_entries = self.parse_zfs_status(subject)
+            zfs_entries = self.parse_zfs_status(subject, subject_match)
             if zfs_entries:
                 self.save_zfs_status(zfs_entries, subject, email_date)
                 return {"zfs_entries": zfs_entries}
 
-            mail_backup_info = self.parse_mail_backup(subject)
+            mail_backup_info = self.parse_mail_backup(subject, subject_match)
             if mail_backup_info:
                 self.save_mail_backup(mail_backup_info, subject, email_date)
                 return mail_backup_info
 
-            stock_load_info = self.parse_stock_load_email(subject, msg, email_date)
+            stock_load_info = self.parse_stock_load_email(subject, msg, email_date, subject_match)
             if stock_load_info:
                 return stock_load_info
 
-            if not self.is_proxmox_backup_email(subject):
+            if not subject_match.matches("proxmox"):
                 logger.info(
                     "Пропускаем не-Proxmox/БД/ZFS/почта/остатки письмо: %s...",
                     subject[:50],
@@ -1398,15 +1361,7 @@ class BackupProcessor:
     def is_proxmox_backup_email(self, subject: str) -> bool:
         """Проверяет, является ли письмо отчетом о бэкапе Proxmox."""
         subject_lower = subject.lower()
-        return any(
-            keyword in subject_lower
-            for keyword in [
-                "vzdump backup status",
-                "proxmox backup",
-                "backup successful",
-                "backup failed",
-            ]
-        )
+        return any(keyword in subject_lower for keyword in PROXMOX_SUBJECT_KEYWORDS)
 
     def parse_subject(self, subject: str) -> dict | None:
         """Парсит тему письма."""
@@ -1635,16 +1590,14 @@ class BackupProcessor:
     def save_backup_report(self, backup_info: dict, subject: str, email_date: datetime | None = None) -> None:
         """Сохраняет отчет в базу с корректным временем, игнорируя дубликаты."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
+            statements: list[tuple[str, tuple]] = []
             received_at = (
                 email_date.strftime("%Y-%m-%d %H:%M:%S")
                 if email_date
                 else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             )
 
-            cursor.execute(
+            statements.append((
                 """
                 INSERT OR IGNORE INTO proxmox_backups
                 (host_name, backup_status, task_type, duration, total_size, error_message,
@@ -1661,10 +1614,14 @@ class BackupProcessor:
                     subject[:500],
                     received_at,
                 ),
-            )
-
-            conn.commit()
-            logger.info(
+            ))
+            statements.append((
+                PROXMOX_LATEST_UPSERT,
+                (backup_info["host_name"], backup_info["backup_status"], received_at),
+            ))
+
+            self._write(
+                statements,
                 "✅ Сохранен бэкап: %s - %s",
                 backup_info["host_name"],
                 backup_info["backup_status"],
@@ -1672,9 +1629,6 @@ class BackupProcessor:
 
         except Exception as exc:
             logger.error(f"❌ Ошибка сохранения в БД: {exc}")
-        finally:
-            if "conn" in locals():
-                conn.close()
 
 
 def run_mail_monitor() -> int:
@@ -1690,24 +1644,19 @@ def run_mail_monitor() -> int:
 
 def main() -> None:
     """Основная функция."""
+    from modules.backup_retention import backup_retention
+    from modules.mail_ingest import MailIngestPipeline
+
     logger.info("🔄 Запуск исправленного мониторинга почты Proxmox бэкапов...")
 
     try:
         processor = BackupProcessor()
 
-        logger.info("📧 Мониторинг директорий: /root/Maildir/new и /root/Maildir/cur")
-
-        while True:
-            try:
-                processed = processor.process_new_emails()
-                if processed > 0:
-                    logger.info(f"✅ Обработано новых писем: {processed}")
-
-                time.sleep(30)
+        logger.info(f"📧 Мониторинг директорий: {MAILDIR_NEW} и {MAILDIR_CUR}")
 
-            except Exception as exc:
-                logger.error(f"❌ Ошибка в основном цикле: {exc}")
-                time.sleep(60)
+        # История бэкапов пишется этим процессом, здесь же она и очищается
+        backup_retention.start_scheduler()
+        MailIngestPipeline(processor).run_forever()
 
     except Exception as exc:
         logger.error(f"💥 Критическая ошибка: {exc}")
@@ -0,0 +1,311 @@
+"""
+/modules/mail_rules.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Compiled mail classification rules
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Скомпилированные правила классификации писем
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from typing import Callable
+
+from lib.logging import debug_log, error_log
+from lib.sqlite_db import get_database
+
+# Порядок категорий темы письма = приоритет классификации
+SUBJECT_CATEGORIES = (
+    "database:company",
+    "database:client",
+    "database:barnaul",
+    "database:yandex",
+    "zfs",
+    "mail",
+    "stock",
+    "stock_source",
+    "proxmox",
+)
+
+# Категории, которые ищутся по теме в нижнем регистре (имена БД - ключи конфигурации)
+LOWERCASE_CATEGORIES = {
+    "database:company",
+    "database:client",
+    "database:barnaul",
+    "database:yandex",
+}
+
+# Категории, которые дополнительно проверяются по теме с нормализованными пробелами
+NORMALIZED_CATEGORIES = {"stock", "stock_source"}
+
+STOCK_BODY_KEYS = ("attachment", "file_entry", "success", "failure", "ignore")
+
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+_NAMED_GROUP = re.compile(r"\(\?P<[^>]+>")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_whitespace(text: str) -> str:
+    """Схлопывает пробельные символы."""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def compile_patterns(patterns: list[str]) -> list[re.Pattern]:
+    """Компилирует список паттернов, пропуская некорректные."""
+    compiled = []
+    for pattern in patterns:
+        try:
+            compiled.append(re.compile(pattern, re.IGNORECASE))
+        except re.error as exc:
+            error_log(f"⚠️ Некорректный паттерн '{pattern}': {exc}")
+    return compiled
+
+
+def match_any(regexes: list[re.Pattern], text: str) -> bool:
+    """Проверяет текст (и его вариант с нормализованными пробелами) по списку паттернов."""
+    normalized = normalize_whitespace(text)
+    for regex in regexes:
+        if regex.search(text):
+            return True
+        if normalized != text and regex.search(normalized):
+            return True
+    return False
+
+
+def compile_stock_patterns(patterns: dict) -> dict[str, list[re.Pattern]]:
+    """Компилирует паттерны разбора логов остатков."""
+    return {key: compile_patterns(patterns.get(key, [])) for key in STOCK_BODY_KEYS}
+
+
+class Rule:
+    """Правило классификации темы письма"""
+
+    __slots__ = ("index", "category", "name", "pattern", "regex")
+
+    def __init__(self, index: int, category: str, name: str | None, pattern: str, regex: re.Pattern):
+        self.index = index
+        self.category = category
+        self.name = name
+        self.pattern = pattern
+        self.regex = regex
+
+
+class SubjectMatch:
+    """Результат классификации темы: какие правила подошли"""
+
+    def __init__(self, rules: "MailRules", subject: str, hits: set[int]):
+        self.subject = subject
+        self._rules = rules
+        self._hits = hits
+        self._texts = {
+            "lower": subject.lower(),
+            "normalized": normalize_whitespace(subject),
+        }
+
+    def _texts_for(self, category: str) -> list[str]:
+        """Варианты темы, по которым проверяется категория."""
+        if category in LOWERCASE_CATEGORIES:
+            return [self._texts["lower"]]
+        if category in NORMALIZED_CATEGORIES and self._texts["normalized"] != self.subject:
+            return [self.subject, self._texts["normalized"]]
+        return [self.subject]
+
+    def find_all(self, category: str) -> list[tuple[Rule, re.Match]]:
+        """Подошедшие правила категории в порядке приоритета вместе с совпадениями."""
+        found = []
+        texts = self._texts_for(category)
+        for rule in self._rules.by_category.get(category, []):
+            if rule.index not in self._hits:
+                continue
+            for text in texts:
+                match = rule.regex.search(text)
+                if match:
+                    found.append((rule, match))
+                    break
+        return found
+
+    def find(self, category: str) -> tuple[Rule, re.Match] | None:
+        """Первое подошедшее правило категории."""
+        found = self.find_all(category)
+        return found[0] if found else None
+
+    def matches(self, category: str) -> bool:
+        """Есть ли подошедшие правила категории."""
+        return self.find(category) is not None
+
+
+class MailRules:
+    """
+    Скомпилированный набор правил
+
+    Все паттерны темы объединяются в одно выражение из необязательных
+    опережающих проверок с именованными группами r<N>: один проход
+    re.match по теме дает полный набор подошедших правил. Для извлечения
+    групп повторно выполняется только выбранное правило.
+    """
+
+    def __init__(self, raw: dict):
+        """
+        Args:
+            raw: Исходные паттерны (database, zfs, mail, stock_load, proxmox)
+        """
+        self.rules: list[Rule] = []
+        self.by_category: dict[str, list[Rule]] = {category: [] for category in SUBJECT_CATEGORIES}
+
+        database = raw.get("database", {})
+        for group in ("company", "client", "barnaul", "yandex"):
+            self._add(f"database:{group}", database.get(group, []))
+        self._add("zfs", raw.get("zfs", []))
+        self._add("mail", raw.get("mail", []))
+
+        stock = raw.get("stock_load", {})
+        self._add("stock", stock.get("subject", []))
+        for source in stock.get("sources", []):
+            name = str(source.get("name") or "").strip()
+            if name:
+                self._add("stock_source", source.get("subject", []), name=name)
+        self._add("proxmox", raw.get("proxmox", []))
+
+        self.stock = compile_stock_patterns(stock)
+        self.stock_raw = stock
+        self._always: set[int] = set()
+        self.matcher = self._build_matcher()
+
+    def _add(self, category: str, patterns: list[str], name: str | None = None) -> None:
+        """Компилирует и регистрирует правила категории."""
+        for pattern in patterns:
+            if not isinstance(pattern, str) or not pattern:
+                continue
+            try:
+                regex = re.compile(pattern, re.IGNORECASE)
+            except re.error as exc:
+                error_log(f"⚠️ Некорректный паттерн '{pattern}': {exc}")
+                continue
+            rule = Rule(len(self.rules), category, name, pattern, regex)
+            self.rules.append(rule)
+            self.by_category[category].append(rule)
+
+    def _build_matcher(self) -> re.Pattern | None:
+        """Собирает общее выражение для всех правил темы."""
+        parts = []
+        for rule in self.rules:
+            # Обратные ссылки зависят от нумерации групп - такие правила проверяются отдельно
+            if _BACKREFERENCE.search(rule.pattern):
+                self._always.add(rule.index)
+                continue
+            body = _NAMED_GROUP.sub("(?:", rule.pattern)
+            try:
+                re.compile(body, re.IGNORECASE)
+            except re.error:
+                self._always.add(rule.index)
+                continue
+            parts.append(f"(?=(?:[\\s\\S]*?(?P<r{rule.index}>{body}))?)")
+
+        if not parts:
+            return None
+        try:
+            return re.compile("".join(parts), re.IGNORECASE)
+        except re.error as exc:
+            error_log(f"⚠️ Не удалось собрать общий паттерн писем: {exc}")
+            self._always = {rule.index for rule in self.rules}
+            return None
+
+    def _scan(self, text: str) -> set[int]:
+        """Номера правил, подошедших к тексту."""
+        if self.matcher is None:
+            return set(self._always)
+        groups = self.matcher.match(text).groupdict()
+        hits = {int(name[1:]) for name, value in groups.items() if value is not None}
+        return hits | self._always
+
+    def classify(self, subject: str) -> SubjectMatch:
+        """Классифицирует тему письма за один проход общего выражения."""
+        hits = self._scan(subject)
+        normalized = normalize_whitespace(subject)
+        if normalized != subject:
+            hits |= {
+                index for index in self._scan(normalized)
+                if self.rules[index].category in NORMALIZED_CATEGORIES
+            }
+        return SubjectMatch(self, subject, hits)
+
+
+class MailRuleEngine:
+    """
+    Кэш скомпилированных правил
+
+    Правила перекомпилируются только при изменении исходных паттернов.
+    Проверка изменений - PRAGMA data_version на собственном соединении
+    с БД настроек: значение меняется только после записи в БД другим
+    соединением, поэтому на каждое письмо приходится один дешевый запрос.
+    """
+
+    def __init__(self, loader: Callable[[], dict], settings_db: str | None = None):
+        """
+        Args:
+            loader: Функция загрузки исходных паттернов
+            settings_db: Путь к БД настроек
+        """
+        self._loader = loader
+        self._settings_db = settings_db
+        self._conn: sqlite3.Connection | None = None
+        self._data_version: int | None = None
+        self._signature: str | None = None
+        self._rules: MailRules | None = None
+        self._lock = threading.Lock()
+
+    def _current_data_version(self) -> int | None:
+        """Счетчик изменений БД настроек."""
+        if not self._settings_db:
+            return None
+        try:
+            if self._conn is None:
+                # Собственное соединение: data_version считается для конкретного соединения
+                self._conn = get_database(self._settings_db).connect(read_only=True)
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as exc:
+            debug_log(f"⚠️ Не удалось проверить версию БД настроек: {exc}")
+            return None
+
+    def get(self) -> MailRules:
+        """Возвращает актуальный набор правил."""
+        with self._lock:
+            version = self._current_data_version()
+            if self._rules is not None and version is not None and version == self._data_version:
+                return self._rules
+
+            raw = self._loader()
+            signature = hashlib.sha1(
+                json.dumps(raw, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+            ).hexdigest()
+            if self._rules is None or signature != self._signature:
+                self._rules = MailRules(raw)
+                self._signature = signature
+                debug_log(f"✅ Правила писем скомпилированы: {len(self._rules.rules)} паттернов")
+            self._data_version = version
+            return self._rules
+
+    def invalidate(self) -> None:
+        """Принудительно перечитывает паттерны при следующем обращении."""
+        with self._lock:
+            self._data_version = None
+
+
+__all__ = [
+    "MailRuleEngine",
+    "MailRules",
+    "SubjectMatch",
+    "compile_patterns",
+    "compile_stock_patterns",
+    "match_any",
+    "normalize_whitespace",
+]
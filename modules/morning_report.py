@@ -14,9 +14,10 @@ Morning Report Module
 import threading
 import time
 from datetime import datetime, timedelta, timezone
-import sqlite3
 from config.db_settings import DATA_COLLECTION_TIME
 from lib.logging import debug_log
+from lib.sqlite_db import get_database
+from modules.backup_schema import ensure_schema
 
 class MorningReport:
     """Класс управления утренними отчетами"""
@@ -198,31 +199,23 @@ class MorningReport:
                 if isinstance(server_name, str)
             }
 
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
+            ensure_schema(db_path)
+            cursor = get_database(db_path).reader().cursor()
             try:
                 cursor.execute(
                     """
-                    SELECT s.server_name, s.pool_name, s.pool_state, s.received_at
-                    FROM zfs_pool_status s
-                    JOIN (
-                        SELECT server_name, pool_name, MAX(received_at) AS last_seen
-                        FROM zfs_pool_status
-                        GROUP BY server_name, pool_name
-                    ) latest
-                    ON s.server_name = latest.server_name
-                    AND s.pool_name = latest.pool_name
-                    AND s.received_at = latest.last_seen
-                    ORDER BY s.server_name, s.pool_name
+                    SELECT server_name, pool_name, pool_state, received_at
+                    FROM zfs_pool_latest
+                    ORDER BY server_name, pool_name
                     """
                 )
                 rows = cursor.fetchall()
             except Exception as exc:
-                if "no such table: zfs_pool_status" in str(exc):
+                if "no such table: zfs_pool_latest" in str(exc):
                     return "❌ Таблица ZFS ещё не создана.\n", True
                 raise
             finally:
-                conn.close()
+                cursor.close()
 
             if allowed_servers:
                 normalized_rows = []
@@ -271,30 +271,50 @@ class ResourcesChecker:
             return False, None
 
     def check_multiple_resources(self, servers, progress_callback=None):
-        """Проверка ресурсов нескольких серверов."""
-        results = []
-        total = len(servers)
-        success_count = 0
+        """Проверка ресурсов нескольких серверов (параллельно, с общим лимитом времени)."""
+        from config.db_settings import RESOURCE_WORKERS, RESOURCE_SWEEP_DEADLINE
+        from core.sweep import run_sweep, RESOURCE_TIMED_OUT
 
-        for index, server in enumerate(servers):
+        def on_result(server, result, done, total):
             if progress_callback:
-                progress = (index + 1) / total * 100 if total else 100
-                progress_callback(progress, f"Проверяем {server.get('name', 'сервер')}...")
+                progress = done / total * 100 if total else 100
+                progress_callback(progress, f"Проверен {server.get('name', 'сервер')}...")
+
+        sweep = run_sweep(
+            servers,
+            self.check_server_resources,
+            max_workers=RESOURCE_WORKERS,
+            default=(False, None),
+            deadline=RESOURCE_SWEEP_DEADLINE,
+            timeout_result=RESOURCE_TIMED_OUT,
+            on_result=on_result,
+        )
 
-            success, resources = self.check_server_resources(server)
+        results = []
+        success_count = 0
+        timed_out_count = 0
+
+        for server, result in sweep:
+            timed_out = result == RESOURCE_TIMED_OUT
+            success, resources = (False, None) if timed_out else result
             results.append({
                 "server": server,
                 "resources": resources,
                 "success": success,
+                "timed_out": timed_out,
             })
 
             if success:
                 success_count += 1
+            if timed_out:
+                timed_out_count += 1
 
+        total = len(servers)
         stats = {
             "total": total,
             "success": success_count,
             "failed": total - success_count,
+            "timed_out": timed_out_count,
         }
 
         return results, stats
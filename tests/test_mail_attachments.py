@@ -0,0 +1,68 @@
+"""
+/tests/test_mail_attachments.py
+Server Monitoring System v8.0.3
+Copyright (c) 2025 Aleksandr Sukhanov
+License: MIT
+Attachment decoding tests
+Система мониторинга серверов
+Версия: 8.0.3
+Автор: Александр Суханов (c)
+Лицензия: MIT
+Тесты декодирования вложений
+"""
+
+from email.message import Message
+
+import pytest
+
+mail_monitor = pytest.importorskip("modules.mail_monitor")
+
+# Первые 64 КиБ вложения - чистый ASCII, кириллица начинается позже
+ASCII_HEADER = "".join(f"{i:06d} header line without cyrillic text\n" for i in range(1700))
+CYRILLIC_TAIL = "Поставщик Ромашка: загрузка завершена успешно\nОшибка загрузки: Лютик\n"
+
+
+def _attachment(text: str, transfer_encoding: str, charset: str | None = None) -> Message:
+    part = Message()
+    part.set_type("text/plain")
+    if charset:
+        part.set_param("charset", charset)
+    data = text.encode("cp1251")
+    if transfer_encoding == "base64":
+        import base64
+        payload = base64.encodebytes(data).decode("ascii")
+    else:
+        import quopri
+        payload = quopri.encodestring(data).decode("ascii")
+    part["Content-Transfer-Encoding"] = transfer_encoding
+    part.set_payload(payload)
+    return part
+
+
+def _read(part) -> str:
+    with mail_monitor.open_attachment_lines(part) as lines:
+        return "".join(lines)
+
+
+@pytest.mark.parametrize("transfer_encoding", ["base64", "quoted-printable"])
+@pytest.mark.parametrize("header", ["", ASCII_HEADER])
+def test_cp1251_without_charset(transfer_encoding, header):
+    assert len(header) == 0 or len(header) > mail_monitor.ATTACHMENT_CHUNK_SIZE
+    text = header + CYRILLIC_TAIL
+    assert _read(_attachment(text, transfer_encoding)) == text
+
+
+@pytest.mark.parametrize("transfer_encoding", ["base64", "quoted-printable"])
+def test_charset_parameter_is_used(transfer_encoding):
+    text = ASCII_HEADER + CYRILLIC_TAIL
+    assert _read(_attachment(text, transfer_encoding, charset="windows-1251")) == text
+
+
+def test_utf8_attachment():
+    part = Message()
+    part.set_type("text/plain")
+    text = ASCII_HEADER + CYRILLIC_TAIL
+    import base64
+    part["Content-Transfer-Encoding"] = "base64"
+    part.set_payload(base64.encodebytes(text.encode("utf-8")).decode("ascii"))
+    assert _read(part) == text